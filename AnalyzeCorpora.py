@@ -0,0 +1,134 @@
+import os
+import time
+import argparse
+import traceback
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from ExportTools import open_table_writer, check_export_format, EXPORT_FORMATS
+from CommonProcess import common_flow, list_document_files, LEMMA_CACHE_PATH
+from EnglishAnalysisTools import CachedLemmatizer, create_nlp_worker_pool, warm_up_nlp_models
+
+
+DEFAULT_CORPORA = ('PeppaPig', 'HoC', 'Friends', 'KidsLesson')
+SUMMARY_FILE = 'corpora_summary.xlsx'
+
+
+def _analyze_corpus(directory: str, **flow_kwargs) -> dict:
+    # 单个语料的处理在线程中执行，失败时记录错误，不影响其它语料
+    start = time.perf_counter()
+    summary = {'corpus': os.path.basename(os.path.normpath(directory)), 'directory': directory,
+               'documents': len(list_document_files(directory)), 'sentences': 0, 'frequency': {}, 'error': ''}
+    try:
+        summary.update(common_flow(directory, **flow_kwargs))
+    except Exception as e:
+        traceback.print_exc()
+        summary['error'] = str(e) or type(e).__name__
+    summary['seconds'] = time.perf_counter() - start
+    return summary
+
+
+def save_corpora_summary(summaries: List[dict], directory: str = '.', file_name: str = SUMMARY_FILE,
+                         export_format: str = 'xlsx') -> List[str]:
+    """
+    保存多个语料的汇总：每个语料的文档数、句子数、词数、词汇量及耗时，
+    以及合并的词频表（总频率、出现在几个语料中、各语料的频率），按总频率从高到低排序。
+    """
+    names = [summary['corpus'] for summary in summaries]
+    totals = Counter()
+    for summary in summaries:
+        totals.update(summary['frequency'])
+
+    corpus_rows = ((summary['corpus'], summary['documents'], summary['sentences'],
+                    sum(summary['frequency'].values()), len(summary['frequency']),
+                    round(summary['seconds'], 3), summary['error']) for summary in summaries)
+    word_rows = ([word, total, sum(1 for summary in summaries if word in summary['frequency'])] +
+                 [summary['frequency'].get(word, 0) for summary in summaries]
+                 for word, total in totals.most_common())
+
+    with open_table_writer(directory, file_name, export_format) as writer:
+        writer.write_table('Corpora', ['Corpus', 'Documents', 'Sentences', 'Counted Words', 'Vocabulary',
+                                       'Seconds', 'Error'], corpus_rows)
+        writer.write_table('Word Frequency', ['Word', 'Frequency', 'Corpora'] + names, word_rows)
+    print(f"语料汇总已保存到 {', '.join(writer.paths)}")
+    return writer.paths
+
+
+def analyze_corpora(directories, workers: Optional[int] = None, concurrency: Optional[int] = None,
+                    summary_dir: str = '.', export_format: str = 'xlsx', report: bool = False,
+                    **flow_kwargs) -> List[dict]:
+    """
+    在一个进程中依次或同时分析多个语料目录，所有语料共用：
+
+    - 进程池：工作进程只启动一次，每个进程只加载一次标注器和停用词表；
+    - 词形还原缓存（CachedLemmatizer）：WordNet 只加载一次，全部语料处理完后保存一次。
+
+    各语料在线程中并发执行（docx解析、分词和标注在共用的进程池中进行），各自生成与 common_flow 相同的输出，
+    最后生成合并的汇总（见 save_corpora_summary）。并发执行时各语料的输出信息会交错打印。
+
+    Args:
+        directories: 语料目录列表。
+        workers: 共用进程池的进程数，None 或 0 表示使用全部CPU核心。
+        concurrency: 同时处理的语料数，默认为全部语料同时处理。
+        summary_dir: 汇总文件的保存目录。
+        export_format: 导出格式，见 common_flow。无效或缺少所需的依赖时，在加载模型及处理任何语料前抛出 ValueError。
+        report: 为 True 时在每个语料目录下保存 run_report.json（见 Instrumentation）。
+        flow_kwargs: 传给 common_flow 的其它参数，如 streaming、incremental、top_n。
+
+    Returns:
+        List[dict]: 每个语料的汇总，与 directories 的顺序相同。
+    """
+    directories = list(directories)
+    check_export_format(export_format)
+    print('*' * 80)
+    print('Loading NLP models...')
+    warm_up_nlp_models()
+    lemmatizer = CachedLemmatizer(cache_path=LEMMA_CACHE_PATH)
+    if flow_kwargs.get('lemmatize', True):
+        lemmatizer.warm_up()
+
+    # 模型在创建进程池之前加载，支持 fork 的平台上工作进程直接继承已加载的模型
+    with create_nlp_worker_pool(workers) as executor, \
+            ThreadPoolExecutor(max_workers=concurrency or len(directories) or 1) as threads:
+        futures = [threads.submit(_analyze_corpus, directory, executor=executor, lemmatizer=lemmatizer,
+                                  export_format=export_format,
+                                  report_path=os.path.join(directory, 'run_report.json') if report else None,
+                                  **flow_kwargs)
+                   for directory in directories]
+        summaries = [future.result() for future in futures]
+    lemmatizer.save()
+
+    print('*' * 80)
+    for summary in summaries:
+        status = f"失败: {summary['error']}" if summary['error'] else '完成'
+        print(f"{summary['corpus']}: {summary['documents']} 个文档, {summary['sentences']} 个句子, "
+              f"词汇量 {len(summary['frequency'])}, 耗时 {summary['seconds']:.1f}s, {status}")
+    save_corpora_summary(summaries, summary_dir, export_format=export_format)
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description='共用进程池和已加载的模型，一次分析多个语料目录')
+    parser.add_argument('corpora', nargs='*', default=list(DEFAULT_CORPORA), help='语料目录')
+    parser.add_argument('--workers', type=int, default=0, help='共用进程池的进程数，0 表示使用全部CPU核心')
+    parser.add_argument('--concurrency', type=int, default=0, help='同时处理的语料数，0 表示全部同时处理')
+    parser.add_argument('--streaming', action='store_true', help='逐文档流式处理（见 common_flow）')
+    parser.add_argument('--pipelined', action='store_true', help='提取与标注流水线并行（见 common_flow）')
+    parser.add_argument('--incremental', action='store_true', help='增量处理（见 common_flow）')
+    parser.add_argument('--collocation-capacity', type=int, default=None,
+                        help='每种搭配模式最多跟踪的短语数（近似计数，见 common_flow），默认精确统计')
+    parser.add_argument('--format', default='xlsx', choices=list(EXPORT_FORMATS),
+                        help='导出格式（parquet 需要另外安装 pyarrow）')
+    parser.add_argument('--summary-dir', default='.', help='汇总文件的保存目录')
+    parser.add_argument('--report', action='store_true', help='在每个语料目录下保存 run_report.json')
+    args = parser.parse_args()
+
+    analyze_corpora(args.corpora, workers=args.workers or None, concurrency=args.concurrency or None,
+                    summary_dir=args.summary_dir, export_format=args.format, report=args.report,
+                    streaming=args.streaming, pipelined=args.pipelined, incremental=args.incremental,
+                    collocation_capacity=args.collocation_capacity)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import subprocess
+from typing import Callable, Dict, List, Optional
+
+from MsWordTools import process_docx_file
+from CommonProcess import remove_role_info, save_sentences_and_word_frequency, save_collocations, common_flow
+from EnglishAnalysisTools import (remove_non_english, count_word_frequency, analyze_collocations, get_top_words,
+                                  get_wordnet_pos_from_sentence, get_wordnet_pos_distribution)
+
+
+DEFAULT_CORPORA = ('PeppaPig', 'HoC', 'Friends')
+DEFAULT_RESULT_DIR = 'benchmark_results'
+# 词性查询对比：逐词逐句调用的代价为 单词数 × 句子数 次标注，只在语料开头的部分句子上测量
+POS_LOOKUP_SENTENCES = 500
+POS_LOOKUP_WORDS = 10
+
+
+def _token_count(texts: List[str]) -> int:
+    # 以空白分隔的词数作为各阶段统一的吞吐量口径
+    return sum(len(text.split()) for text in texts)
+
+
+def benchmark_stage(stage: str, corpus: str, func: Callable[[], object], documents: int, tokens: int,
+                    repeat: int = 1, measure_memory: bool = True) -> dict:
+    """
+    测量一个阶段：取 repeat 次运行中最快的一次作为耗时；峰值内存在额外的一次 tracemalloc 跟踪运行中测量
+    （tracemalloc 会明显拖慢运行，因此不与计时混在一起）。
+
+    Returns:
+        dict: 阶段名、语料、耗时、文档数/词数、每秒文档数/词数、峰值内存（MB）。
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    seconds = min(timings)
+
+    peak_memory_mb = None
+    if measure_memory:
+        tracemalloc.start()
+        try:
+            func()
+            peak_memory_mb = tracemalloc.get_traced_memory()[1] / (1 << 20)
+        finally:
+            tracemalloc.stop()
+
+    result = {
+        'stage': stage,
+        'corpus': corpus,
+        'seconds': seconds,
+        'documents': documents,
+        'tokens': tokens,
+        'documents_per_sec': documents / seconds if seconds else None,
+        'tokens_per_sec': tokens / seconds if seconds else None,
+        'peak_memory_mb': peak_memory_mb,
+    }
+    memory_text = f', 峰值内存 {peak_memory_mb:.1f} MB' if peak_memory_mb is not None else ''
+    print(f'[{corpus}] {stage}: {seconds:.3f}s, {result["documents_per_sec"] or 0:.1f} 文档/秒, '
+          f'{result["tokens_per_sec"] or 0:.0f} 词/秒{memory_text}')
+    return result
+
+
+def load_corpus_documents(directory: str) -> Dict[str, str]:
+    """
+    读取目录下全部docx文档的原始文本（文件名 -> 文本）
+    """
+    documents = {}
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith('.docx'):
+            documents[filename] = process_docx_file(os.path.join(directory, filename))
+    return documents
+
+
+def synthetic_documents(documents: Dict[str, str], scale: int) -> Dict[str, str]:
+    """
+    将语料复制 scale 份，得到按比例放大的合成语料
+    """
+    return {f'{copy:03d}_{filename}': text for copy in range(scale) for filename, text in documents.items()}
+
+
+def benchmark_corpus(corpus: str, documents: Dict[str, str], directory: Optional[str] = None,
+                     repeat: int = 1, measure_memory: bool = True) -> List[dict]:
+    """
+    逐阶段测量一个语料。提供 directory 时额外测量 docx 解析阶段。
+    """
+    results = []
+    filenames = list(documents)
+    raw_texts = list(documents.values())
+    raw_tokens = _token_count(raw_texts)
+
+    if directory is not None:
+        def extract():
+            for filename in filenames:
+                process_docx_file(os.path.join(directory, filename))
+        results.append(benchmark_stage('process_docx_file', corpus, extract, len(filenames), raw_tokens,
+                                       repeat, measure_memory))
+
+    english_texts = [remove_non_english(text) for text in raw_texts]
+    results.append(benchmark_stage(
+        'remove_non_english', corpus, lambda: [remove_non_english(text) for text in raw_texts],
+        len(raw_texts), raw_tokens, repeat, measure_memory))
+
+    clean_texts = [remove_role_info(text) for text in english_texts]
+    results.append(benchmark_stage(
+        'remove_role_info', corpus, lambda: [remove_role_info(text) for text in english_texts],
+        len(english_texts), _token_count(english_texts), repeat, measure_memory))
+
+    full_text = ''.join(clean_texts)
+    clean_tokens = _token_count(clean_texts)
+    sentences, frequency = count_word_frequency(full_text)
+    results.append(benchmark_stage(
+        'count_word_frequency', corpus, lambda: count_word_frequency(full_text),
+        len(clean_texts), clean_tokens, repeat, measure_memory))
+
+    sample = sentences[:POS_LOOKUP_SENTENCES]
+    words = [word for word, _ in get_top_words(frequency, POS_LOOKUP_WORDS)]
+
+    def lookup_per_call():
+        for word in words:
+            for sentence in sample:
+                get_wordnet_pos_from_sentence(sentence, word)
+    results.append(benchmark_stage(
+        'pos_lookup_per_call', corpus, lookup_per_call, len(sample), _token_count(sample), repeat, measure_memory))
+    results.append(benchmark_stage(
+        'pos_lookup_batch', corpus, lambda: get_wordnet_pos_distribution(sample, words),
+        len(sample), _token_count(sample), repeat, measure_memory))
+
+    collocations = analyze_collocations(full_text)
+    results.append(benchmark_stage(
+        'analyze_collocations', corpus, lambda: analyze_collocations(full_text),
+        len(clean_texts), clean_tokens, repeat, measure_memory))
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        def write_xlsx():
+            save_sentences_and_word_frequency(sentences, frequency, output_dir)
+            save_collocations(collocations, output_dir)
+        results.append(benchmark_stage('xlsx_export', corpus, write_xlsx, len(clean_texts), clean_tokens,
+                                       repeat, measure_memory))
+    return results
+
+
+def benchmark_flow(corpus: str, directory: str, documents: int, tokens: int, repeat: int = 1,
+                   workers: int = 1) -> List[dict]:
+    """
+    对比完整流程的两种执行方式：逐文档流式处理（解析、分句标注依次进行，common_flow(streaming=True)）
+    与流水线模式（common_flow(pipelined=True)，两者结果相同）。
+
+    每次运行都把 docx 文件复制到新的临时目录，不复用文本缓存及阶段缓存；复制的耗时两种方式相同，计入结果。
+    工作进程不在 tracemalloc 的跟踪范围内，因此不测量峰值内存。
+    """
+    filenames = [filename for filename in sorted(os.listdir(directory)) if filename.endswith('.docx')]
+
+    def run_flow(**flow_kwargs):
+        with tempfile.TemporaryDirectory() as work_dir:
+            for filename in filenames:
+                shutil.copy2(os.path.join(directory, filename), work_dir)
+            common_flow(work_dir, workers=workers, **flow_kwargs)
+
+    return [
+        benchmark_stage('flow_sequential', corpus, lambda: run_flow(streaming=True), documents, tokens,
+                        repeat, measure_memory=False),
+        benchmark_stage('flow_pipelined', corpus, lambda: run_flow(pipelined=True), documents, tokens,
+                        repeat, measure_memory=False),
+    ]
+
+
+def _environment() -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'commit': commit,
+    }
+
+
+def run_benchmarks(corpora=DEFAULT_CORPORA, scale: int = 0, repeat: int = 1, measure_memory: bool = True,
+                   result_dir: str = DEFAULT_RESULT_DIR, flow: bool = False, workers: int = 1) -> str:
+    """
+    测量各语料（以及可选的放大 scale 倍的合成语料）的各个阶段，结果保存为 JSON。
+    flow=True 时另外对比完整流程的流式与流水线模式（见 benchmark_flow），workers 为此时使用的进程数。
+
+    Returns:
+        str: 结果文件路径。
+    """
+    results = []
+    for corpus in corpora:
+        print('*' * 80)
+        print(f'Benchmarking {corpus}...')
+        documents = load_corpus_documents(corpus)
+        results.extend(benchmark_corpus(corpus, documents, corpus, repeat, measure_memory))
+        if flow:
+            results.extend(benchmark_flow(corpus, corpus, len(documents), _token_count(list(documents.values())),
+                                          repeat, workers))
+        if scale > 1:
+            results.extend(benchmark_corpus(f'{corpus}x{scale}', synthetic_documents(documents, scale),
+                                            repeat=repeat, measure_memory=measure_memory))
+
+    os.makedirs(result_dir, exist_ok=True)
+    file_path = os.path.join(result_dir, time.strftime('benchmark_%Y%m%d_%H%M%S.json'))
+    with open(file_path, 'wt', encoding='utf-8') as f:
+        json.dump({
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'environment': _environment(),
+            'parameters': {'corpora': list(corpora), 'scale': scale, 'repeat': repeat, 'flow': flow,
+                           'workers': workers},
+            'results': results,
+        }, f, ensure_ascii=False, indent=1)
+    print(f'Benchmark results are saved to: {file_path}')
+    return file_path
+
+
+def compare_benchmarks(baseline_path: str, current_path: str):
+    """
+    对比两次测量结果，打印每个（语料, 阶段）的耗时变化。加速比 > 1 表示变快。
+    """
+    def load(path):
+        with open(path, 'rt', encoding='utf-8') as f:
+            return {(item['corpus'], item['stage']): item for item in json.load(f)['results']}
+
+    baseline, current = load(baseline_path), load(current_path)
+    print(f"{'语料':<16}{'阶段':<24}{'基准(s)':>10}{'当前(s)':>10}{'加速比':>10}")
+    for key, item in current.items():
+        if key not in baseline:
+            continue
+        before, after = baseline[key]['seconds'], item['seconds']
+        speedup = before / after if after else float('inf')
+        print(f'{key[0]:<16}{key[1]:<24}{before:>10.3f}{after:>10.3f}{speedup:>9.2f}x')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='分阶段测量处理流程的耗时、吞吐量及峰值内存')
+    parser.add_argument('--corpora', nargs='+', default=list(DEFAULT_CORPORA), help='要测量的语料目录')
+    parser.add_argument('--scale', type=int, default=0, help='额外测量放大此倍数的合成语料')
+    parser.add_argument('--repeat', type=int, default=1, help='每个阶段重复次数，取最快的一次')
+    parser.add_argument('--no-memory', action='store_true', help='不测量峰值内存')
+    parser.add_argument('--flow', action='store_true', help='另外对比完整流程的流式与流水线模式')
+    parser.add_argument('--workers', type=int, default=1, help='完整流程使用的进程数')
+    parser.add_argument('--output', default=DEFAULT_RESULT_DIR, help='结果保存目录')
+    parser.add_argument('--compare', metavar='BASELINE_JSON', help='与之前的测量结果对比')
+    args = parser.parse_args()
+
+    file_path = run_benchmarks(args.corpora, args.scale, args.repeat, not args.no_memory, args.output,
+                               args.flow, args.workers)
+    if args.compare:
+        compare_benchmarks(args.compare, file_path)
+
+
+if __name__ == '__main__':
+    main()
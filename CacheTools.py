@@ -0,0 +1,116 @@
+import os
+import json
+import hashlib
+
+
+def file_content_hash(file_path, chunk_size=1 << 20):
+    """
+    计算文件内容的 SHA-256 摘要
+
+    :param file_path: 文件路径
+    :param chunk_size: 每次读取的字节数
+    :return: 十六进制摘要字符串
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def params_hash(params: dict) -> str:
+    """
+    计算参数字典的短摘要，用作缓存键的一部分。参数值必须可被 json 序列化。
+    """
+    serialized = json.dumps(params, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()[:16]
+
+
+class DocumentTextCache:
+    """
+    按文件内容哈希缓存每个文档提取出的原始文本和清洗后的文本。
+
+    缓存目录结构：
+        index.json              文件名 -> {size, mtime, hash}，文件未修改时无需重新计算哈希
+        <hash>.raw<n>.txt       从文档中提取出的原始文本（n 为文本提取的版本号，见 CommonProcess.CLEAN_TEXT_VERSION）
+        <hash>.<key>.txt        按清洗参数（key）区分的清洗后文本
+
+    文件内容改变后哈希随之改变，旧条目不会再被命中，并在 prune() 时被删除。
+    """
+
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.index = self._load_index()
+        self.hits = 0
+        self.misses = 0
+
+    def _load_index(self) -> dict:
+        index_path = os.path.join(self.cache_dir, self.INDEX_FILE)
+        try:
+            with open(index_path, 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        index_path = os.path.join(self.cache_dir, self.INDEX_FILE)
+        with open(index_path, 'wt', encoding='utf-8') as f:
+            json.dump(self.index, f, ensure_ascii=False, indent=1)
+
+    def content_hash(self, file_path: str) -> str:
+        """
+        获取文件内容哈希。文件大小和修改时间均未变化时直接使用索引中记录的哈希。
+        """
+        stat = os.stat(file_path)
+        filename = os.path.basename(file_path)
+        entry = self.index.get(filename)
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns:
+            return entry['hash']
+        digest = file_content_hash(file_path)
+        self.index[filename] = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'hash': digest}
+        return digest
+
+    def _entry_path(self, digest: str, key: str) -> str:
+        return os.path.join(self.cache_dir, f'{digest}.{key}.txt')
+
+    def contains(self, digest: str, key: str = 'raw') -> bool:
+        return os.path.isfile(self._entry_path(digest, key))
+
+    def get(self, digest: str, key: str = 'raw'):
+        """
+        读取缓存文本，未命中时返回 None
+        """
+        try:
+            with open(self._entry_path(digest, key), 'rt', encoding='utf-8') as f:
+                text = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return text
+
+    def put(self, digest: str, text: str, key: str = 'raw'):
+        # 先写临时文件再替换，避免中途中断留下不完整的缓存条目
+        entry_path = self._entry_path(digest, key)
+        temp_path = entry_path + '.tmp'
+        with open(temp_path, 'wt', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp_path, entry_path)
+
+    def prune(self, filenames):
+        """
+        淘汰不再对应任何现存文件的索引项及缓存条目
+
+        :param filenames: 当前目录下仍然存在的文件名
+        """
+        filenames = set(filenames)
+        self.index = {name: entry for name, entry in self.index.items() if name in filenames}
+        live_hashes = {entry['hash'] for entry in self.index.values()}
+        for entry_name in os.listdir(self.cache_dir):
+            if entry_name == self.INDEX_FILE:
+                continue
+            if entry_name.split('.', 1)[0] not in live_hashes:
+                os.remove(os.path.join(self.cache_dir, entry_name))
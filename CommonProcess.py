@@ -1,67 +1,432 @@
+import io
 import os
-import re
-import pandas as pd
-
-from MsWordTools import process_all_docx_files
-from EnglishAnalysisTools import remove_non_english, count_word_frequency, analyze_collocations
+import json
+from itertools import chain
+from contextlib import closing
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from MsWordTools import iter_docx_files, TEXT_EXTENSIONS, DOC_EXTENSIONS
+from CacheTools import DocumentTextCache, params_hash, file_content_hash
+from CorpusManifest import CorpusManifest, document_partial_result
+from TermMatrix import TermMatrix
+from PhraseMining import mine_phrases, PHRASE_COLUMNS
+from Concordance import ConcordanceIndex
+from Pipeline import iter_prefetched
+from ScriptParser import (ScriptLine, ROLE_PATTERN, SPEAKER_COLUMNS, SPEAKER_WORD_COLUMNS,
+                          SPEAKER_COLLOCATION_COLUMNS, parse_script, store_sentence_speakers, speaker_statistics)
+from ExportTools import open_table_writer, check_export_format
+from Instrumentation import RunReport, NULL_REPORT, NULL_STAGE
+from StageGraph import StageGraph, Stage, save_json_artifact, load_json_artifact
+from CorpusStore import (TaggedCorpusStore, TaggedCorpusWriter, save_tagged_corpus, load_tagged_corpus_store,
+                         CORPUS_STORE_VERSION)
+from EnglishAnalysisTools import (remove_non_english, build_tagged_corpus, iter_tagged_documents, CachedLemmatizer,
+                                  create_nlp_worker_pool, pool_worker_count)
 
 
 def remove_role_info(text):
     """
     去除正文中的角色信息（例如：Peppa: xxx）
-    使用正则表达式匹配并移除角色名称及冒号
+    使用预编译的正则表达式（见 ScriptParser.ROLE_PATTERN）一次匹配并移除每行行首的角色名称及冒号
+    """
+    return ROLE_PATTERN.sub('', text)
+
+
+# 文本提取或清洗逻辑发生变化时递增此版本号，使已缓存的原始文本及清洗结果失效
+# 2: .doc 的表格行结束按段落属性识别，插入的符号被去除
+CLEAN_TEXT_VERSION = 2
+RAW_TEXT_KEY = f'raw{CLEAN_TEXT_VERSION}'
+TEXT_CACHE_DIR = os.path.join('.cache', 'text')
+STAGE_CACHE_DIR = os.path.join('.cache', 'stages')
+PURE_TEXT_FILE = 'pure_text.txt'
+PURE_TEXT_INDEX_FILE = 'pure_text_documents.json'
+# pure_text.txt 中每个文档每一行的说话人
+PURE_TEXT_SPEAKERS_FILE = 'pure_text_speakers.json'
+# 词形还原结果与语料无关，所有语料共用一个缓存文件
+LEMMA_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'lemma_cache.tsv')
+
+
+def clean_document_text(content: str, keep_number: bool = False, remove_role: bool = True) -> str:
+    """
+    清洗单个文档的文本：去除非英文字符，并可选地去除角色信息
+    """
+    clean_text = remove_non_english(content, keep_number=keep_number)
+    if remove_role:
+        clean_text = remove_role_info(clean_text)
+    return clean_text
+
+
+def clean_document_script(content: str, keep_number: bool = False, remove_role: bool = True,
+                          document: str = '') -> Tuple[str, List[ScriptLine]]:
+    """
+    同 clean_document_text，同时返回逐行的剧本记录（见 ScriptParser.parse_script）。
+    去除非英文字符后只做一次逐行解析，清洗后的文本直接由各行的台词拼接而成。
+    """
+    text = remove_non_english(content, keep_number=keep_number)
+    lines = parse_script(text, document)
+    if remove_role:
+        text = '\n'.join([line.utterance for line in lines])
+    return text, lines
+
+
+def list_document_files(directory: str) -> List[str]:
+    """
+    目录下参与分析的文档：docx及doc文档、纯文本文档（.txt/.md），不包括程序生成的 pure_text.txt
+    """
+    return [filename for filename in os.listdir(directory)
+            if filename.endswith(('.docx',) + DOC_EXTENSIONS + TEXT_EXTENSIONS) and filename != PURE_TEXT_FILE]
+
+
+def iter_clean_documents(directory: str, workers: int = 1,
+                         keep_number: bool = False, remove_role: bool = True,
+                         use_cache: bool = True, extractor: str = 'python-docx',
+                         filenames: Optional[List[str]] = None,
+                         executor=None, with_speakers: bool = False,
+                         max_pending: Optional[int] = None) -> Iterator[Tuple]:
     """
-    # 匹配模式：角色名（可能包含空格和特殊字符）后跟冒号和可选空格
-    pattern = r'^[A-Za-z\s]+:\s*'
-    # 逐行处理，移除匹配的角色信息
-    lines = text.split('\n')
-    cleaned_lines = []
-    for line in lines:
-        cleaned_line = re.sub(pattern, '', line)
-        cleaned_lines.append(cleaned_line)
-    return '\n'.join(cleaned_lines)
+    按文件名顺序逐个产出目录下文档（见 list_document_files）的 (文件名, 清洗后文本)，解析失败的文件会被跳过。
+    指定 filenames 时只处理其中的文档。executor 为共用的进程池（可选），max_pending 为同时提交解析的文档数上限
+    （可选，见 iter_docx_files）。
+    with_speakers 为 True 时产出 (文件名, 清洗后文本, 每行的说话人)，说话人与清洗后文本按 '\\n' 划分的行一一对应，
+    没有说话人的行为空字符串。
+
+    启用缓存时，每个文档的原始文本和清洗后文本按文件内容哈希及清洗参数缓存在 .cache/text 下，
+    只有新增或修改过的文档才需要重新解析。缓存文本在产出时才读取，内存中同时只保留当前文档。
+    """
+    all_filenames = list_document_files(directory)
+    filenames = all_filenames if filenames is None else filenames
+
+    cache = DocumentTextCache(os.path.join(directory, TEXT_CACHE_DIR)) if use_cache else None
+    clean_key = params_hash({'version': CLEAN_TEXT_VERSION, 'keep_number': keep_number, 'remove_role': remove_role})
+    # 说话人与 remove_role 无关
+    speaker_key = params_hash({'version': CLEAN_TEXT_VERSION, 'keep_number': keep_number, 'speakers': True})
+    keys = [clean_key, speaker_key] if with_speakers else [clean_key]
+
+    digests = {}
+    to_extract = []
+    for filename in filenames:
+        if cache is None:
+            to_extract.append(filename)
+            continue
+        digest = digests[filename] = cache.content_hash(os.path.join(directory, filename))
+        if not all(cache.contains(digest, key) for key in keys) and not cache.contains(digest, RAW_TEXT_KEY):
+            to_extract.append(filename)
+
+    # 只解析缓存未命中的文档；按顺序产出，与 filenames 对齐（解析失败的文件会被跳过）
+    extracted = iter_docx_files(directory, workers=workers, ordered=True, filenames=to_extract, extractor=extractor,
+                                executor=executor, max_pending=max_pending)
+    pending = next(extracted, None)
+
+    for filename in filenames:
+        digest = digests.get(filename)
+        # 解析结果按顺序逐个取出。内容相同的文档共用缓存，前一个写入缓存后，后一个的解析结果也要在此取出
+        extracted_content = None
+        if pending is not None and pending[0] == filename:
+            extracted_content = pending[1]
+            pending = next(extracted, None)
+        clean_text = cache.get(digest, clean_key) if cache else None
+        speakers = cache.get(digest, speaker_key) if cache and with_speakers else None
+        if clean_text is None or (with_speakers and speakers is None):
+            content = (extracted_content if extracted_content is not None
+                       else cache.get(digest, RAW_TEXT_KEY) if cache else None)
+            if content is None:
+                continue
+            if cache and extracted_content is not None:
+                cache.put(digest, content, RAW_TEXT_KEY)
+            if with_speakers:
+                clean_text, lines = clean_document_script(content, keep_number=keep_number, remove_role=remove_role,
+                                                          document=filename)
+                speakers = '\n'.join([line.speaker for line in lines])
+            else:
+                clean_text = clean_document_text(content, keep_number=keep_number, remove_role=remove_role)
+            if cache:
+                cache.put(digest, clean_text, clean_key)
+                if with_speakers:
+                    cache.put(digest, speakers, speaker_key)
+        if with_speakers:
+            yield filename, clean_text, speakers.split('\n')
+        else:
+            yield filename, clean_text
+
+    if cache:
+        cache.prune(all_filenames)
+        cache.save()
+        print(f'文本缓存命中: {len(filenames) - len(to_extract)}/{len(filenames)} 个文档无需重新解析')
+
+
+def common_process_eng_docs_to_pure_text(directory: str, workers: int = 1,
+                                         keep_number: bool = False, remove_role: bool = True,
+                                         use_cache: bool = True, extractor: str = 'python-docx',
+                                         stage=NULL_STAGE, executor=None) -> str:
+    """
+    提取并清洗目录下所有文档（docx及纯文本）的文本，逐个文档追加写入 pure_text.txt，
+    同时在 pure_text_documents.json 中记录每个文档在文件中的起止位置，供 iter_pure_text_documents 使用，
+    在 pure_text_speakers.json 中记录每个文档每一行的说话人，供 load_pure_text_speakers 使用。
 
+    stage: 记录每个文档耗时及计数的 StageRecord（可选，见 Instrumentation）。
+    executor: 共用的进程池（可选）。
+    """
+    documents = iter_clean_documents(directory, workers=workers, keep_number=keep_number, remove_role=remove_role,
+                                     use_cache=use_cache, extractor=extractor, executor=executor, with_speakers=True)
+    for _ in iter_written_pure_text(directory, stage.timed(documents), stage):
+        pass
+    return os.path.join(directory, PURE_TEXT_FILE)
 
-def common_process_eng_docs_to_pure_text(directory: str) -> str:
-    results = process_all_docx_files(directory)
-    file_path = os.path.join(directory, 'pure_text.txt')
+
+def iter_written_pure_text(directory: str, documents: Iterable[Tuple[str, str, List[str]]],
+                           stage=NULL_STAGE) -> Iterator[Tuple[str, str]]:
+    """
+    把 iter_clean_documents(with_speakers=True) 产出的文档逐个写入 pure_text.txt，每写入一个即产出其 (文件名, 文本)，
+    文本与之后用 iter_pure_text_documents 读回的相同，下游可以边写边处理（见 pipelined_extract_and_tag）。
+    pure_text_documents.json 及 pure_text_speakers.json 在全部文档写入后才保存。
+    """
+    file_path = os.path.join(directory, PURE_TEXT_FILE)
+    document_index = []
+    # 说话人 -> 编号；每个文档每行的说话人编号，-1 表示没有说话人
+    speaker_ids = {}
+    document_speakers = {}
 
     with open(file_path, 'wt') as f:
-        for filename, content in results.items():
-            clean_text = remove_non_english(content)
-            clean_text = remove_role_info(clean_text)
+        for filename, clean_text, speakers in documents:
+            start = f.tell()
             f.write(clean_text)
-    return file_path
+            document_index.append([filename, start, f.tell()])
+            document_speakers[filename] = [speaker_ids.setdefault(speaker, len(speaker_ids)) if speaker else -1
+                                           for speaker in speakers]
+            stage.add('characters', len(clean_text))
+            # 与读回时相同的换行处理（newline=None）
+            yield filename, io.StringIO(clean_text, newline=None).read()
+    stage.add('documents', len(document_index))
+    stage.add('speakers', len(speaker_ids))
+
+    with open(os.path.join(directory, PURE_TEXT_INDEX_FILE), 'wt', encoding='utf-8') as f:
+        json.dump(document_index, f, ensure_ascii=False, indent=1)
+    with open(os.path.join(directory, PURE_TEXT_SPEAKERS_FILE), 'wt', encoding='utf-8') as f:
+        json.dump({'speakers': list(speaker_ids), 'documents': document_speakers}, f, ensure_ascii=False)
+
+
+def pipelined_extract_and_tag(directory: str, source_hash: str, workers: int = 1,
+                              keep_number: bool = False, remove_role: bool = True,
+                              use_cache: bool = True, extractor: str = 'python-docx', stage=NULL_STAGE,
+                              executor=None, lemmatizer: Optional[CachedLemmatizer] = None) -> str:
+    """
+    以流水线方式同时进行文本提取与标注，结果与依次运行 common_process_eng_docs_to_pure_text
+    和按文档逐个标注（streaming 模式）相同：
+
+        后台线程：读取及清洗文档（docx解析提交到进程池）
+            ──有界队列──> 当前线程：写入 pure_text.txt，提交分句及词性标注（进程池）──> 写入语料存储
+
+    前一个文档还在标注时，后续文档已在解析和清洗。docx解析与标注共用一个进程池，同时提交解析的文档数
+    及队列容量都不超过进程数的两倍，下游较慢时上游等待，内存占用有界。
+    任一环节出错时，后台线程退出、尚未开始的任务被取消，语料存储的 meta.json 不会写入，下次运行时重新处理。
+
+    Args:
+        source_hash: 语料存储的来源哈希（即 tagging 阶段的缓存键）。
+        executor: 共用的进程池（可选），否则 workers 不为 1 时临时创建一个。
+
+    Returns:
+        str: pure_text.txt 的路径。
+    """
+    pool = executor if executor is not None or workers == 1 else create_nlp_worker_pool(workers)
+    try:
+        window = pool_worker_count(workers, pool) * 2 if pool is not None else 2
+        cleaned = iter_clean_documents(directory, workers=workers, keep_number=keep_number, remove_role=remove_role,
+                                       use_cache=use_cache, extractor=extractor, executor=pool, with_speakers=True,
+                                       max_pending=window)
+        documents = iter_prefetched(cleaned, maxsize=window, name='extract')
+        written = iter_written_pure_text(directory, documents, stage)
+        tagged = iter_tagged_documents(written, workers=workers, executor=pool)
+        try:
+            with TaggedCorpusWriter(directory, source_hash, lemmatizer=lemmatizer) as writer:
+                for corpus in stage.timed(tagged, lambda corpus: corpus.document_names[0]):
+                    writer.add(corpus)
+        finally:
+            # 出错时依次关闭各环节：取消已提交的任务，停止后台线程
+            for generator in (tagged, written, documents):
+                generator.close()
+    finally:
+        if pool is not executor:
+            pool.shutdown(wait=True, cancel_futures=True)
+    return os.path.join(directory, PURE_TEXT_FILE)
 
 
 def load_pure_text(directory: str) -> str:
-    with open(os.path.join(directory, 'pure_text.txt'), 'rt') as f:
+    with open(os.path.join(directory, PURE_TEXT_FILE), 'rt') as f:
         return f.read()
 
 
-def save_sentences_and_word_frequency(
-        sentences, frequency, directory: str,
-        file_name: str = 'sentences_and_word_frequency.xlsx'):
-    file_path = os.path.join(directory, file_name)
+def load_pure_text_index(directory: str) -> Optional[List[list]]:
+    """
+    读取 pure_text_documents.json：[[文件名, 起始位置, 结束位置], ...]。不存在或与 pure_text.txt 不一致时返回 None。
+    """
+    try:
+        with open(os.path.join(directory, PURE_TEXT_INDEX_FILE), 'rt', encoding='utf-8') as f:
+            document_index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    end_position = document_index[-1][2] if document_index else 0
+    if end_position != os.path.getsize(os.path.join(directory, PURE_TEXT_FILE)):
+        return None
+    return document_index
+
+
+def iter_pure_text_documents(directory: str, newline: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+    """
+    按 pure_text_documents.json 逐个读取 pure_text.txt 中各文档的 (文件名, 文本)，
+    每次只读入一个文档。索引不存在或与 pure_text.txt 不一致时，整个文件作为一个文档产出。
+
+    newline: 各文档的换行处理，同 open；传入 '' 时不转换换行符，文本的行与写入时完全一致。
+    """
+    file_path = os.path.join(directory, PURE_TEXT_FILE)
+    document_index = load_pure_text_index(directory)
+    if document_index is None:
+        yield '', load_pure_text(directory)
+        return
 
-    # 创建句子列表的DataFrame
-    df_sentences = pd.DataFrame(sentences, columns=['Sentences']) if sentences else None
+    with open(file_path, 'rb') as f:
+        for filename, start, end in document_index:
+            f.seek(start)
+            # 与 load_pure_text 相同的解码及换行处理
+            yield filename, io.TextIOWrapper(io.BytesIO(f.read(end - start)), newline=newline).read()
 
-    if frequency:
-        # 创建词频统计的DataFrame
-        df_frequency = pd.DataFrame(frequency.items(), columns=['Word', 'Frequency'])
-        # 按词频从高到低排序
-        df_frequency.sort_values(by='Frequency', ascending=False, inplace=True)
-    else:
-        df_frequency = None
 
-    with pd.ExcelWriter(file_path, engine='openpyxl') as writer:
-        if df_sentences:
-            df_sentences.to_excel(writer, sheet_name='Sentences', index=False)
-        if df_frequency:
-            df_frequency.to_excel(writer, sheet_name='Word Frequency', index=False)
+def pure_text_document_lengths(directory: str, text_length: int) -> Optional[List[Tuple[str, int]]]:
+    """
+    load_pure_text 读入的文本中每个文档的 [(文件名, 字符数), ...]，供 build_tagged_corpus 保留文档边界。
+    没有文档索引或与文本不一致时返回 None。
+    """
+    lengths = [(name, len(text)) for name, text in iter_pure_text_documents(directory)]
+    if any(not name for name, _ in lengths) or sum(length for _, length in lengths) != text_length:
+        return None
+    return lengths
+
+
+def load_pure_text_speakers(directory: str) -> Tuple[List[str], dict]:
+    """
+    读取 pure_text_speakers.json
+
+    Returns:
+        Tuple[List[str], dict]: 说话人名称（下标即编号），及 文件名 -> 该文档每行的说话人编号（-1 表示没有说话人）。
+    """
+    with open(os.path.join(directory, PURE_TEXT_SPEAKERS_FILE), 'rt', encoding='utf-8') as f:
+        data = json.load(f)
+    return data['speakers'], data['documents']
+
+
+def incremental_analysis(directory: str, workers: int = 1, keep_number: bool = False, remove_role: bool = True,
+                         use_cache: bool = True, extractor: str = 'python-docx', top_n: int = 20,
+                         remove_stopwords: bool = True, min_word_length: int = 2, lemmatize: bool = True,
+                         report=NULL_REPORT, executor=None, lemmatizer: Optional[CachedLemmatizer] = None,
+                         collocation_capacity: Optional[int] = None):
+    """
+    增量分析：只处理相对上次运行新增、修改或删除的文档，将其部分结果加到（或减出）清单的合计中。
+
+    每个文档单独分句（句子不跨越文档），结果与 common_flow(streaming=True) 相同。不生成 pure_text.txt。
+    executor、lemmatizer 的含义见 common_flow。collocation_capacity 指定时每个文档只保留每种模式最常见的
+    这么多个搭配（见 CorpusManifest.document_partial_result）。
+
+    Returns:
+        Tuple[List[str], Dict[str, int], Dict[str, List], TermMatrix, Dict[str, int]]: 句子列表、词频字典、
+        搭配分析结果、文档 × 词元矩阵及每种模式搭配次数的误差上限。
+    """
+    with report.stage('manifest_diff') as stage:
+        word_params = {'remove_stopwords': remove_stopwords, 'min_word_length': min_word_length, 'lemmatize': lemmatize}
+        manifest = CorpusManifest(directory, params_hash({
+            'clean_version': CLEAN_TEXT_VERSION, 'keep_number': keep_number, 'remove_role': remove_role,
+            'collocation_capacity': collocation_capacity, **word_params}))
+
+        filenames = list_document_files(directory)
+        if use_cache:
+            cache = DocumentTextCache(os.path.join(directory, TEXT_CACHE_DIR))
+            digests = {filename: cache.content_hash(os.path.join(directory, filename)) for filename in filenames}
+            cache.save()
+        else:
+            digests = {filename: file_content_hash(os.path.join(directory, filename)) for filename in filenames}
+
+        changed, removed = manifest.diff(digests)
+        try:
+            # 先减去删除及修改过的文档的旧结果（修改过的文档即使这次解析失败也不会保留旧结果）
+            for filename in removed + changed:
+                manifest.remove(filename)
+        except (OSError, ValueError):
+            print('部分结果缺失，全部文档重新处理')
+            manifest.reset()
+            changed, removed = manifest.diff(digests)
+        print(f'增量分析: {len(filenames) - len(changed)} 个文档未变化，'
+              f'{len(changed)} 个文档新增或修改，{len(removed)} 个文档已删除')
+        stage.add('files', len(filenames))
+        stage.add('changed', len(changed))
+        stage.add('removed', len(removed))
+
+    with report.stage('incremental_update') as stage:
+        if changed:
+            own_lemmatizer = lemmatizer is None
+            if own_lemmatizer:
+                lemmatizer = CachedLemmatizer(cache_path=LEMMA_CACHE_PATH)
+            documents = iter_clean_documents(directory, workers=workers, keep_number=keep_number,
+                                             remove_role=remove_role, use_cache=use_cache, extractor=extractor,
+                                             filenames=changed, executor=executor)
+            tagged_documents = iter_tagged_documents(documents, workers=workers, executor=executor)
+            # 出错时立即关闭生成器，取消已提交到（可能与其它语料共用的）进程池的任务
+            with closing(tagged_documents), closing(documents):
+                for corpus in stage.timed(tagged_documents, lambda corpus: corpus.document_names[0]):
+                    filename = corpus.document_names[0]
+                    manifest.add(filename, digests[filename],
+                                 document_partial_result(corpus, lemmatizer=lemmatizer,
+                                                         capacity=collocation_capacity, **word_params))
+                    stage.add('documents')
+                    stage.add('sentences', len(corpus.sentences))
+                    stage.add('tokens', corpus.token_count())
+            if own_lemmatizer:
+                lemmatizer.save()
+
+        manifest.reorder(filenames)
+        manifest.save()
+        manifest.prune()
+
+    with report.stage('merge_results') as stage:
+        term_matrix = TermMatrix.from_document_counts(
+            manifest.order, (partial['word_counts'] for partial in manifest.iter_partials()))
+        sentences = manifest.sentences()
+        collocations = manifest.top_collocations(top_n)
+        stage.add('sentences', len(sentences))
+        stage.add('words', len(manifest.word_counts))
+        stage.add('matches', sum(sum(counts.values()) for counts in manifest.collocation_counts.values()))
+    return sentences, manifest.word_frequency(), collocations, term_matrix, manifest.collocation_error_bounds()
+
+
+def save_sentences_and_word_frequency(
+        sentences, frequency, directory: str,
+        file_name: str = 'sentences_and_word_frequency.xlsx', term_matrix: Optional[TermMatrix] = None,
+        export_format: str = 'xlsx'):
+    """
+    导出句子及词频（按词频从高到低）。提供 term_matrix 时另外导出每个词的文档频率、分布均匀度、各季频率，
+    以及每个文档 TF-IDF 最高的词。
 
-    print(f"分析结果已成功导出到 '{file_path}'")
+    sentences 可以是生成器（如 TaggedCorpusStore.iter_sentences），逐句写出，不需要全部读入内存。
+    结果逐行写出（见 ExportTools），export_format 可选 'xlsx'、'csv'、'parquet'。
+    """
+    sentences = iter(sentences)
+    first_sentence = next(sentences, None)
+    with open_table_writer(directory, file_name, export_format) as writer:
+        if first_sentence is not None:
+            writer.write_table('Sentences', ['Sentences'],
+                               ((sentence,) for sentence in chain([first_sentence], sentences)))
+        if frequency:
+            writer.write_table('Word Frequency', ['Word', 'Frequency'],
+                               sorted(frequency.items(), key=lambda item: item[1], reverse=True))
+        if term_matrix is not None:
+            statistics = term_matrix.statistics_frame()
+            writer.write_table('Word Statistics', list(statistics.columns),
+                               statistics.itertuples(index=False, name=None))
+            tf_idf = term_matrix.tf_idf_frame()
+            writer.write_table('TF-IDF', list(tf_idf.columns), tf_idf.itertuples(index=False, name=None))
+
+    if writer.paths:
+        print(f"分析结果已成功导出到 {', '.join(writer.paths)}")
+    else:
+        print("没有可导出的分析结果")
+    return writer.paths
 
 
 def dump_collocations(collocations):
@@ -76,52 +441,378 @@ def dump_collocations(collocations):
                 print(f"{phrase}: {freq}")
 
 
-def save_collocations(collocations, directory: str, file_name: str = 'collocations.xlsx'):
-    file_path = os.path.join(directory, file_name)
+def save_collocations(collocations, directory: str, file_name: str = 'collocations.xlsx',
+                      export_format: str = 'xlsx', error_bounds: Optional[Dict[str, int]] = None):
+    """
+    导出搭配分析结果。提供 error_bounds（近似计数时每种模式的误差上限）时另加一列“误差上限”。
+    """
+    columns = ["搭配模式", "搭配短语", "出现频率"]
+    if error_bounds is None:
+        rows = ((collocation_type, phrase, frequency)
+                for collocation_type, phrases_list in collocations.items()
+                for phrase, frequency in phrases_list)
+    else:
+        columns.append("误差上限")
+        rows = ((collocation_type, phrase, frequency, error_bounds.get(collocation_type, 0))
+                for collocation_type, phrases_list in collocations.items()
+                for phrase, frequency in phrases_list)
 
-    data = []
-    for collocation_type, phrases_list in collocations.items():
-        for phrase, frequency in phrases_list:
-            data.append({
-                "搭配模式": collocation_type,
-                "搭配短语": phrase,
-                "出现频率": frequency
-            })
+    with open_table_writer(directory, file_name, export_format) as writer:
+        writer.write_table('Collocations', columns, rows)
 
-    df_collocations = pd.DataFrame(data)
-    df_collocations.to_excel(file_path, index=False)
+    print(f"搭配分析结果已保存到 {', '.join(writer.paths)}")
+    return writer.paths
 
-    print(f"搭配分析结果已保存到 '{file_path}'")
 
+def save_phrases(phrases, directory: str, file_name: str = 'phrases.xlsx', export_format: str = 'xlsx'):
+    """
+    保存 mine_phrases 挖掘出的高频短语
+    """
+    with open_table_writer(directory, file_name, export_format) as writer:
+        writer.write_table('Phrases', PHRASE_COLUMNS, phrases)
+
+    print(f"高频短语已保存到 {', '.join(writer.paths)}")
+    return writer.paths
 
-def common_flow(directory: str):
-    # If pure_text.txt has been generated, we don't have to parse docx again.
 
-    print('*' * 80)
-    print('Loading word documents...')
-    file_path = common_process_eng_docs_to_pure_text(directory)
-    print(f'Pure text is saved to: {file_path}')
+def save_speakers(speakers, directory: str, file_name: str = 'speakers.xlsx', export_format: str = 'xlsx'):
+    """
+    保存按说话人的统计（见 ScriptParser.speaker_statistics）：每人的台词行数、词数、词汇量，
+    及每人最常说的词和搭配。没有识别到说话人时不导出。
+    """
+    if not speakers:
+        return []
+    with open_table_writer(directory, file_name, export_format) as writer:
+        writer.write_table('Speakers', SPEAKER_COLUMNS, speakers['speakers'])
+        writer.write_table('Speaker Words', SPEAKER_WORD_COLUMNS, speakers['words'])
+        writer.write_table('Speaker Collocations', SPEAKER_COLLOCATION_COLUMNS, speakers['collocations'])
+
+    print(f"说话人统计已保存到 {', '.join(writer.paths)}")
+    return writer.paths
+
+
+def common_flow(directory: str, workers: int = 1, use_cache: bool = True, extractor: str = 'python-docx',
+                streaming: bool = False, incremental: bool = False, pipelined: bool = False,
+                export_format: str = 'xlsx', report_path: Optional[str] = None, profile_stage: Optional[str] = None,
+                keep_number: bool = False, remove_role: bool = True, remove_stopwords: bool = True,
+                min_word_length: int = 2, lemmatize: bool = True, top_n: int = 20,
+                phrase_max_length: int = 6, phrase_min_count: int = 5, collocation_capacity: Optional[int] = None,
+                executor=None, lemmatizer: Optional[CachedLemmatizer] = None) -> dict:
+    # The flow is a graph of named stages (see build_analysis_graph) whose results are cached under .cache/stages,
+    # keyed by a hash of their inputs and parameters: changing only top_n or min_word_length reruns just the
+    # affected analysis and export stages, docx parsing and tagging are reused from disk.
+    # Per-document extracted/cleaned text is also cached by content hash, so changed docx files are parsed alone.
+    # streaming=True: documents flow one at a time through sentence splitting, tagging and the on-disk corpus store,
+    # so peak memory is bounded by the largest document rather than the whole corpus.
+    # Sentences never span two documents in this mode, so results can differ slightly at document boundaries.
+    # incremental=True: per-document partial results are kept in a manifest, only added/changed/removed documents
+    # are processed and merged into (or subtracted from) the totals. Results are the same as streaming=True.
+    # pipelined=True: streaming, with docx parsing/cleaning, pure_text writing and tagging overlapped through
+    # bounded queues (see pipelined_extract_and_tag). Results are the same as streaming=True.
+
+    # Frequent fixed phrases of 2..phrase_max_length words (see PhraseMining.mine_phrases) are mined from the
+    # tagged corpus store and exported to phrases.xlsx; the incremental mode keeps no store, so it skips them.
+
+    # Per-document statistics (document frequency, dispersion, TF-IDF, per-season totals) are exported next to the
+    # word frequency sheet in every mode; the default mode takes document boundaries from pure_text_documents.json.
+    # collocation_capacity: approximate collocation counting for very large corpora. Each pattern tracks at most
+    # this many distinct phrases (HeavyHitters.SpaceSaving; in the incremental mode each document keeps its top
+    # phrases), and the per-pattern error bound is written next to the counts in collocations.xlsx.
+
+    # export_format: 'xlsx' (openpyxl write-only), 'csv' or 'parquet', results are written row by row.
+    # 'parquet' needs the optional pyarrow package; the format is checked before any processing starts.
+
+    # report_path: write a JSON run report with wall/CPU time, RSS at start/end plus the sampled in-stage peak
+    # (also for worker processes on Linux), item counts and the slowest documents of each stage.
+    # profile_stage: additionally dump a cProfile of that stage (e.g. 'tagging') into the directory.
+    # Without either, instrumentation is a no-op.
+
+    # executor / lemmatizer: a worker pool (see create_nlp_worker_pool) and a lemma cache shared between several
+    # corpora, see AnalyzeCorpora.py. The caller owns both: the pool is not shut down and the cache is not saved here.
+    # Returns a small summary of the corpus: sentence count and the word frequency dict.
+
+    # 导出在最后进行，格式无效或缺少 pyarrow 时在开始处理前就报错
+    check_export_format(export_format)
+
+    if report_path or profile_stage:
+        report = RunReport(directory, profile_stage=profile_stage,
+                           profile_path=os.path.join(directory, f'profile_{profile_stage}.prof'))
+    else:
+        report = NULL_REPORT
+
+    if incremental:
+        print('*' * 80)
+        print('Incrementally updating corpus analysis...')
+        sentences, frequency, collocations, term_matrix, error_bounds = incremental_analysis(
+            directory, workers=workers, keep_number=keep_number, remove_role=remove_role, use_cache=use_cache,
+            extractor=extractor, top_n=top_n, remove_stopwords=remove_stopwords, min_word_length=min_word_length,
+            lemmatize=lemmatize, report=report, executor=executor, lemmatizer=lemmatizer,
+            collocation_capacity=collocation_capacity)
+
+        with report.stage('export') as stage:
+            print('*' * 80)
+            print('Saving word frequency finished.')
+            save_sentences_and_word_frequency(sentences, frequency, directory, term_matrix=term_matrix,
+                                              export_format=export_format)
+            print('*' * 80)
+            print('Saving text collocations...')
+            save_collocations(collocations, directory, export_format=export_format,
+                              error_bounds=None if collocation_capacity is None else error_bounds)
+            stage.add('sentences', len(sentences))
+            stage.add('words', len(frequency))
+        sentence_count = len(sentences)
+    else:
+        graph = build_analysis_graph(directory, workers=workers, use_cache=use_cache, extractor=extractor,
+                                     streaming=streaming, pipelined=pipelined, keep_number=keep_number,
+                                     remove_role=remove_role, remove_stopwords=remove_stopwords,
+                                     min_word_length=min_word_length, lemmatize=lemmatize, top_n=top_n,
+                                     phrase_max_length=phrase_max_length, phrase_min_count=phrase_min_count,
+                                     collocation_capacity=collocation_capacity, export_format=export_format,
+                                     report=report,
+                                     executor=executor, lemmatizer=lemmatizer)
+        graph.run('export')
+        collocations = graph.run('collocations')['collocations']
+        sentence_count = graph.run('tagging').sentence_count()
+        frequency = graph.run('word_frequency')
 
-    print('*' * 80)
-    print('Loading word documents...')
-    full_text = load_pure_text(directory)
-    print(f'Load finished. Text length: {len(full_text)}')
+    dump_collocations(collocations)
 
-    print('*' * 80)
-    print('Start counting word frequency...')
-    sentences, frequency = count_word_frequency(full_text)
+    if report_path:
+        report.save(report_path)
+    return {'sentences': sentence_count, 'frequency': frequency}
 
-    print('*' * 80)
-    print('Saving word frequency finished.')
-    save_sentences_and_word_frequency(sentences, frequency, directory)
 
-    print('*' * 80)
-    print('Analyzing text collocations...')
-    collocations = analyze_collocations(full_text)
+def build_analysis_graph(directory: str, workers: int = 1, use_cache: bool = True, extractor: str = 'python-docx',
+                         streaming: bool = False, pipelined: bool = False, keep_number: bool = False,
+                         remove_role: bool = True, remove_stopwords: bool = True, min_word_length: int = 2, lemmatize: bool = True,
+                         top_n: int = 20, phrase_max_length: int = 6, phrase_min_count: int = 5,
+                         collocation_capacity: Optional[int] = None, export_format: str = 'xlsx',
+                         report=NULL_REPORT, executor=None,
+                         lemmatizer: Optional[CachedLemmatizer] = None) -> StageGraph:
+    """
+    构建完整分析流程的阶段图：
 
-    dump_collocations(collocations)
+        extract ──> tagging ──┬──> word_frequency ──┐
+           │                  ├──> term_matrix ─────┤
+           │                  ├──> collocations ────┼──> export
+           │                  ├──> phrases ─────────┤
+           └──────────────────┴──> speakers ────────┘
 
-    print('*' * 80)
-    print('Saving text collocations...')
-    save_collocations(collocations, directory)
+    每个阶段只以影响其结果的参数参与缓存键（workers、executor、use_cache、extractor 不影响结果），
+    extract 阶段的缓存键另外包含全部文档的内容哈希。
 
+    pipelined 为 True 时按 streaming 模式标注（缓存键与 streaming=True 相同）：extract 阶段同时完成标注
+    （见 pipelined_extract_and_tag），tagging 阶段直接使用其写入的语料存储；export 阶段同时写入各个文件。
+    """
+    streaming = streaming or pipelined
+    graph = StageGraph(os.path.join(directory, STAGE_CACHE_DIR), report=report)
+    word_params = {'remove_stopwords': remove_stopwords, 'min_word_length': min_word_length, 'lemmatize': lemmatize}
+
+    def document_fingerprint():
+        filenames = list_document_files(directory)
+        if use_cache:
+            cache = DocumentTextCache(os.path.join(directory, TEXT_CACHE_DIR))
+            digests = {filename: cache.content_hash(os.path.join(directory, filename)) for filename in filenames}
+            cache.save()
+        else:
+            digests = {filename: file_content_hash(os.path.join(directory, filename)) for filename in filenames}
+        return params_hash(digests)
+
+    def extract(keep_number, remove_role, stage):
+        print('*' * 80)
+        print('Loading word documents...')
+        if pipelined and load_tagged_corpus_store(directory, graph.key('tagging')) is None:
+            print('Tokenizing and POS tagging while loading...')
+            lemma_cache = lemmatizer or CachedLemmatizer(cache_path=LEMMA_CACHE_PATH)
+            # 缓存可能与其它语料共用，命中次数只统计本语料
+            stage_lemmatizer = lemma_cache.counting_view()
+            file_path = pipelined_extract_and_tag(directory, graph.key('tagging'), workers=workers,
+                                                  keep_number=keep_number, remove_role=remove_role,
+                                                  use_cache=use_cache, extractor=extractor, stage=stage,
+                                                  executor=executor, lemmatizer=stage_lemmatizer)
+            if lemmatizer is None:
+                lemma_cache.save()
+            stage.add('lemma_cache_hits', stage_lemmatizer.hits)
+            stage.add('lemma_cache_misses', stage_lemmatizer.misses)
+            print(f'Pure text is saved to: {file_path}')
+            return {'path': file_path, 'hash': file_content_hash(file_path)}
+        file_path = common_process_eng_docs_to_pure_text(directory, workers=workers, keep_number=keep_number,
+                                                         remove_role=remove_role, use_cache=use_cache,
+                                                         extractor=extractor, stage=stage, executor=executor)
+        print(f'Pure text is saved to: {file_path}')
+        return {'path': file_path, 'hash': file_content_hash(file_path)}
+
+    def load_extract(base_path):
+        # pure_text.txt 被修改或删除时缓存失效
+        result = load_json_artifact(base_path)
+        if file_content_hash(result['path']) != result['hash']:
+            raise ValueError('pure_text.txt 已改变')
+        if not os.path.exists(os.path.join(directory, PURE_TEXT_SPEAKERS_FILE)):
+            raise OSError(f'{PURE_TEXT_SPEAKERS_FILE} 不存在')
+        return result
+
+    def tagging(extracted, streaming, stage):
+        print('*' * 80)
+        print('Tokenizing and POS tagging text...')
+        # 分句、分词、词性标注只做一次，结果保存在 tagged_corpus 目录下，各项分析共用
+        source_hash = graph.key('tagging')
+        # 流水线模式下 extract 阶段已完成标注
+        store = load_tagged_corpus_store(directory, source_hash) if pipelined else None
+        if store is None:
+            lemma_cache = lemmatizer or CachedLemmatizer(cache_path=LEMMA_CACHE_PATH)
+            # 缓存可能与其它语料共用，命中次数只统计本语料
+            stage_lemmatizer = lemma_cache.counting_view()
+            if streaming:
+                tagged_documents = iter_tagged_documents(iter_pure_text_documents(directory), workers=workers,
+                                                         executor=executor)
+                # 出错时立即关闭生成器，取消已提交到（可能与其它语料共用的）进程池的任务
+                with closing(tagged_documents), \
+                        TaggedCorpusWriter(directory, source_hash, lemmatizer=stage_lemmatizer) as writer:
+                    for corpus in stage.timed(tagged_documents, lambda corpus: corpus.document_names[0]):
+                        writer.add(corpus)
+            else:
+                full_text = load_pure_text(directory)
+                print(f'Load finished. Text length: {len(full_text)}')
+                # 整个文本一起分句，同时按 pure_text_documents.json 保留文档边界（供文档级统计及检索使用）
+                corpus = build_tagged_corpus(full_text, workers=workers, executor=executor,
+                                             documents=pure_text_document_lengths(directory, len(full_text)))
+                save_tagged_corpus(corpus, directory, source_hash, lemmatizer=stage_lemmatizer)
+                del full_text, corpus
+            if lemmatizer is None:
+                lemma_cache.save()
+            store = TaggedCorpusStore(directory)
+            print(f'Lemma cache hit rate: {stage_lemmatizer.hit_rate:.1%} '
+                  f'({stage_lemmatizer.hits} hits, {stage_lemmatizer.misses} misses)')
+            stage.add('lemma_cache_hits', stage_lemmatizer.hits)
+            stage.add('lemma_cache_misses', stage_lemmatizer.misses)
+        # 同时建立关键词上下文检索用的倒排索引（见 Concordance.py）
+        ConcordanceIndex.build(store)
+        print(f'Tagging finished. Sentences: {store.sentence_count()}, tokens: {store.token_count()}')
+        stage.add('documents', len(store.document_names))
+        stage.add('sentences', store.sentence_count())
+        stage.add('tokens', store.token_count())
+        return store
+
+    def load_tagging(base_path):
+        # 语料存储本身保存在 tagged_corpus 目录下，以缓存键作为来源哈希校验
+        store = load_tagged_corpus_store(directory, graph.key('tagging'))
+        if store is None:
+            raise ValueError('语料存储不存在或已过期')
+        return store
+
+    def word_frequency(store, remove_stopwords, min_word_length, lemmatize, stage):
+        print('*' * 80)
+        print('Start counting word frequency...')
+        frequency = store.word_frequency(remove_stopwords, min_word_length, lemmatize)
+        stage.add('words', len(frequency))
+        stage.add('counted_tokens', sum(frequency.values()))
+        return frequency
+
+    def term_matrix(store, remove_stopwords, min_word_length, lemmatize, stage):
+        print('*' * 80)
+        if store.document_names == ['']:
+            # 只有 pure_text_documents.json 缺失或与 pure_text.txt 不一致时才会没有文档边界
+            print('No document boundaries in the corpus store, skipping per-document statistics.')
+            return None
+        print('Building document-term matrix...')
+        matrix = TermMatrix.from_store(store, remove_stopwords, min_word_length, lemmatize)
+        print(f'Documents: {matrix.shape[0]}, terms: {matrix.shape[1]}')
+        stage.add('documents', matrix.shape[0])
+        stage.add('terms', matrix.shape[1])
+        return matrix
+
+    def save_term_matrix(matrix, base_path):
+        if matrix is None:
+            save_json_artifact(None, base_path)
+        else:
+            matrix.save(base_path)
+
+    def load_term_matrix(base_path):
+        return TermMatrix.load(base_path) if os.path.exists(base_path + '.npz') else load_json_artifact(base_path)
+
+    def collocations(store, top_n, capacity, stage):
+        print('*' * 80)
+        print('Analyzing text collocations...')
+        match_counts = Counter()
+        error_bounds = {}
+        result = store.analyze_collocations(top_n=top_n, match_counts=match_counts, capacity=capacity,
+                                            error_bounds=error_bounds)
+        stage.add('matches', sum(match_counts.values()))
+        stage.add('phrases', sum(len(phrases) for phrases in result.values()))
+        # 精确统计时不导出误差上限
+        return {'collocations': result, 'error_bounds': None if capacity is None else error_bounds}
+
+    def phrases(store, max_length, min_count, stage):
+        print('*' * 80)
+        print('Mining frequent phrases...')
+        result = mine_phrases(store, max_length=max_length, min_count=min_count)
+        stage.add('phrases', len(result))
+        return result
+
+    def speakers(extracted, store, remove_stopwords, min_word_length, lemmatize, top_n, stage):
+        names, document_speakers = load_pure_text_speakers(directory)
+        if not names:
+            return None
+        print('*' * 80)
+        document_index = load_pure_text_index(directory)
+        if document_index is None:
+            # 没有文档索引时 iter_pure_text_documents 把整个文件作为一个无名文档，无法对应各文档每行的说话人
+            print(f'{PURE_TEXT_INDEX_FILE} is missing or out of date, skipping speaker statistics.')
+            return None
+        print('Counting words and collocations by speaker...')
+        # 按文档分句的存储逐个文档读取（内存中只保留当前文档）；不转换换行符，各文档的行与解析时一致
+        per_document = streaming and [name for name, _, _ in document_index] == list(store.document_names)
+        sentence_speaker = store_sentence_speakers(store, iter_pure_text_documents(directory, newline=''),
+                                                   document_speakers, per_document=per_document)
+        line_counts = Counter(speaker for line_speakers in document_speakers.values()
+                              for speaker in line_speakers if speaker >= 0)
+        result = speaker_statistics(store, sentence_speaker, names, line_counts, remove_stopwords=remove_stopwords,
+                                    min_word_length=min_word_length, lemmatize=lemmatize, top_n=top_n)
+        print(f'Speakers: {len(names)}')
+        stage.add('speakers', len(names))
+        stage.add('attributed_sentences', int((sentence_speaker >= 0).sum()))
+        return result
+
+    def export(store, frequency, matrix, collocation_result, phrase_result, speaker_result, export_format, stage):
+        print('*' * 80)
+        print('Saving word frequency finished.')
+        # 各文件依次写入：openpyxl 写入受 GIL 限制，在线程中同时写入没有测得加速，输出也会交错
+        paths = save_sentences_and_word_frequency(store.iter_sentences(), frequency, directory, term_matrix=matrix,
+                                                  export_format=export_format)
+        print('*' * 80)
+        print('Saving text collocations...')
+        paths += save_collocations(collocation_result['collocations'], directory, export_format=export_format,
+                                   error_bounds=collocation_result['error_bounds'])
+        paths += save_phrases(phrase_result, directory, export_format=export_format)
+        paths += save_speakers(speaker_result, directory, export_format=export_format)
+        stage.add('sentences', store.sentence_count())
+        stage.add('words', len(frequency))
+        return {'paths': paths}
+
+    def load_export(base_path):
+        # 导出的文件被删除时重新导出
+        result = load_json_artifact(base_path)
+        for path in result['paths']:
+            if not os.path.exists(path):
+                raise OSError(f'{path} 不存在')
+        return result
+
+    graph.add(Stage('extract', extract, params={'keep_number': keep_number, 'remove_role': remove_role},
+                    fingerprint=document_fingerprint, load=load_extract, version=CLEAN_TEXT_VERSION, with_record=True))
+    graph.add(Stage('tagging', tagging, inputs=['extract'], params={'streaming': streaming},
+                    save=lambda store, base_path: save_json_artifact({}, base_path), load=load_tagging,
+                    version=CORPUS_STORE_VERSION, with_record=True))
+    graph.add(Stage('word_frequency', word_frequency, inputs=['tagging'], params=word_params, with_record=True))
+    graph.add(Stage('term_matrix', term_matrix, inputs=['tagging'], params=word_params,
+                    save=save_term_matrix, load=load_term_matrix, with_record=True))
+    # version 2: 结果中加入误差上限
+    graph.add(Stage('collocations', collocations, inputs=['tagging'],
+                    params={'top_n': top_n, 'capacity': collocation_capacity}, version=2, with_record=True))
+    graph.add(Stage('phrases', phrases, inputs=['tagging'],
+                    params={'max_length': phrase_max_length, 'min_count': phrase_min_count}, with_record=True))
+    graph.add(Stage('speakers', speakers, inputs=['extract', 'tagging'], params=dict(word_params, top_n=top_n),
+                    with_record=True))
+    graph.add(Stage('export', export, inputs=['tagging', 'word_frequency', 'term_matrix', 'collocations', 'phrases',
+                                              'speakers'],
+                    params={'export_format': export_format}, load=load_export, with_record=True))
+    return graph
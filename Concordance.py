@@ -0,0 +1,180 @@
+import os
+import json
+import argparse
+import numpy as np
+from typing import List, Optional, Tuple
+
+from CorpusStore import TaggedCorpusStore, normalize_word, join_tokens
+
+
+CONCORDANCE_VERSION = 1
+# 索引文件保存在语料存储目录（tagged_corpus）下
+CONCORDANCE_META_FILE = 'concordance.json'
+# 检索方式：词元、词形
+INDEX_TYPES = ('lemma', 'surface')
+
+
+def _postings(keys: np.ndarray, key_count: int) -> Tuple[np.ndarray, np.ndarray]:
+    # 按检索键稳定排序的词下标（同一个键的出现位置保持先后顺序），及每个键的起止位置
+    position_dtype = np.int32 if len(keys) < np.iinfo(np.int32).max else np.int64
+    positions = np.argsort(keys, kind='stable').astype(position_dtype)
+    offsets = np.zeros(key_count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=key_count), out=offsets[1:])
+    return positions, offsets
+
+
+class ConcordanceIndex:
+    """
+    语料的倒排索引：词元（lemma）或词形（surface，小写并去除标点）-> 全部出现位置，用于关键词上下文（KWIC）检索。
+
+    出现位置是词在整个语料中的下标，按先后排序；所在的文档、句子及句中位置由存储中的偏移数组二分查找得到。
+    索引以 .npy 保存在语料存储目录下，以内存映射方式加载，查询只读取该词的出现位置及其上下文，
+    与语料规模基本无关。
+
+    用法：
+        index = load_concordance_index('Friends')
+        for document, sentence, left, keyword, right in index.kwic('know', limit=20):
+            print(f'{left} [{keyword}] {right}')
+
+    Args:
+        store: 语料存储。
+        mmap_mode: 索引数组的加载方式，同 np.load。
+    """
+
+    def __init__(self, store: TaggedCorpusStore, mmap_mode: str = 'r'):
+        self.store = store
+        with open(os.path.join(store.store_path, CONCORDANCE_META_FILE), 'rt', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != CONCORDANCE_VERSION or meta.get('source_hash') != store.source_hash \
+                or meta.get('token_count') != store.token_count():
+            raise ValueError('倒排索引与语料存储不一致')
+        self._arrays = {}
+        for by in INDEX_TYPES:
+            for name in ('positions', 'offsets'):
+                self._arrays[(by, name)] = np.load(os.path.join(store.store_path, f'concordance_{by}_{name}.npy'),
+                                                   mmap_mode=mmap_mode)
+        self._word_ids = None
+
+    @staticmethod
+    def build(store: TaggedCorpusStore) -> 'ConcordanceIndex':
+        """
+        为语料存储建立索引并保存。建立的耗时主要是对全部词按键排序（NumPy，百万词约0.1秒）。
+        """
+        token_ids = np.asarray(store.token_ids)
+        keys = {
+            'lemma': np.asarray(store.lemma_ids),
+            'surface': np.asarray(store.vocab_norm_ids)[token_ids],
+        }
+        for by, by_keys in keys.items():
+            positions, offsets = _postings(by_keys, len(store.vocabulary))
+            np.save(os.path.join(store.store_path, f'concordance_{by}_positions.npy'), positions)
+            np.save(os.path.join(store.store_path, f'concordance_{by}_offsets.npy'), offsets)
+        # 元数据最后写入，作为索引完整可用的标志
+        with open(os.path.join(store.store_path, CONCORDANCE_META_FILE), 'wt', encoding='utf-8') as f:
+            json.dump({'version': CONCORDANCE_VERSION, 'source_hash': store.source_hash,
+                       'token_count': store.token_count()}, f)
+        return ConcordanceIndex(store)
+
+    def _word_id(self, word: str) -> Optional[int]:
+        # 词元和归一化形式都在词表中，检索键即其在词表中的编号
+        if self._word_ids is None:
+            self._word_ids = {word: word_id for word_id, word in enumerate(self.store.vocabulary)}
+        return self._word_ids.get(normalize_word(word))
+
+    def positions(self, word: str, by: str = 'lemma') -> np.ndarray:
+        """
+        词在语料中的全部出现位置（词下标，按先后排序）
+
+        Args:
+            word: 要检索的词。按词元检索时应为词元形式（如 'go' 可检索到 went、going）。
+            by: 'lemma'（词元）或 'surface'（词形，不区分大小写）。
+        """
+        if by not in INDEX_TYPES:
+            raise ValueError(f"不支持的检索方式: {by}，可选: {', '.join(INDEX_TYPES)}")
+        word_id = self._word_id(word)
+        if word_id is None:
+            return np.empty(0, dtype=np.int64)
+        offsets = self._arrays[(by, 'offsets')]
+        return np.asarray(self._arrays[(by, 'positions')][offsets[word_id]:offsets[word_id + 1]])
+
+    def count(self, word: str, by: str = 'lemma') -> int:
+        return len(self.positions(word, by))
+
+    def postings(self, word: str, by: str = 'lemma', limit: Optional[int] = None) -> List[Tuple[str, int, int]]:
+        """
+        词的出现位置，以 (文档名, 句子序号, 句中位置) 表示；句子序号为在整个语料（store.sentences）中的序号
+        """
+        positions = self.positions(word, by)[:limit]
+        sentence_offsets = self.store.sentence_offsets
+        sentence_ids = np.searchsorted(sentence_offsets, positions, side='right') - 1
+        document_ids = np.searchsorted(self.store.document_offsets, sentence_ids, side='right') - 1
+        return [(self.store.document_names[document_id], sentence_id, position - int(sentence_offsets[sentence_id]))
+                for document_id, sentence_id, position in zip(document_ids.tolist(), sentence_ids.tolist(),
+                                                               positions.tolist())]
+
+    def kwic(self, word: str, by: str = 'lemma', width: int = 6,
+             limit: Optional[int] = None) -> List[Tuple[str, int, str, str, str]]:
+        """
+        关键词上下文：每次出现前后各 width 个词（不超出所在句子）。
+
+        Returns:
+            List[Tuple[str, int, str, str, str]]: (文档名, 句子序号, 左侧上下文, 关键词原文, 右侧上下文)。
+        """
+        vocabulary = self.store.vocabulary
+        # np.memmap 的每次切片都会创建新的 memmap 对象，转为普通数组视图（不复制数据）后切片更快
+        token_ids = np.asarray(self.store.token_ids)
+        sentence_offsets = np.asarray(self.store.sentence_offsets)
+        lines = []
+        for document, sentence_id, offset in self.postings(word, by, limit):
+            sentence_start = int(sentence_offsets[sentence_id])
+            position = sentence_start + offset
+            left_start = max(sentence_start, position - width)
+            right_end = min(int(sentence_offsets[sentence_id + 1]), position + 1 + width)
+            left = [vocabulary[i] for i in token_ids[left_start:position].tolist()]
+            right = [vocabulary[i] for i in token_ids[position + 1:right_end].tolist()]
+            lines.append((document, sentence_id, join_tokens(left), vocabulary[int(token_ids[position])],
+                          join_tokens(right)))
+        return lines
+
+    def example_sentences(self, word: str, by: str = 'lemma', limit: Optional[int] = 10) -> List[str]:
+        """
+        包含该词的例句（完整句子原文，同一句子只出现一次）
+        """
+        sentences = self.store.sentences
+        sentence_ids = dict.fromkeys(sentence_id for _, sentence_id, _ in self.postings(word, by))
+        return [sentences[sentence_id] for sentence_id in list(sentence_ids)[:limit]]
+
+
+def load_concordance_index(directory: str, store: Optional[TaggedCorpusStore] = None) -> ConcordanceIndex:
+    """
+    加载语料目录的倒排索引；索引不存在或已过期时根据语料存储重新建立。
+
+    Raises:
+        OSError, ValueError: 语料存储不存在（需要先运行 common_flow）。
+    """
+    store = store if store is not None else TaggedCorpusStore(directory)
+    try:
+        return ConcordanceIndex(store)
+    except (OSError, ValueError, KeyError):
+        return ConcordanceIndex.build(store)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='在已分析的语料中检索单词的上下文（KWIC）')
+    parser.add_argument('directory', help='语料目录（需要先运行分析）')
+    parser.add_argument('words', nargs='+', help='要检索的词')
+    parser.add_argument('--surface', action='store_true', help='按词形检索，默认按词元检索')
+    parser.add_argument('--width', type=int, default=6, help='左右两侧的上下文词数')
+    parser.add_argument('--limit', type=int, default=20, help='每个词最多显示的条数')
+    args = parser.parse_args()
+
+    index = load_concordance_index(args.directory)
+    by = 'surface' if args.surface else 'lemma'
+    for word in args.words:
+        print(f'{word}: {index.count(word, by)} 次')
+        for document, _, left, keyword, right in index.kwic(word, by, args.width, args.limit):
+            print(f'{left:>60} [{keyword}] {right:<60} {document}')
+
+
+if __name__ == '__main__':
+    main()
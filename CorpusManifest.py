@@ -0,0 +1,252 @@
+import os
+import json
+import heapq
+from typing import Dict, List, Optional
+
+from HeavyHitters import top_n_items
+from EnglishAnalysisTools import (TaggedCorpus, CachedLemmatizer, COLLOCATION_PATTERNS, PosPatternMatcher,
+                                  count_word_frequency)
+
+
+# 清单或部分结果的格式发生变化时递增此版本号，旧清单将被视为过期并全部重新计算
+MANIFEST_VERSION = 2
+MANIFEST_DIR = os.path.join('.cache', 'manifest')
+
+
+def document_partial_result(corpus: TaggedCorpus, lemmatizer: Optional[CachedLemmatizer] = None,
+                            patterns=None, remove_stopwords: bool = True, min_word_length: int = 2,
+                            lemmatize: bool = True, capacity: Optional[int] = None) -> dict:
+    """
+    计算单个文档的部分结果：句子、词频及全部搭配的计数（不截取 top_n，以便合并）。
+    词频的过滤及词形还原参数与 count_word_frequency 相同。
+
+    capacity 指定时每种模式只保留该文档最常见的 capacity 个短语，清单的大小不再随短语种类增长；
+    被舍去的短语的最大次数记入 'collocation_errors'，合并后的次数偏小，但不超过各文档的该值之和。
+
+    Returns:
+        dict: {'sentences': [...], 'word_counts': {词: 次数}, 'collocations': {模式描述: {短语: 次数}},
+               'collocation_errors': {模式描述: 次数}}，字典均按首次出现的先后排序。
+    """
+    sentences, word_counts = count_word_frequency(corpus, remove_stopwords=remove_stopwords,
+                                                  min_word_length=min_word_length, lemmatize=lemmatize,
+                                                  lemmatizer=lemmatizer)
+    matcher = PosPatternMatcher(COLLOCATION_PATTERNS if patterns is None else patterns)
+    collocations = matcher.count_matches(corpus.iter_tagged_tokens())
+    errors = {}
+    if capacity is not None:
+        for desc, counter in collocations.items():
+            ranked = top_n_items(counter, capacity + 1)
+            if len(ranked) > capacity:
+                kept = {phrase for phrase, _ in ranked[:capacity]}
+                collocations[desc] = {phrase: count for phrase, count in counter.items() if phrase in kept}
+                errors[desc] = ranked[capacity][1]
+    return {
+        'sentences': sentences,
+        'word_counts': word_counts,
+        'collocations': {desc: dict(counter) for desc, counter in collocations.items()},
+        'collocation_errors': errors,
+    }
+
+
+def _merge_counts(total: Dict[str, int], part: Dict[str, int], sign: int = 1):
+    # 加上（sign=1）或减去（sign=-1）部分计数，计数归零的项被删除
+    for key, count in part.items():
+        value = total.get(key, 0) + sign * count
+        if value > 0:
+            total[key] = value
+        else:
+            total.pop(key, None)
+
+
+class CorpusManifest:
+    """
+    语料清单：记录每个文档的内容哈希，每个文档的部分结果（句子、词频、搭配计数）单独保存，
+    清单中保存全部文档部分结果之和。
+
+    文档新增、修改或删除时，只需减去旧的部分结果、加上新的部分结果，无需重新处理其它文档。
+
+    目录结构（directory/.cache/manifest 下）：
+        manifest.json                   参数摘要、文档顺序及哈希、合计的句子数/词频/搭配计数
+        <hash>.json                     单个文档的部分结果（哈希为文档内容哈希）
+    """
+
+    MANIFEST_FILE = 'manifest.json'
+
+    def __init__(self, directory: str, params_key: str = ''):
+        self.manifest_dir = os.path.join(directory, MANIFEST_DIR)
+        os.makedirs(self.manifest_dir, exist_ok=True)
+        self.params_key = params_key
+        self.reset()
+        self._load()
+
+    def reset(self):
+        """
+        清空清单，之后所有文档都需要重新处理
+        """
+        self.documents = {}             # 文件名 -> 文档内容哈希
+        self.order = []                 # 文档顺序，与结果中句子的顺序一致
+        self.sentence_count = 0
+        self.word_counts = {}
+        self.collocation_counts = {}
+        self.collocation_errors = {}    # 模式描述 -> 各文档舍去的短语次数之和（见 document_partial_result）
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.manifest_dir, self.MANIFEST_FILE), 'rt', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return
+        # 版本或分析参数不同时，已有的部分结果不可复用
+        if manifest.get('version') != MANIFEST_VERSION or manifest.get('params') != self.params_key:
+            return
+        self.documents = manifest['documents']
+        self.order = manifest['order']
+        self.sentence_count = manifest['sentence_count']
+        self.word_counts = manifest['word_counts']
+        self.collocation_counts = manifest['collocation_counts']
+        self.collocation_errors = manifest['collocation_errors']
+
+    def save(self):
+        manifest_path = os.path.join(self.manifest_dir, self.MANIFEST_FILE)
+        temp_path = manifest_path + '.tmp'
+        with open(temp_path, 'wt', encoding='utf-8') as f:
+            json.dump({
+                'version': MANIFEST_VERSION,
+                'params': self.params_key,
+                'documents': self.documents,
+                'order': self.order,
+                'sentence_count': self.sentence_count,
+                'word_counts': self.word_counts,
+                'collocation_counts': self.collocation_counts,
+                'collocation_errors': self.collocation_errors,
+            }, f, ensure_ascii=False)
+        os.replace(temp_path, manifest_path)
+
+    def _partial_path(self, digest: str) -> str:
+        return os.path.join(self.manifest_dir, f'{digest}.json')
+
+    def load_partial(self, filename: str) -> dict:
+        with open(self._partial_path(self.documents[filename]), 'rt', encoding='utf-8') as f:
+            return json.load(f)
+
+    def diff(self, digests: Dict[str, str]):
+        """
+        与当前文档比较。
+
+        Args:
+            digests: 当前的 文件名 -> 文档内容哈希。
+
+        Returns:
+            Tuple[List[str], List[str]]: (需要重新处理的新增或修改的文档, 已删除的文档)
+        """
+        changed = [filename for filename, digest in digests.items() if self.documents.get(filename) != digest]
+        removed = [filename for filename in self.documents if filename not in digests]
+        return changed, removed
+
+    def _apply(self, partial: dict, sign: int):
+        self.sentence_count += sign * len(partial['sentences'])
+        _merge_counts(self.word_counts, partial['word_counts'], sign)
+        for desc, counts in partial['collocations'].items():
+            _merge_counts(self.collocation_counts.setdefault(desc, {}), counts, sign)
+        _merge_counts(self.collocation_errors, partial['collocation_errors'], sign)
+
+    def remove(self, filename: str):
+        """
+        减去文档的部分结果并从清单中移除
+        """
+        if filename not in self.documents:
+            return
+        # 部分结果文件丢失或损坏时抛出 OSError/ValueError，调用者应 reset() 后全部重新处理
+        partial = self.load_partial(filename)
+        self._apply(partial, -1)
+        del self.documents[filename]
+        self.order.remove(filename)
+
+    def add(self, filename: str, digest: str, partial: dict):
+        """
+        保存文档的部分结果并加到合计中（同名文档已存在时先减去旧结果）
+        """
+        self.remove(filename)
+        partial_path = self._partial_path(digest)
+        with open(partial_path + '.tmp', 'wt', encoding='utf-8') as f:
+            json.dump(partial, f, ensure_ascii=False)
+        os.replace(partial_path + '.tmp', partial_path)
+        self._apply(partial, 1)
+        self.documents[filename] = digest
+        self.order.append(filename)
+
+    def reorder(self, filenames: List[str]):
+        """
+        按给定的文件顺序排列文档（不在清单中的文件被忽略）
+        """
+        self.order = [filename for filename in filenames if filename in self.documents]
+
+    def prune(self):
+        """
+        删除不再被清单引用的部分结果文件
+        """
+        live = {f'{digest}.json' for digest in self.documents.values()} | {self.MANIFEST_FILE}
+        for entry_name in os.listdir(self.manifest_dir):
+            if entry_name not in live:
+                os.remove(os.path.join(self.manifest_dir, entry_name))
+
+    def iter_partials(self):
+        for filename in self.order:
+            yield self.load_partial(filename)
+
+    def sentences(self) -> List[str]:
+        """
+        按文档顺序合并全部文档的句子
+        """
+        sentences = []
+        for partial in self.iter_partials():
+            sentences.extend(partial['sentences'])
+        return sentences
+
+    def top_collocations(self, top_n: int = 20) -> Dict[str, List]:
+        """
+        从合计计数中取每种模式最常见的 top_n 个搭配。
+
+        与对整个语料调用 analyze_collocations 的结果相同：频率相同时按首次出现的先后排序。
+        只有频率达到第 top_n 名的候选短语需要确定首次出现的位置，按文档顺序读取部分结果，
+        找齐后即停止。
+        """
+        # 模式描述 -> 候选短语集合
+        candidates = {}
+        for desc, counts in self.collocation_counts.items():
+            # 与 Counter.most_common(0) 一致，top_n <= 0 时每种模式的结果为空
+            if not counts or top_n <= 0:
+                continue
+            threshold = heapq.nlargest(top_n, counts.values())[-1]
+            candidates[desc] = {phrase for phrase, count in counts.items() if count >= threshold}
+
+        # 短语首次出现的位置：(文档序号, 文档内的先后)
+        first_seen = {desc: {} for desc in candidates}
+        remaining = sum(len(phrases) for phrases in candidates.values())
+        if remaining:
+            for document_index, partial in enumerate(self.iter_partials()):
+                for desc, counts in partial['collocations'].items():
+                    if desc not in candidates:
+                        continue
+                    for position, phrase in enumerate(counts):
+                        if phrase in candidates[desc] and phrase not in first_seen[desc]:
+                            first_seen[desc][phrase] = (document_index, position)
+                            remaining -= 1
+                if remaining == 0:
+                    break
+
+        top_collocations = {}
+        for desc in self.collocation_counts:
+            counts = self.collocation_counts[desc]
+            ranked = sorted(candidates.get(desc, ()), key=lambda phrase: (-counts[phrase], first_seen[desc][phrase]))
+            top_collocations[desc] = [(phrase, counts[phrase]) for phrase in ranked[:top_n]]
+        return top_collocations
+
+    def collocation_error_bounds(self) -> Dict[str, int]:
+        """
+        每种模式合计次数的误差上限（合计次数最多比真实次数小这么多），0 表示精确
+        """
+        return {desc: self.collocation_errors.get(desc, 0) for desc in self.collocation_counts}
+
+    def word_frequency(self) -> Dict[str, int]:
+        return dict(self.word_counts)
@@ -0,0 +1,442 @@
+import os
+import json
+import string
+import numpy as np
+from collections import Counter
+from typing import Dict, Iterator, Optional
+from nltk.corpus import stopwords
+
+from HeavyHitters import SpaceSaving
+from EnglishAnalysisTools import (TaggedCorpus, PosPatternMatcher, CachedLemmatizer, COLLOCATION_PATTERNS,
+                                  is_valid_word, ptb_to_wn_tag, get_default_lemmatizer, ensure_nlp_data)
+
+
+# 存储格式发生变化时递增此版本号，旧格式的存储将被视为过期
+# 2: 整体分句（非 streaming）的存储也按文档划分
+CORPUS_STORE_VERSION = 2
+CORPUS_STORE_DIR = 'tagged_corpus'
+
+_PUNCTUATION_TRANSLATOR = str.maketrans('', '', string.punctuation)
+
+
+def normalize_word(word: str) -> str:
+    """
+    与 count_word_frequency 相同的单词归一化：转换为小写并去除标点符号
+    """
+    return word.lower().translate(_PUNCTUATION_TRANSLATOR)
+
+
+def join_tokens(words) -> str:
+    """
+    将分词结果拼接为可读的文本，并还原分词时拆开的缩写：do n't -> don't，it 's -> it's
+    """
+    text = ''
+    for word in words:
+        text += word if not text or word.startswith("'") or word.lower() == "n't" else ' ' + word
+    return text
+
+
+class _Vocabulary:
+    """
+    字符串驻留表：每个不同的字符串只保存一次，以整数编号引用
+    """
+
+    def __init__(self, words=()):
+        self.words = list(words)
+        self.ids = {word: index for index, word in enumerate(self.words)}
+
+    def intern(self, word: str) -> int:
+        word_id = self.ids.get(word)
+        if word_id is None:
+            word_id = self.ids[word] = len(self.words)
+            self.words.append(word)
+        return word_id
+
+    def __len__(self):
+        return len(self.words)
+
+
+class TaggedCorpusWriter:
+    """
+    逐个文档追加写入语料存储（格式见 save_tagged_corpus）。
+
+    每个文档的词编号、标签编号、词元编号写入临时的二进制文件后即被释放，内存中只保留词表
+    以及（词, 标签）-> 词元 的映射，因此写入任意大的语料时内存占用只与最大的单个文档相当。
+
+    用法：
+        with TaggedCorpusWriter(directory, source_hash) as writer:
+            for corpus in iter_tagged_documents(documents):
+                writer.add(corpus)
+    """
+
+    # 临时二进制文件名 -> 数据类型
+    ARRAYS = {
+        'token_ids': np.int32,
+        'tag_ids': np.uint8,
+        'lemma_ids': np.int32,
+        'sentence_offsets': np.int64,
+    }
+
+    def __init__(self, directory: str, source_hash: str = '', lemmatizer: CachedLemmatizer = None):
+        self.store_path = os.path.join(directory, CORPUS_STORE_DIR)
+        os.makedirs(self.store_path, exist_ok=True)
+        # 先删除 meta.json，写入中途中断时存储被视为不完整
+        meta_path = os.path.join(self.store_path, 'meta.json')
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+
+        self.source_hash = source_hash
+        self.lemmatizer = lemmatizer if lemmatizer is not None else get_default_lemmatizer()
+        self.vocabulary = _Vocabulary()
+        self.tags = _Vocabulary()
+        self.document_names = []
+        self.document_offsets = []
+        self.sentence_count = 0
+        self.token_count = 0
+        # 词元按（词编号, 标签编号）组合去重后计算，而不是逐词计算
+        self._pair_lemma_ids = {}
+        self._files = {name: open(self._temp_path(name), 'wb') for name in self.ARRAYS}
+        self._sentences_file = open(os.path.join(self.store_path, 'sentences.txt'), 'wt', encoding='utf-8')
+
+    def _temp_path(self, name: str) -> str:
+        return os.path.join(self.store_path, name + '.bin')
+
+    def _lemma_id(self, word_id: int, tag_id: int) -> int:
+        lemma_id = self._pair_lemma_ids.get((word_id, tag_id))
+        if lemma_id is None:
+            norm = normalize_word(self.vocabulary.words[word_id])
+            wn_tag = ptb_to_wn_tag(self.tags.words[tag_id]) if norm else None
+            lemma_id = self.vocabulary.intern(self.lemmatizer.lemmatize(norm, pos=wn_tag) if wn_tag else norm)
+            self._pair_lemma_ids[(word_id, tag_id)] = lemma_id
+        return lemma_id
+
+    def add(self, corpus: TaggedCorpus):
+        """
+        追加一个（或一批）文档的标注结果。
+        """
+        if not corpus.tagged:
+            raise ValueError("只能保存经过词性标注的 TaggedCorpus")
+
+        for name, offset in zip(corpus.document_names, corpus.document_offsets):
+            self.document_names.append(name)
+            self.document_offsets.append(self.sentence_count + offset)
+
+        token_ids, tag_ids, lemma_ids, sentence_offsets = [], [], [], []
+        for tagged_words in corpus.tagged_sentences:
+            sentence_offsets.append(self.token_count + len(token_ids))
+            for word, tag in tagged_words:
+                word_id = self.vocabulary.intern(word)
+                tag_id = self.tags.intern(tag)
+                token_ids.append(word_id)
+                tag_ids.append(tag_id)
+                lemma_ids.append(self._lemma_id(word_id, tag_id))
+        if len(self.tags) > np.iinfo(np.uint8).max:
+            raise ValueError(f"词性标签过多: {len(self.tags)}")
+
+        for name, values in (('token_ids', token_ids), ('tag_ids', tag_ids),
+                             ('lemma_ids', lemma_ids), ('sentence_offsets', sentence_offsets)):
+            np.array(values, dtype=self.ARRAYS[name]).tofile(self._files[name])
+        for sentence in corpus.sentences:
+            self._sentences_file.write(('\n' if self.sentence_count else '') + sentence)
+            self.sentence_count += 1
+        self.token_count += len(token_ids)
+
+    def _close_files(self):
+        for f in self._files.values():
+            f.close()
+        self._sentences_file.close()
+
+    def _convert_to_npy(self, name: str, chunk_size: int = 1 << 22):
+        # 分块从临时二进制文件复制到 .npy，避免把整个数组读入内存
+        temp_path = self._temp_path(name)
+        dtype = self.ARRAYS[name]
+        npy_path = os.path.join(self.store_path, name + '.npy')
+        length = os.path.getsize(temp_path) // np.dtype(dtype).itemsize
+        if length == 0:
+            np.save(npy_path, np.empty(0, dtype=dtype))
+        else:
+            source = np.memmap(temp_path, dtype=dtype, mode='r', shape=(length,))
+            target = np.lib.format.open_memmap(npy_path, mode='w+', dtype=dtype, shape=(length,))
+            for begin in range(0, length, chunk_size):
+                target[begin:begin + chunk_size] = source[begin:begin + chunk_size]
+            target.flush()
+            del source, target
+        os.remove(temp_path)
+
+    def close(self) -> str:
+        """
+        完成写入：生成 .npy 文件、词表及 meta.json。
+
+        Returns:
+            str: 存储目录路径。
+        """
+        # 末尾附加总词数
+        np.array([self.token_count], dtype=self.ARRAYS['sentence_offsets']).tofile(self._files['sentence_offsets'])
+        self._close_files()
+        for name in self.ARRAYS:
+            self._convert_to_npy(name)
+
+        # 归一化形式也会加入词表，循环直到覆盖所有新增项
+        norm_ids = []
+        while len(norm_ids) < len(self.vocabulary):
+            norm_ids.append(self.vocabulary.intern(normalize_word(self.vocabulary.words[len(norm_ids)])))
+        np.save(os.path.join(self.store_path, 'vocab_norm_ids.npy'), np.array(norm_ids, dtype=np.int32))
+        np.save(os.path.join(self.store_path, 'document_offsets.npy'),
+                np.array(self.document_offsets + [self.sentence_count], dtype=np.int64))
+
+        with open(os.path.join(self.store_path, 'vocabulary.json'), 'wt', encoding='utf-8') as f:
+            json.dump(self.vocabulary.words, f, ensure_ascii=False)
+        # meta.json 最后写入，作为存储完整可用的标志
+        with open(os.path.join(self.store_path, 'meta.json'), 'wt', encoding='utf-8') as f:
+            json.dump({
+                'version': CORPUS_STORE_VERSION,
+                'source_hash': self.source_hash,
+                'tags': self.tags.words,
+                'document_names': self.document_names,
+            }, f, ensure_ascii=False, indent=1)
+        return self.store_path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # 出错时不写 meta.json，留下的不完整存储会在下次加载时被视为不存在
+            self._close_files()
+        return False
+
+
+def save_tagged_corpus(corpus: TaggedCorpus, directory: str, source_hash: str = '',
+                       lemmatizer: CachedLemmatizer = None) -> str:
+    """
+    将 TaggedCorpus 保存为紧凑的磁盘格式（保存在 directory/tagged_corpus 下）：
+
+        meta.json                版本、来源文本哈希、文档名、词性标签表
+        vocabulary.json          驻留的词表（单词、归一化形式及词元共用）
+        sentences.txt            句子，每行一句
+        token_ids.npy            int32，每个词在词表中的编号
+        tag_ids.npy              uint8，每个词的词性标签编号
+        lemma_ids.npy            int32，每个词归一化并词形还原后的形式在词表中的编号
+        vocab_norm_ids.npy       int32，词表中每一项归一化（小写、去标点）后的形式在词表中的编号
+        sentence_offsets.npy     int64，每个句子第一个词的下标（末尾附加总词数）
+        document_offsets.npy     int64，每个文档第一个句子的下标（末尾附加总句数）
+
+    Args:
+        corpus: 经过词性标注的 TaggedCorpus。
+        directory: 语料目录（与 pure_text.txt 同一目录）。
+        source_hash: 来源文本的哈希，用于判断存储是否过期。
+        lemmatizer: 计算词元使用的 CachedLemmatizer 或其 counting_view()（可选，默认为进程内共享的缓存）。
+
+    Returns:
+        str: 存储目录路径。
+    """
+    if not corpus.tagged:
+        raise ValueError("只能保存经过词性标注的 TaggedCorpus")
+    with TaggedCorpusWriter(directory, source_hash, lemmatizer=lemmatizer) as writer:
+        writer.add(corpus)
+    return writer.store_path
+
+
+class TaggedCorpusStore:
+    """
+    以内存映射方式加载 save_tagged_corpus 保存的语料。
+
+    词、标签、词元均以整数数组表示，分析直接在数组上进行（NumPy 向量化统计），
+    不需要为每个词创建 Python 对象。
+    """
+
+    def __init__(self, directory: str, mmap_mode: str = 'r'):
+        self.store_path = os.path.join(directory, CORPUS_STORE_DIR)
+        with open(os.path.join(self.store_path, 'meta.json'), 'rt', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != CORPUS_STORE_VERSION:
+            raise ValueError(f"不支持的语料存储版本: {self.meta.get('version')}")
+        with open(os.path.join(self.store_path, 'vocabulary.json'), 'rt', encoding='utf-8') as f:
+            self.vocabulary = json.load(f)
+        self.tag_names = self.meta['tags']
+        self.document_names = self.meta['document_names']
+
+        def load(name):
+            return np.load(os.path.join(self.store_path, name), mmap_mode=mmap_mode)
+
+        self.token_ids = load('token_ids.npy')
+        self.tag_ids = load('tag_ids.npy')
+        self.lemma_ids = load('lemma_ids.npy')
+        self.vocab_norm_ids = load('vocab_norm_ids.npy')
+        self.sentence_offsets = load('sentence_offsets.npy')
+        self.document_offsets = load('document_offsets.npy')
+        self._sentences = None
+
+    @property
+    def source_hash(self) -> str:
+        return self.meta.get('source_hash', '')
+
+    @property
+    def sentences(self):
+        """
+        全部句子的列表（第一次访问时读入内存）。只需按顺序读取时使用 iter_sentences
+        """
+        if self._sentences is None:
+            with open(os.path.join(self.store_path, 'sentences.txt'), 'rt', encoding='utf-8') as f:
+                text = f.read()
+            self._sentences = text.split('\n') if text else []
+        return self._sentences
+
+    def iter_sentences(self) -> Iterator[str]:
+        """
+        按顺序逐行读取 sentences.txt 产出句子，与 sentences 相同，但内存中只保留当前的句子
+        """
+        if self._sentences is not None:
+            yield from self._sentences
+            return
+        count = 0
+        with open(os.path.join(self.store_path, 'sentences.txt'), 'rt', encoding='utf-8') as f:
+            for line in f:
+                yield line[:-1] if line.endswith('\n') else line
+                count += 1
+        # 最后一句为空时文件以换行结束，逐行读取会少一句
+        for _ in range(self.sentence_count() - count):
+            yield ''
+
+    def token_count(self) -> int:
+        return len(self.token_ids)
+
+    def sentence_count(self) -> int:
+        return len(self.sentence_offsets) - 1
+
+    def to_tagged_corpus(self) -> TaggedCorpus:
+        """
+        还原为 TaggedCorpus（会为每个词创建 Python 对象，仅在需要兼容旧接口时使用）
+        """
+        words = [self.vocabulary[i] for i in self.token_ids.tolist()]
+        tags = [self.tag_names[i] for i in self.tag_ids.tolist()]
+        offsets = self.sentence_offsets.tolist()
+        tagged_sentences = [list(zip(words[start:end], tags[start:end]))
+                            for start, end in zip(offsets[:-1], offsets[1:])]
+        return TaggedCorpus(self.sentences, tagged_sentences, document_names=list(self.document_names),
+                            document_offsets=self.document_offsets[:-1].tolist())
+
+    def document_token_offsets(self) -> np.ndarray:
+        """
+        每个文档第一个词的下标（末尾附加总词数）
+        """
+        return self.sentence_offsets[self.document_offsets]
+
+    def counted_tokens(self, remove_stopwords: bool = True, min_word_length: int = 2, lemmatize: bool = True):
+        """
+        按 count_word_frequency 的规则过滤全部词。过滤条件只对词表逐项计算一次，再通过数组索引作用到全部词上。
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: 保留的词的下标，及其计数键（词元或归一化形式）在词表中的编号。
+        """
+        if remove_stopwords:
+            ensure_nlp_data('stopwords')
+        stop_words = set(stopwords.words('english')) if remove_stopwords else set()
+        # 词表中每一项作为归一化形式时是否保留
+        keep_vocab = np.fromiter((is_valid_word(word, min_word_length) and word not in stop_words
+                                  for word in self.vocabulary), dtype=bool, count=len(self.vocabulary))
+        norm_ids = self.vocab_norm_ids[self.token_ids]
+        positions = np.flatnonzero(keep_vocab[norm_ids])
+        keys = self.lemma_ids[positions] if lemmatize else norm_ids[positions]
+        return positions, keys
+
+    def count_word_frequency(self, remove_stopwords: bool = True, min_word_length: int = 2,
+                             lemmatize: bool = True):
+        """
+        与 count_word_frequency 结果相同的词频统计，过滤后用 bincount 计数。
+
+        Returns:
+            Tuple[List[str], Dict[str, int]]: 句子列表和单词频率字典。
+        """
+        return self.sentences, self.word_frequency(remove_stopwords, min_word_length, lemmatize)
+
+    def word_frequency(self, remove_stopwords: bool = True, min_word_length: int = 2,
+                       lemmatize: bool = True) -> Dict[str, int]:
+        """
+        只统计词频（count_word_frequency 的第二项），不读取句子
+        """
+        _, keys = self.counted_tokens(remove_stopwords, min_word_length, lemmatize)
+
+        counts = np.bincount(keys, minlength=len(self.vocabulary))
+        return {self.vocabulary[word_id]: int(counts[word_id]) for word_id in np.flatnonzero(counts).tolist()}
+
+    def analyze_collocations(self, top_n=20, patterns=None, match_counts: Counter = None,
+                             capacity: Optional[int] = None, error_bounds: Optional[Dict[str, int]] = None):
+        """
+        与 analyze_collocations 结果相同的搭配分析（搭配不跨越文档边界）。匹配只在标签序列上进行，
+        同一模式的匹配按词编号矩阵整体去重计数，只为最终入选的短语拼接字符串。
+
+        Args:
+            match_counts: 传入 Counter 时，累加每种模式的匹配次数（可选）。
+            capacity, error_bounds: 近似模式，含义与 analyze_collocations 相同：每种模式只用 SpaceSaving 跟踪
+                                    capacity 个不同的短语（以词编号元组为键），不保存全部匹配的位置。
+        """
+        matcher = PosPatternMatcher(COLLOCATION_PATTERNS if patterns is None else patterns)
+        match_counts = Counter() if match_counts is None else match_counts
+        if capacity is not None:
+            return self._approximate_collocations(matcher, top_n, match_counts, capacity, error_bounds)
+
+        # 模式描述 -> 短语长度 -> ([起始位置], [匹配序号])
+        matches = {desc: {} for desc in matcher.descriptions}
+        # 搭配不跨越文档边界，逐个文档匹配
+        document_token_offsets = self.document_token_offsets().tolist()
+        for doc_start, doc_end in zip(document_token_offsets[:-1], document_token_offsets[1:]):
+            tags = map(self.tag_names.__getitem__, self.tag_ids[doc_start:doc_end].tolist())
+            for start, length, description in matcher.iter_tag_matches(tags):
+                starts, sequence = matches[description].setdefault(length, ([], []))
+                starts.append(doc_start + start)
+                sequence.append(match_counts[description])
+                match_counts[description] += 1
+
+        top_collocations = {}
+        for desc, by_length in matches.items():
+            candidates = []
+            for length, (starts, sequence) in by_length.items():
+                phrase_ids = self.token_ids[np.add.outer(np.array(starts, dtype=np.int64), np.arange(length))]
+                unique_ids, first_index, counts = np.unique(phrase_ids, axis=0, return_index=True,
+                                                            return_counts=True)
+                first_sequence = np.array(sequence)[first_index]
+                candidates.extend(zip((-counts).tolist(), first_sequence.tolist(), unique_ids.tolist()))
+            # 与 Counter.most_common 一致：频率相同时按首次出现的先后排序
+            candidates.sort(key=lambda item: (item[0], item[1]))
+            top_collocations[desc] = [(self._phrase(ids), -negative_count)
+                                      for negative_count, _, ids in candidates[:top_n]]
+            if error_bounds is not None:
+                error_bounds[desc] = 0
+        return top_collocations
+
+    def _approximate_collocations(self, matcher: PosPatternMatcher, top_n, match_counts: Counter, capacity: int,
+                                  error_bounds: Optional[Dict[str, int]]):
+        counters = {desc: SpaceSaving(capacity) for desc in matcher.descriptions}
+        document_token_offsets = self.document_token_offsets().tolist()
+        for doc_start, doc_end in zip(document_token_offsets[:-1], document_token_offsets[1:]):
+            tags = map(self.tag_names.__getitem__, self.tag_ids[doc_start:doc_end].tolist())
+            token_ids = self.token_ids[doc_start:doc_end].tolist()
+            for start, length, description in matcher.iter_tag_matches(tags):
+                counters[description].add(tuple(token_ids[start:start + length]))
+                match_counts[description] += 1
+
+        top_collocations = {}
+        for desc, counter in counters.items():
+            top_collocations[desc] = [(self._phrase(ids), count) for ids, count in counter.most_common(top_n)]
+            if error_bounds is not None:
+                error_bounds[desc] = counter.error_bound
+        return top_collocations
+
+    def _phrase(self, token_ids) -> str:
+        return ' '.join([self.vocabulary[i] for i in token_ids])
+
+
+def load_tagged_corpus_store(directory: str, source_hash: str = None):
+    """
+    加载语料存储。不存在、格式版本不符或来源文本哈希不一致时返回 None。
+    """
+    try:
+        store = TaggedCorpusStore(directory)
+    except (OSError, ValueError, KeyError):
+        return None
+    if source_hash is not None and store.source_hash != source_hash:
+        return None
+    return store
@@ -1,26 +1,114 @@
+import os
 import re
+import sys
 import nltk
 import string
+import threading
 import traceback
 import unicodedata
-import pandas as pd
-from collections import Counter
-from typing import Tuple, List, Dict
-from nltk import pos_tag
+from contextlib import nullcontext
+from functools import lru_cache, partial
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter, OrderedDict, deque
+from typing import Tuple, List, Dict, Union, Iterable, Iterator, Optional
+from nltk import pos_tag, pos_tag_sents
 from nltk.stem import WordNetLemmatizer
-from nltk.corpus import stopwords, wordnet
+from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize, sent_tokenize
 
+from HeavyHitters import SpaceSaving, top_n_items
 
-def check_download_nlp_data():
-    # 确保已下载所需的NLTK数据
-    nltk.download('punkt')
-    nltk.download('stopwords')
-    nltk.download('punkt_tab')
-    nltk.download('wordnet')
-    nltk.download('averaged_perceptron_tagger')  # 用于词性标注，帮助词形还原
-    nltk.download('averaged_perceptron_tagger_eng')
-check_download_nlp_data()       # Execute immediately when module loading
+
+# 各项功能所需的 NLTK 数据包及其在本地数据目录中的位置。
+# 同一功能有多个候选时（新旧版本 NLTK 使用的数据包名称不同），本地存在任一即可。
+NLTK_RESOURCES = {
+    'tokenizer': (('punkt_tab', 'tokenizers/punkt_tab/english/'), ('punkt', 'tokenizers/punkt')),
+    'tagger': (('averaged_perceptron_tagger_eng', 'taggers/averaged_perceptron_tagger_eng/'),
+               ('averaged_perceptron_tagger', 'taggers/averaged_perceptron_tagger')),
+    'stopwords': (('stopwords', 'corpora/stopwords'),),
+    'wordnet': (('wordnet', 'corpora/wordnet'),),
+}
+
+
+class NlpDataMissingError(LookupError):
+    """
+    本地缺少所需的 NLTK 数据
+    """
+    pass
+
+
+def _nltk_resource_exists(resource_path: str) -> bool:
+    try:
+        nltk.data.find(resource_path)
+        return True
+    except LookupError:
+        return False
+
+
+@lru_cache(maxsize=None)
+def _ensure_nlp_resource(feature: str) -> str:
+    # 只缓存成功的检查结果（抛出异常时不缓存），数据下载后无需重启即可使用
+    for package, resource_path in NLTK_RESOURCES[feature]:
+        if _nltk_resource_exists(resource_path):
+            return package
+    package = NLTK_RESOURCES[feature][0][0]
+    raise NlpDataMissingError(
+        f"缺少 NLTK 数据 '{package}'（{feature}），本程序不会自动下载。"
+        f"请先运行: python EnglishAnalysisTools.py --download-nlp-data，"
+        f"或在 python 中执行 nltk.download('{package}')，或将数据放到 NLTK_DATA 环境变量指定的目录。")
+
+
+def ensure_nlp_data(*features: str):
+    """
+    在首次使用前检查所需的 NLTK 数据是否已存在于本地（只检查，不联网下载）。
+
+    Args:
+        features: NLTK_RESOURCES 中的功能名称，如 'tokenizer'、'tagger'、'stopwords'、'wordnet'。
+
+    Raises:
+        NlpDataMissingError: 本地缺少所需数据时。
+    """
+    for feature in features:
+        _ensure_nlp_resource(feature)
+
+
+def check_download_nlp_data(force: bool = False):
+    """
+    显式下载所需的 NLTK 数据。默认只下载本地缺少的数据包。
+    模块导入时不再自动调用，需要时运行 python EnglishAnalysisTools.py --download-nlp-data。
+
+    Args:
+        force: 是否无论本地是否存在都重新下载全部数据包。
+    """
+    for candidates in NLTK_RESOURCES.values():
+        for package, resource_path in candidates:
+            if force or not _nltk_resource_exists(resource_path):
+                nltk.download(package)
+    _ensure_nlp_resource.cache_clear()
+
+
+# 中文标点到英文标点的映射字典
+PUNCTUATION_MAP = {
+    '，': ',',  # 中文逗号 -> 英文逗号
+    '。': '.',  # 中文句号 -> 英文句号
+    '；': ';',  # 中文分号 -> 英文分号
+    '：': ':',  # 中文冒号 -> 英文冒号
+    '？': '?',  # 中文问号 -> 英文问号
+    '！': '!',  # 中文感叹号 -> 英文感叹号
+    '“': '"',  # 中文双引号 -> 英文双引号
+    '”': '"',
+    '‘': "'",  # 中文单引号 -> 英文单引号
+    '’': "'",
+    '（': '(',  # 中文括号 -> 英文括号
+    '）': ')',
+    '【': '[',  # 中文方括号 -> 英文方括号
+    '】': ']',
+    '《': '<',  # 中文书名号 -> 英文尖括号 (或通常也直接去除)
+    '》': '>',
+    '～': '~',  # 中文波浪号 -> 英文波浪号
+    '—': '-',  # 中文破折号 -> 英文连字符 (这是一个近似替换)
+    '…': '...',  # 中文省略号 -> 英文省略号
+}
 
 
 def normalize_punctuation_to_ascii(text):
@@ -34,40 +122,40 @@ def normalize_punctuation_to_ascii(text):
     Returns:
         str: 转换后的文本，中文标点被替换为英文标点。
     """
-    # 构建一个中文标点到英文标点的映射字典
-    punctuation_map = {
-        '，': ',',  # 中文逗号 -> 英文逗号
-        '。': '.',  # 中文句号 -> 英文句号
-        '；': ';',  # 中文分号 -> 英文分号
-        '：': ':',  # 中文冒号 -> 英文冒号
-        '？': '?',  # 中文问号 -> 英文问号
-        '！': '!',  # 中文感叹号 -> 英文感叹号
-        '“': '"',  # 中文双引号 -> 英文双引号
-        '”': '"',
-        '‘': "'",  # 中文单引号 -> 英文单引号
-        '’': "'",
-        '（': '(',  # 中文括号 -> 英文括号
-        '）': ')',
-        '【': '[',  # 中文方括号 -> 英文方括号
-        '】': ']',
-        '《': '<',  # 中文书名号 -> 英文尖括号 (或通常也直接去除)
-        '》': '>',
-        '～': '~',  # 中文波浪号 -> 英文波浪号
-        '—': '-',  # 中文破折号 -> 英文连字符 (这是一个近似替换)
-        '…': '...',  # 中文省略号 -> 英文省略号
-    }
-
     # 逐个字符检查并替换
     normalized_text = []
     for char in text:
-        if char in punctuation_map:
-            normalized_text.append(punctuation_map[char])
+        if char in PUNCTUATION_MAP:
+            normalized_text.append(PUNCTUATION_MAP[char])
         else:
             normalized_text.append(char)
 
     return ''.join(normalized_text)
 
 
+def _full_width_char_to_ascii(char):
+    """
+    将单个全角字符转换为半角（ASCII）字符，非全角字符或转换后不是ASCII的字符原样返回。
+    """
+    # 获取字符的Unicode名称，常用于判断字符类型
+    name = unicodedata.name(char, '')
+    # 检查是否为全角字符（FULLWIDTH ...）
+    if 'FULLWIDTH' in name:
+        # 尝试将其转换为半角形式
+        try:
+            # 使用 unicodedata.normalize 转换，但更直接的是计算其半角码点
+            # 全角字符与半角字符的码点相差 0xFEE0
+            half_width_char = chr(ord(char) - 0xFEE0)
+            # 确保转换后的字符确实是ASCII（例如，全角'A'转半角'A'）
+            if half_width_char.isascii():
+                return half_width_char
+        except (ValueError, TypeError):
+            # 如果转换出错，保留原字符
+            pass
+    # 如果不是全角字符，或转换后不是ASCII（例如某些全角符号），保留原字符
+    return char
+
+
 def full_width_to_ascii(text):
     """
     将全角字母和数字转换为半角（ASCII）字母和数字。
@@ -81,30 +169,7 @@ def full_width_to_ascii(text):
     Returns:
         str: 转换后的文本，全角字母和数字被转换为半角。
     """
-    normalized_text = []
-    for char in text:
-        # 获取字符的Unicode名称，常用于判断字符类型
-        name = unicodedata.name(char, '')
-        # 检查是否为全角字符（FULLWIDTH ...）
-        if 'FULLWIDTH' in name:
-            # 尝试将其转换为半角形式
-            try:
-                # 使用 unicodedata.normalize 转换，但更直接的是计算其半角码点
-                # 全角字符与半角字符的码点相差 0xFEE0
-                half_width_char = chr(ord(char) - 0xFEE0)
-                # 确保转换后的字符确实是ASCII（例如，全角'A'转半角'A'）
-                if half_width_char.isascii():
-                    normalized_text.append(half_width_char)
-                else:
-                    # 如果转换后不是ASCII，保留原字符（例如某些全角符号）
-                    normalized_text.append(char)
-            except (ValueError, TypeError):
-                # 如果转换出错，保留原字符
-                normalized_text.append(char)
-        else:
-            # 如果不是全角字符，直接保留
-            normalized_text.append(char)
-    return ''.join(normalized_text)
+    return ''.join([_full_width_char_to_ascii(char) for char in text])
 
 
 def keep_only_ascii(text):
@@ -139,7 +204,27 @@ def remove_digits(text):
     return no_digits_text
 
 
-def replace_unwanted_symbols(text, keep_chars=""",?!:"'"""):
+# replace_unwanted_symbols 使用罕见字符作为临时标记
+TEMP_MARKER_HYPHEN = "▦"  # 用于受保护的连字符
+TEMP_MARKER_PERIOD = "◎"  # 用于受保护的句号
+DEFAULT_KEEP_CHARS = """,?!:"'"""
+
+# 单词中的连字符（前后是字母）
+WORD_HYPHEN_PATTERN = re.compile(r'(?<=[a-zA-Z])-(?=[a-zA-Z])')
+# 疑似句号（不在数字间）
+SENTENCE_PERIOD_PATTERN = re.compile(r'\.(?!(?<=\d\.)\d)')
+
+
+@lru_cache(maxsize=32)
+def _unwanted_symbols_pattern(keep_chars):
+    # 定义基础保留集合（字母、数字、空格、临时标记）
+    base_keep = r'\w\s'
+    # 构建保留字符模式（基础保留 + 用户指定保留 + 临时标记）
+    keep_pattern = f"{base_keep}{re.escape(keep_chars)}{TEMP_MARKER_HYPHEN}{TEMP_MARKER_PERIOD}"
+    return re.compile(f"[^{keep_pattern}]")
+
+
+def replace_unwanted_symbols(text, keep_chars=DEFAULT_KEEP_CHARS):
     """
     增强版的符号替换函数，尝试区分单词连字符和数学减号，同时区分句号和小数点。
 
@@ -150,26 +235,17 @@ def replace_unwanted_symbols(text, keep_chars=""",?!:"'"""):
     Returns:
         str: 处理后的文本
     """
-    # 使用罕见字符作为临时标记
-    temp_marker_hyphen = "▦"  # 用于受保护的连字符
-    temp_marker_period = "◎"  # 用于受保护的句号
-
     # 1. 保护单词中的连字符（前后是字母）
-    protected_text = re.sub(r'(?<=[a-zA-Z])-(?=[a-zA-Z])', temp_marker_hyphen, text)
+    protected_text = WORD_HYPHEN_PATTERN.sub(TEMP_MARKER_HYPHEN, text)
 
     # 2. 保护疑似句号（不在数字间）
-    protected_text = re.sub(r'\.(?!(?<=\d\.)\d)', temp_marker_period, protected_text)
-
-    # 3. 定义基础保留集合（字母、数字、空格、临时标记）
-    base_keep = r'\w\s'
-    # 构建保留字符模式（基础保留 + 用户指定保留 + 临时标记）
-    keep_pattern = f"{base_keep}{re.escape(keep_chars)}{temp_marker_hyphen}{temp_marker_period}"
+    protected_text = SENTENCE_PERIOD_PATTERN.sub(TEMP_MARKER_PERIOD, protected_text)
 
-    # 4. 将所有不在保留集中的字符替换为空格
-    cleaned_text = re.sub(f"[^{keep_pattern}]", ' ', protected_text)
+    # 3. 将所有不在保留集中的字符替换为空格（保留集合的模式按 keep_chars 缓存）
+    cleaned_text = _unwanted_symbols_pattern(keep_chars).sub(' ', protected_text)
 
-    # 5. 恢复受保护的连字符和句号
-    final_text = cleaned_text.replace(temp_marker_hyphen, '-').replace(temp_marker_period, '.')
+    # 4. 恢复受保护的连字符和句号
+    final_text = cleaned_text.replace(TEMP_MARKER_HYPHEN, '-').replace(TEMP_MARKER_PERIOD, '.')
 
     return final_text
 
@@ -196,6 +272,86 @@ def reduce_blank_lines(text, max_blanks=2):
     return cleaned_text
 
 
+class _NormalizeTable(dict):
+    """
+    TextNormalizer 使用的 str.translate 映射表：首次遇到某个字符时计算其最终映射并缓存，
+    之后同一字符的查找只是一次字典访问。
+    """
+
+    ASCII_WORD_PATTERN = re.compile(r'[\w\s]')
+
+    def __init__(self, keep_chars):
+        super().__init__()
+        self.keep_chars = keep_chars
+
+    def __missing__(self, code_point):
+        char = chr(code_point)
+        # 与 normalize_punctuation_to_ascii -> full_width_to_ascii 相同的映射
+        mapped = PUNCTUATION_MAP[char] if char in PUNCTUATION_MAP else _full_width_char_to_ascii(char)
+        result = []
+        for mapped_char in mapped:
+            if not mapped_char.isascii():
+                # 与 keep_only_ascii 相同：移除非ASCII字符
+                continue
+            if mapped_char in '-.' or mapped_char in self.keep_chars or self.ASCII_WORD_PATTERN.match(mapped_char):
+                # 连字符和句号需要结合上下文判断，留给第二遍处理
+                result.append(mapped_char)
+            else:
+                # 与 replace_unwanted_symbols 相同：不在保留集中的符号替换为空格
+                result.append(' ')
+        self[code_point] = value = ''.join(result)
+        return value
+
+
+class TextNormalizer:
+    """
+    预编译的 remove_non_english 处理链，输出与逐步调用
+    normalize_punctuation_to_ascii -> full_width_to_ascii -> keep_only_ascii
+    -> replace_unwanted_symbols -> remove_digits 完全一致。
+
+    第一遍用一个 str.translate 映射表完成标点/全角转换、非ASCII字符移除和符号替换；
+    第二遍用一个预编译的正则处理需要上下文的连字符和小数点（数字在同一遍中移除）。
+    对象可复用，同一个对象处理多篇文本时映射表只会越用越热。
+    """
+
+    def __init__(self, keep_number: bool = False, keep_chars: str = DEFAULT_KEEP_CHARS):
+        self.keep_number = keep_number
+        self.keep_chars = keep_chars
+        self._table = _NormalizeTable(keep_chars)
+
+        # 非ASCII字符移除之后，连字符两侧不都是字母时、句点两侧都是数字时替换为空格
+        # 每个分支都以字面字符开头，正则引擎可以快速跳过无关字符
+        context_patterns = []
+        if '-' not in keep_chars:
+            context_patterns.append(r'-(?:(?<![a-zA-Z]-)|(?![a-zA-Z]))')
+        if '.' not in keep_chars:
+            context_patterns.append(r'\.(?<=\d\.)(?=\d)')
+        if not keep_number:
+            # 必须在判断小数点之后才能移除数字，所以放在同一个正则里
+            context_patterns.append(r'[0-9]+')
+        self._context_pattern = re.compile('|'.join(context_patterns)) if context_patterns else None
+
+    @staticmethod
+    def _replace_context(match):
+        return '' if match.group()[0].isdigit() else ' '
+
+    def normalize(self, text: str) -> str:
+        text = text.translate(self._table)
+        if self._context_pattern is not None:
+            text = self._context_pattern.sub(self._replace_context, text)
+        return text
+
+    __call__ = normalize
+
+
+@lru_cache(maxsize=None)
+def get_text_normalizer(keep_number: bool = False) -> TextNormalizer:
+    """
+    获取共享的 TextNormalizer 实例（按参数缓存）
+    """
+    return TextNormalizer(keep_number=keep_number)
+
+
 def remove_non_english(text, keep_number=False):
     """
     移除字符串中的所有非英文字符。
@@ -216,12 +372,13 @@ def remove_non_english(text, keep_number=False):
     if not isinstance(text, str):
         raise TypeError("输入参数 text 必须是字符串类型 (str)")
 
-    step1_text = normalize_punctuation_to_ascii(text)
-    step2_text = full_width_to_ascii(step1_text)
-    step3_text = keep_only_ascii(step2_text)
-    step4_text = replace_unwanted_symbols(step3_text)
-    step5_text = remove_digits(step4_text) if not keep_number else step4_text
-    return step5_text
+    # 等价于依次执行 normalize_punctuation_to_ascii, full_width_to_ascii, keep_only_ascii,
+    # replace_unwanted_symbols 和（可选的）remove_digits，但只需遍历文本两遍
+    return get_text_normalizer(keep_number).normalize(text)
+
+
+# WordNet 词性常量（与 nltk.corpus.wordnet 中的取值相同）
+WN_ADJ, WN_VERB, WN_NOUN, WN_ADV = 'a', 'v', 'n', 'r'
 
 
 def penn_treebank_tag_to_wordnet_tag(treebank_tag):
@@ -234,20 +391,188 @@ def penn_treebank_tag_to_wordnet_tag(treebank_tag):
     返回:
         str: WordNet 词性标签 (如 `wn.NOUN`)，如果无法映射则返回 None。
     """
+    # 使用与 wordnet.ADJ / VERB / NOUN / ADV 相同的常量值：访问 wordnet 的属性会触发整个 WordNet 语料的加载
     if treebank_tag.startswith('J'):
-        return wordnet.ADJ
+        return WN_ADJ
     elif treebank_tag.startswith('V'):
-        return wordnet.VERB
+        return WN_VERB
     elif treebank_tag.startswith('N'):
-        return wordnet.NOUN
+        return WN_NOUN
     elif treebank_tag.startswith('R'):
-        return wordnet.ADV
+        return WN_ADV
     else:
         # 对于其他词性（如介词、连词、代词等），返回 None 或默认处理
         return None
 ptb_to_wn_tag = penn_treebank_tag_to_wordnet_tag
 
 
+class CachedLemmatizer:
+    """
+    带缓存的词形还原。台词中反复出现的（单词, 词性）组合只需调用一次 WordNet，
+    之后都是一次字典查找。
+
+    缓存是有容量上限的 LRU；指定 cache_path 时可通过 save() 持久化，下次运行时自动加载。
+    缓存足够“热”时根本不会用到 WordNet，也就不需要加载 WordNet 语料。
+
+    可以在多个线程中共用同一个实例（见 AnalyzeCorpora.py）：缓存的查找、插入和淘汰都在锁内进行。
+    hits / misses 是全部使用者的合计，需要单独统计时使用 counting_view()。
+
+    Args:
+        max_size (int): 内存中最多缓存的条目数。
+        cache_path (str): 持久化文件路径（可选）。
+    """
+
+    CACHE_FILE_HEADER = '# lemma cache v1'
+
+    def __init__(self, max_size: int = 200000, cache_path: Optional[str] = None):
+        self.max_size = max_size
+        self.cache_path = cache_path
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lemmatizer = None
+        self._dirty = False
+        self._lock = threading.Lock()
+        if cache_path and os.path.isfile(cache_path):
+            self.load(cache_path)
+
+    def lemmatize(self, word: str, pos: str = WN_NOUN) -> str:
+        return self.lookup(word, pos)[0]
+
+    def lookup(self, word: str, pos: str = WN_NOUN) -> Tuple[str, bool]:
+        """
+        词形还原，同时返回是否命中缓存
+        """
+        key = (word, pos)
+        with self._lock:
+            lemma = self._cache.get(key)
+            if lemma is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return lemma, True
+            self.misses += 1
+
+        # WordNet 查询不持有锁，其它线程的缓存命中不必等待
+        lemma = self._wordnet_lemmatizer().lemmatize(word, pos=pos)
+        with self._lock:
+            self._cache[key] = lemma
+            self._dirty = True
+            if len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return lemma, False
+
+    def _wordnet_lemmatizer(self):
+        if self._lemmatizer is None:
+            with self._lock:
+                if self._lemmatizer is None:
+                    ensure_nlp_data('wordnet')
+                    self._lemmatizer = WordNetLemmatizer()
+        return self._lemmatizer
+
+    def warm_up(self):
+        """
+        立即加载 WordNet（而不是在第一次缓存未命中时），供多个线程共用同一个实例前调用
+        """
+        self._wordnet_lemmatizer().lemmatize('warming', pos=WN_VERB)
+
+    def counting_view(self) -> 'LemmatizerCountingView':
+        """
+        共用本缓存、单独统计命中次数的视图，例如多个语料同时使用同一个缓存时各自的命中率
+        """
+        return LemmatizerCountingView(self)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self):
+        return len(self._cache)
+
+    def entries(self) -> List[Tuple[Tuple[str, str], str]]:
+        """
+        缓存内容的快照 [((word, pos), lemma), ...]，按最近使用的先后排列，可用 update() 加入另一个缓存
+        """
+        with self._lock:
+            return list(self._cache.items())
+
+    def update(self, entries: Iterable[Tuple[Tuple[str, str], str]]):
+        """
+        加入其它缓存（如工作进程中的缓存）得到的条目，视为最近使用
+        """
+        with self._lock:
+            for key, lemma in entries:
+                self._cache[key] = lemma
+                self._cache.move_to_end(key)
+                self._dirty = True
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def load(self, cache_path: str):
+        """
+        从文件加载缓存，每行为 word<TAB>pos<TAB>lemma
+        """
+        with open(cache_path, 'rt', encoding='utf-8') as f:
+            if f.readline().rstrip('\n') != self.CACHE_FILE_HEADER:
+                # 格式不符时忽略旧文件，下次保存时覆盖
+                return
+            for line in f:
+                fields = line.rstrip('\n').split('\t')
+                if len(fields) == 3:
+                    self._cache[(fields[0], fields[1])] = fields[2]
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def save(self, cache_path: Optional[str] = None):
+        """
+        将缓存写入文件（默认为 cache_path）。缓存没有变化时不写入。
+        """
+        cache_path = cache_path or self.cache_path
+        if not cache_path or (not self._dirty and cache_path == self.cache_path):
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        items = self.entries()
+        temp_path = cache_path + '.tmp'
+        with open(temp_path, 'wt', encoding='utf-8') as f:
+            f.write(self.CACHE_FILE_HEADER + '\n')
+            for (word, pos), lemma in items:
+                f.write(f'{word}\t{pos}\t{lemma}\n')
+        os.replace(temp_path, cache_path)
+        self._dirty = False
+
+
+class LemmatizerCountingView:
+    """
+    CachedLemmatizer 的视图：词形还原使用其缓存，hits / misses 只统计经由本视图的调用。
+    """
+
+    def __init__(self, lemmatizer: CachedLemmatizer):
+        self.lemmatizer = lemmatizer
+        self.hits = 0
+        self.misses = 0
+
+    def lemmatize(self, word: str, pos: str = WN_NOUN) -> str:
+        lemma, hit = self.lemmatizer.lookup(word, pos)
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return lemma
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@lru_cache(maxsize=1)
+def get_default_lemmatizer() -> CachedLemmatizer:
+    """
+    获取进程内共享的（仅内存）CachedLemmatizer
+    """
+    return CachedLemmatizer()
+
+
 def get_wordnet_pos_from_sentence(sentence: str, target_word: str):
     """
     在句子上下文中获取目标单词的所有WordNet词性标签。
@@ -260,6 +585,7 @@ def get_wordnet_pos_from_sentence(sentence: str, target_word: str):
         list: 一个列表，每个元素是一个元组，包含匹配单词的索引、单词本身和其WordNet词性标签。
               例如：[(0, 'Can', 'v'), (2, 'can', 'v'), (4, 'can', 'n')]
     """
+    ensure_nlp_data('tokenizer', 'tagger')
     words = word_tokenize(sentence)
     pos_tagged = pos_tag(words)  # 得到Penn Treebank标签
     results = []
@@ -272,6 +598,49 @@ def get_wordnet_pos_from_sentence(sentence: str, target_word: str):
     return results
 
 
+def get_wordnet_pos_distribution(sentences: Iterable[str], target_words: Iterable[str], workers: Optional[int] = 1,
+                                 executor: Optional[ProcessPoolExecutor] = None) -> Dict[str, Counter]:
+    """
+    批量版的 get_wordnet_pos_from_sentence：统计每个目标单词在全部句子中的WordNet词性分布。
+
+    逐词逐句调用 get_wordnet_pos_from_sentence 需要 单词数 × 句子数 次分词和标注；这里每个不同的句子
+    只分词、标注一次（pos_tag_sents 批量标注），且只处理可能包含目标单词的句子（先用一个正则表达式筛选）。
+    重复出现的句子只标注一次，但按出现次数计数。
+
+    Args:
+        sentences: 句子，如 count_word_frequency 返回的句子列表。
+        target_words: 目标单词，不区分大小写。
+        workers (int): 分词和标注使用的进程数，含义同 build_tagged_corpus。
+        executor: 共用的进程池（可选，见 create_nlp_worker_pool）。
+
+    Returns:
+        Dict[str, Counter]: 小写的目标单词 -> {WordNet词性: 次数}，词性为 'n'、'v'、'a'、'r'，
+        无对应WordNet词性的（如介词、代词）计为 None。
+    """
+    distribution = {word.lower(): Counter() for word in target_words}
+    if not distribution:
+        return distribution
+    # 分词得到的单词都是句子的子串，因此不包含任何目标单词（作为子串）的句子可以直接跳过
+    pattern = re.compile('|'.join(map(re.escape, sorted(distribution, key=len, reverse=True))), re.IGNORECASE)
+    sentence_counts = Counter(sentence for sentence in sentences if pattern.search(sentence))
+    candidates = list(sentence_counts)
+
+    if workers == 1 and executor is None:
+        tagged_sentences = tokenize_and_tag_sentences(candidates)
+    else:
+        tagged_sentences = (tagged_words for shard_tagged in
+                            _map_sentence_shards(tokenize_and_tag_sentences, candidates, workers, executor)
+                            for tagged_words in shard_tagged)
+
+    for sentence, tagged_words in zip(candidates, tagged_sentences):
+        occurrences = sentence_counts[sentence]
+        for word, ptb_tag in tagged_words:
+            counter = distribution.get(word.lower())
+            if counter is not None:
+                counter[ptb_to_wn_tag(ptb_tag)] += occurrences
+    return distribution
+
+
 def is_valid_word(word: str, min_length: int = 2) -> bool:
     """
     检查一个字符串是否为有效的单词（过滤数字、纯符号等）。
@@ -303,96 +672,48 @@ def get_top_words(word_freq: Dict[str, int], n: int = 10) -> List[Tuple[str, int
         n (int): 要获取的顶部单词数量，默认为10。
 
     Returns:
-        List[Tuple[str, int]]: 前N个单词及其频率的列表。
+        List[Tuple[str, int]]: 前N个单词及其频率的列表，与 Counter(word_freq).most_common(n) 相同。
     """
-    return Counter(word_freq).most_common(n)
+    # 用大小为 n 的堆直接在字典上选取，不需要先复制出一个 Counter
+    return top_n_items(word_freq, n)
 
 
-def analyze_collocations(text, top_n=20):
+class TaggedCorpus:
     """
-    分析常见的词性搭配模式，这有助于发现英语中的习惯用法
-    例如：动词+介词（VB+IN）、形容词+名词（JJ+NN）等。
+    分句、分词及词性标注的中间结果。只需构建一次，即可供词频统计、搭配分析等多种分析复用。
+
+    Attributes:
+        sentences (List[str]): 句子列表。
+        tagged_sentences (List[List[Tuple[str, Optional[str]]]]): 每个句子的 (word, tag) 列表；
+            未进行词性标注时 tag 为 None。
+        tagged (bool): 是否进行了词性标注。
+        document_names (List[str]): 文档名列表，默认整个文本视为一个文档。
+        document_offsets (List[int]): 每个文档第一个句子的下标，与 document_names 一一对应。
     """
 
-    tokens = word_tokenize(text)
-    tagged_tokens = pos_tag(tokens)
-
-    # 定义一些常见的、有意义的词性组合模式
-
-    patterns = [
-        # 基础模式
-        (('VB', 'IN'), 'Verb+Prep'),  # 动词+介词，如：look at, depend on, talk about
-        (('VB', 'DT', 'NN'), 'Verb+Det+Noun'),  # 动词+限定词+名词，如：have a look, make a decision, take the chance
-        (('JJ', 'NN'), 'Adj+Noun'),  # 形容词+名词，如：red apple, important meeting, difficult situation
-        (('RB', 'VB'), 'Adv+Verb'),  # 副词+动词，如：quickly run, easily understand, carefully consider
-        (('NN', 'IN', 'NN'), 'Noun+Prep+Noun'),  # 名词+介词+名词，如：transition to adulthood, key to success, fear of failure
-        (('VB', 'RB'), 'Verb+Adv'),  # 动词+副词，如：speak clearly, work efficiently, respond immediately
-        (('IN', 'DT', 'NN'), 'Prep+Det+Noun'),  # 介词+限定词+名词，如：in the morning, on a mission, with an idea
-        (('NN', 'NN'), 'Compound Noun'),  # 复合名词，如: coffee cup, business meeting, research paper
-        (('VB', 'NN'), 'Verb+Noun'),  # 动词+名词，如: make progress, take notes, set goals
-
-        # 新增模式
-        (('VB', 'DT', 'JJ', 'NN'), 'Verb+Det+Adj+Noun'), # 动词+限定词+形容词+名词，如：have a great day, make an important decision, see the beautiful sunset
-        (('JJ', 'JJ', 'NN'), 'Adj+Adj+Noun'),  # 形容词+形容词+名词，如：beautiful red rose, large wooden table, small black cat
-        (('RB', 'JJ'), 'Adv+Adj'),  # 副词+形容词，如：extremely important, very happy, quite difficult
-        (('NN', 'VB'), 'Noun+Verb'),  # 名词+动词，如：problem solving, decision making, time management
-        (('VB', 'PRP'), 'Verb+Pronoun'),  # 动词+代词，如：help me, tell them, ask us
-        (('IN', 'JJ', 'NN'), 'Prep+Adj+Noun'),  # 介词+形容词+名词，如：in great detail, with special care, on important matters
-        (('DT', 'NN', 'IN', 'NN'), 'Det+Noun+Prep+Noun'), # 限定词+名词+介词+名词，如：the end of time, a piece of cake, the beginning of history
-        (('MD', 'VB', 'RB'), 'Modal+Verb+Adv'), # 情态动词+动词+副词，如：can easily do, will quickly go, should carefully consider
-        (('NN', 'IN', 'DT', 'NN'), 'Noun+Prep+Det+Noun'), # 名词+介词+限定词+名词，如：transition to a new, solution to the problem, key to a mystery
-        (('VB', 'TO', 'VB'), 'Verb+To+Verb'),  # 动词+不定式标记+动词，如：want to go, need to see, try to understand
-        (('VBG', 'NN'), 'Gerund+Noun'),  # 动名词+名词，如：reading books, making progress, writing letters
-        (('VBN', 'IN'), 'PastPart+Prep'),  # 过去分词+介词，如：interested in, covered with, known for
-        (('CD', 'NNS'), 'Number+PluralNoun'),  # 基数词+名词复数，如：three books, five years, ten students
-        (('JJ', 'CC', 'JJ'), 'Adj+Conj+Adj'),  # 形容词+连词+形容词，如：simple and effective, short but clear, tired yet happy
-        (('VB', 'PRP', 'RB'), 'Verb+Pronoun+Adv'),  # 动词+代词+副词，如：tell me quickly, show them clearly, ask us politely
-        (('RB', 'RB', 'JJ'), 'Adv+Adv+Adj'), # 副词+副词+形容词，如：very extremely hot, quite surprisingly good, rather unexpectedly cold
-        (('DT', 'JJ', 'NN', 'VBZ'), 'Det+Adj+Noun+Verb'), # 限定词+形容词+名词+动词，如：the quick brown fox jumps, a beautiful red rose blooms
-        (('PRP', 'MD', 'VB', 'RB'), 'Pron+Modal+Verb+Adv'), # 代词+情态动词+动词+副词，如：I can easily do, you should carefully consider, we will quickly go
-        (('NN', 'VBZ', 'JJ'), 'Noun+Verb+Adj'),  # 名词+动词+形容词，如: time flies fast, sun sets red, water runs clear
-        (('IN', 'PRP$', 'NN'), 'Prep+Possessive+Noun')  # 介词+物主代词+名词，如：in my opinion, on his behalf, with her permission
-    ]
-
-    collocation_counts = {desc: Counter() for _, desc in patterns}
-    window_size = 4  # 检查相邻单词的窗口大小
-
-    for i in range(int(len(tagged_tokens) - window_size + 1)):
-        window = tagged_tokens[i:i + window_size]
-        for (pattern, description) in patterns:
-            if len(pattern) <= len(window):
-                match = True
-                for j in range(len(pattern)):
-                    if window[j][1] != pattern[j]:
-                        match = False
-                        break
-                if match:
-                    phrase = ' '.join([word for word, pos in window[:len(pattern)]])
-                    collocation_counts[description][phrase] += 1
+    def __init__(self, sentences: List[str], tagged_sentences: List[List[Tuple[str, Optional[str]]]],
+                 tagged: bool = True, document_names: Optional[List[str]] = None,
+                 document_offsets: Optional[List[int]] = None):
+        self.sentences = sentences
+        self.tagged_sentences = tagged_sentences
+        self.tagged = tagged
+        self.document_names = document_names if document_names is not None else ['']
+        self.document_offsets = document_offsets if document_offsets is not None else [0]
 
-    # 获取每种模式的前top_n个最常见搭配
-    top_collocations = {}
-    for desc, counter in collocation_counts.items():
-        top_collocations[desc] = counter.most_common(top_n)
+    def token_count(self) -> int:
+        return sum(len(tagged) for tagged in self.tagged_sentences)
 
-    return top_collocations
+    def iter_tagged_tokens(self) -> Iterator[Tuple[str, Optional[str]]]:
+        """
+        按顺序产出全部 (word, tag)，句子之间首尾相接
+        """
+        for tagged in self.tagged_sentences:
+            yield from tagged
 
 
-def count_word_frequency(text: str,
-                         remove_stopwords: bool = True,
-                         min_word_length: int = 2,
-                         lemmatize: bool = True) -> Tuple[List[str], Dict[str, int]]:
+def split_sentences(text: str) -> List[str]:
     """
-    统计文本中单词的频率，并进行详细的预处理。
-
-    Args:
-        text (str): 要分析的文本。
-        remove_stopwords (bool): 是否移除停用词，默认为 True。
-        min_word_length (int): 单词最小长度，短于此长度的单词将被过滤，默认为 2。
-        lemmatize (bool): 是否进行词形还原，默认为 True。
-
-    Returns:
-        Tuple[List[str], Dict[str, int]]: 句子列表和单词频率字典。
+    合并多余空白后对文本进行分句。
 
     Raises:
         ValueError: 当输入文本为空或过短时。
@@ -408,26 +729,455 @@ def count_word_frequency(text: str,
     clean_text = re.sub(r'\s+', ' ', text.strip())  # 将多个空白字符替换为单个空格
 
     # 1. 分句
+    ensure_nlp_data('tokenizer')
     try:
-        sentences = sent_tokenize(clean_text)
+        return sent_tokenize(clean_text)
     except Exception as e:
         raise RuntimeError(f"分句处理失败: {str(e)}")
 
+
+def tokenize_and_tag_sentences(sentences: List[str], tag: bool = True) -> List[List[Tuple[str, Optional[str]]]]:
+    """
+    对句子逐句分词，并（可选地）批量进行词性标注；不标注时 tag 为 None。
+    """
+    ensure_nlp_data('tokenizer')
+
+    # 2. 分词
+    tokenized_sentences = [word_tokenize(sentence) for sentence in sentences]
+
+    # 3. 词性标注：按句子批量标注，标注器只加载一次
+    if tag:
+        ensure_nlp_data('tagger')
+        return pos_tag_sents(tokenized_sentences)
+    return [[(word, None) for word in words] for words in tokenized_sentences]
+
+
+def warm_up_nlp_models():
+    """
+    加载标注器和停用词表（NLTK 在第一次使用时才加载），之后的调用都复用已加载的模型
+    """
+    ensure_nlp_data('tagger', 'stopwords')
+    pos_tag_sents([['warm', 'up']])
+    stopwords.words('english')
+
+
+def _init_nlp_worker(lemma_entries=None):
+    # 每个工作进程启动时加载一次标注器和停用词表，之后处理的所有分片都复用
+    warm_up_nlp_models()
+    if lemma_entries:
+        get_default_lemmatizer().update(lemma_entries)
+
+
+class NlpWorkerPool(ProcessPoolExecutor):
+    """
+    create_nlp_worker_pool 创建的进程池，worker_count 为其进程数，供共用该进程池的函数确定分片数及在途任务数
+    """
+
+    def __init__(self, worker_count: int, initializer=None, initargs=()):
+        super().__init__(max_workers=worker_count, initializer=initializer, initargs=initargs)
+        self.worker_count = worker_count
+
+
+def create_nlp_worker_pool(workers: Optional[int] = None, lemma_entries=None) -> NlpWorkerPool:
+    """
+    创建已预加载标注器和停用词表的进程池，可传给 build_tagged_corpus / iter_tagged_documents 等函数的
+    executor 参数，在多次调用（如多个语料）之间共用，避免每次重新启动进程并加载模型。
+
+    lemma_entries: 各进程中词形还原缓存的初始内容（见 CachedLemmatizer.entries，可选）。
+    """
+    return NlpWorkerPool(workers or os.cpu_count() or 1, initializer=_init_nlp_worker, initargs=(lemma_entries,))
+
+
+def pool_worker_count(workers: Optional[int], executor: Optional[ProcessPoolExecutor] = None) -> int:
+    """
+    实际使用的进程数：共用的进程池为其 worker_count（见 create_nlp_worker_pool），
+    其它进程池无从得知，按CPU核心数计；否则为 workers，None 或 0 表示全部CPU核心。
+    """
+    if executor is not None:
+        return getattr(executor, 'worker_count', None) or os.cpu_count() or 1
+    return workers or os.cpu_count() or 1
+
+
+def _nlp_worker_pool(workers: Optional[int], executor: Optional[ProcessPoolExecutor], lemma_entries=None):
+    # 使用调用者提供的进程池（不在此处关闭），否则临时创建一个
+    return nullcontext(executor) if executor is not None else create_nlp_worker_pool(workers, lemma_entries)
+
+
+def _map_sentence_shards(func, sentences: List[str], workers: Optional[int],
+                         executor: Optional[ProcessPoolExecutor] = None, lemma_entries=None):
+    """
+    将句子切分为连续的分片，在进程池中对每个分片执行 func(shard)，按分片顺序产出结果。
+    分片首尾相接且按顺序合并，因此结果与逐句串行处理完全相同。
+    lemma_entries 只用于临时创建的进程池（见 create_nlp_worker_pool）。
+    """
+    worker_count = pool_worker_count(workers, executor)
+    # 分片数为进程数的数倍，使各进程的负载更均衡
+    shard_size = max(1, -(-len(sentences) // (worker_count * 4)))
+    shards = [sentences[i:i + shard_size] for i in range(0, len(sentences), shard_size)]
+    with _nlp_worker_pool(workers, executor, lemma_entries) as pool:
+        yield from pool.map(func, shards)
+
+
+def document_sentence_offsets(text: str, sentences: List[str], document_lengths: List[int]) -> List[int]:
+    """
+    文本由多个文档依次拼接而成、整体分句（split_sentences）时，每个文档第一个句子的下标。
+    句子归入其第一个字符所在的文档；跨越文档边界的句子归入前一个文档，没有句子开始于其中的文档为空。
+
+    split_sentences 合并空白后分句，句子是合并后文本的子串：逐段合并空白得到每个文档在合并后文本中的起始位置，
+    再依次查找各句子的起始位置进行比较。
+
+    Args:
+        text: 分句的原文。
+        sentences: split_sentences(text) 的结果。
+        document_lengths: 每个文档的字符数，总和应等于 len(text)。
+
+    Returns:
+        List[int]: 与 document_lengths 一一对应。
+    """
+    if sum(document_lengths) != len(text):
+        raise ValueError('文档长度之和与文本长度不一致')
+    # 每个文档第一个非空白字符在原文中的位置，没有非空白字符的文档沿用下一个文档的位置
+    non_whitespace = re.compile(r'\S')
+    starts = []
+    position = 0
+    for length in document_lengths:
+        match = non_whitespace.search(text, position, position + length)
+        starts.append(match.start() if match else None)
+        position += length
+    next_start = len(text)
+    for index in range(len(starts) - 1, -1, -1):
+        if starts[index] is None:
+            starts[index] = next_start
+        next_start = starts[index]
+
+    # 相邻两个位置之间的文本逐段合并空白，累计得到这些位置在合并后文本中的位置
+    collapsed_starts = []
+    collapsed_position = 0
+    previous = starts[0] if starts else 0
+    for start in starts:
+        if start > previous:
+            collapsed_position += len(re.sub(r'\s+', ' ', text[previous:start]))
+            previous = start
+        collapsed_starts.append(collapsed_position)
+
+    collapsed = re.sub(r'\s+', ' ', text.strip())
+    offsets = []
+    position = 0
+    document_index = 0
+    for sentence_index, sentence in enumerate(sentences):
+        start = collapsed.find(sentence, position)
+        if start < 0:
+            # 找不到时（不应发生）视为紧接上一句
+            start = position
+        position = start + len(sentence)
+        while document_index < len(collapsed_starts) and collapsed_starts[document_index] <= start:
+            offsets.append(sentence_index)
+            document_index += 1
+    offsets.extend([len(sentences)] * (len(collapsed_starts) - len(offsets)))
+    # 第一个文档总是从第一个句子开始
+    if offsets:
+        offsets[0] = 0
+    return offsets
+
+
+def build_tagged_corpus(text: str, tag: bool = True, workers: Optional[int] = 1,
+                        executor: Optional[ProcessPoolExecutor] = None,
+                        documents: Optional[List[Tuple[str, int]]] = None) -> TaggedCorpus:
+    """
+    对文本进行分句、分词，并（可选地）批量进行词性标注。
+
+    Args:
+        text (str): 要分析的文本。
+        tag (bool): 是否进行词性标注，默认为 True。
+        workers (int): 分词和标注使用的进程数。1 表示在当前进程中处理，None 或 0 表示使用全部CPU核心。
+        executor: 共用的进程池（可选，见 create_nlp_worker_pool）。提供时忽略 workers。
+        documents: 文本由多个文档依次拼接而成时的 [(文档名, 字符数), ...]（可选）。句子仍在整个文本上划分，
+                   结果带有文档边界，见 document_sentence_offsets；默认整个文本视为一个文档。
+
+    Returns:
+        TaggedCorpus: 标注结果。
+
+    Raises:
+        ValueError: 当输入文本为空或过短时。
+    """
+    sentences = split_sentences(text)
+
+    if workers == 1 and executor is None:
+        tagged_sentences = tokenize_and_tag_sentences(sentences, tag)
+    else:
+        tagged_sentences = []
+        for shard_tagged in _map_sentence_shards(partial(tokenize_and_tag_sentences, tag=tag), sentences, workers,
+                                                 executor):
+            tagged_sentences.extend(shard_tagged)
+
+    if documents is None:
+        return TaggedCorpus(sentences, tagged_sentences, tagged=tag)
+    return TaggedCorpus(sentences, tagged_sentences, tagged=tag, document_names=[name for name, _ in documents],
+                        document_offsets=document_sentence_offsets(text, sentences,
+                                                                   [length for _, length in documents]))
+
+
+def _tag_document(document: Tuple[str, str], tag: bool = True) -> TaggedCorpus:
+    name, text = document
+    try:
+        sentences = split_sentences(text)
+    except ValueError:
+        # 空文档或过短的文档
+        sentences = []
+    return TaggedCorpus(sentences, tokenize_and_tag_sentences(sentences, tag), tagged=tag, document_names=[name])
+
+
+def iter_tagged_documents(documents: Iterable[Tuple[str, str]], tag: bool = True, workers: Optional[int] = 1,
+                          executor: Optional[ProcessPoolExecutor] = None) -> Iterator[TaggedCorpus]:
+    """
+    逐个文档进行分句、分词及词性标注，按输入顺序产出每个文档的 TaggedCorpus。
+
+    与 build_tagged_corpus 不同，文档按需读取、处理完即交给调用者，不会把整个语料合并成一个字符串，
+    内存占用只与最大的单个文档相当。句子不会跨越文档边界。
+
+    Args:
+        documents: (文档名, 文本) 的可迭代对象，可以是生成器。
+        tag (bool): 是否进行词性标注，默认为 True。
+        workers (int): 进程数。1 表示在当前进程中处理，None 或 0 表示使用全部CPU核心；
+                       多进程时同时在处理中的文档数不超过进程数的两倍。
+        executor: 共用的进程池（可选，见 create_nlp_worker_pool）。提供时忽略 workers。
+                  提前关闭生成器（或出错）时，已提交但尚未开始的标注任务会被取消，不再占用共用的进程池。
+    """
+    if workers == 1 and executor is None:
+        for document in documents:
+            yield _tag_document(document, tag)
+        return
+
+    worker_count = pool_worker_count(workers, executor)
+    tag_document = partial(_tag_document, tag=tag)
+    with _nlp_worker_pool(workers, executor) as pool:
+        pending = deque()
+        try:
+            for document in documents:
+                pending.append(pool.submit(tag_document, document))
+                if len(pending) >= worker_count * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # 调用者提前关闭生成器或出错时，取消尚未开始的任务（共用的进程池不会随之关闭）
+            for future in pending:
+                future.cancel()
+
+
+# 定义一些常见的、有意义的词性组合模式
+# 标签以 '*' 结尾表示前缀通配，如 'VB*' 匹配 VB/VBD/VBG/VBN/VBP/VBZ，单独的 '*' 匹配任意标签
+COLLOCATION_PATTERNS = [
+    # 基础模式
+    (('VB', 'IN'), 'Verb+Prep'),  # 动词+介词，如：look at, depend on, talk about
+    (('VB', 'DT', 'NN'), 'Verb+Det+Noun'),  # 动词+限定词+名词，如：have a look, make a decision, take the chance
+    (('JJ', 'NN'), 'Adj+Noun'),  # 形容词+名词，如：red apple, important meeting, difficult situation
+    (('RB', 'VB'), 'Adv+Verb'),  # 副词+动词，如：quickly run, easily understand, carefully consider
+    (('NN', 'IN', 'NN'), 'Noun+Prep+Noun'),  # 名词+介词+名词，如：transition to adulthood, key to success, fear of failure
+    (('VB', 'RB'), 'Verb+Adv'),  # 动词+副词，如：speak clearly, work efficiently, respond immediately
+    (('IN', 'DT', 'NN'), 'Prep+Det+Noun'),  # 介词+限定词+名词，如：in the morning, on a mission, with an idea
+    (('NN', 'NN'), 'Compound Noun'),  # 复合名词，如: coffee cup, business meeting, research paper
+    (('VB', 'NN'), 'Verb+Noun'),  # 动词+名词，如: make progress, take notes, set goals
+
+    # 新增模式
+    (('VB', 'DT', 'JJ', 'NN'), 'Verb+Det+Adj+Noun'), # 动词+限定词+形容词+名词，如：have a great day, make an important decision, see the beautiful sunset
+    (('JJ', 'JJ', 'NN'), 'Adj+Adj+Noun'),  # 形容词+形容词+名词，如：beautiful red rose, large wooden table, small black cat
+    (('RB', 'JJ'), 'Adv+Adj'),  # 副词+形容词，如：extremely important, very happy, quite difficult
+    (('NN', 'VB'), 'Noun+Verb'),  # 名词+动词，如：problem solving, decision making, time management
+    (('VB', 'PRP'), 'Verb+Pronoun'),  # 动词+代词，如：help me, tell them, ask us
+    (('IN', 'JJ', 'NN'), 'Prep+Adj+Noun'),  # 介词+形容词+名词，如：in great detail, with special care, on important matters
+    (('DT', 'NN', 'IN', 'NN'), 'Det+Noun+Prep+Noun'), # 限定词+名词+介词+名词，如：the end of time, a piece of cake, the beginning of history
+    (('MD', 'VB', 'RB'), 'Modal+Verb+Adv'), # 情态动词+动词+副词，如：can easily do, will quickly go, should carefully consider
+    (('NN', 'IN', 'DT', 'NN'), 'Noun+Prep+Det+Noun'), # 名词+介词+限定词+名词，如：transition to a new, solution to the problem, key to a mystery
+    (('VB', 'TO', 'VB'), 'Verb+To+Verb'),  # 动词+不定式标记+动词，如：want to go, need to see, try to understand
+    (('VBG', 'NN'), 'Gerund+Noun'),  # 动名词+名词，如：reading books, making progress, writing letters
+    (('VBN', 'IN'), 'PastPart+Prep'),  # 过去分词+介词，如：interested in, covered with, known for
+    (('CD', 'NNS'), 'Number+PluralNoun'),  # 基数词+名词复数，如：three books, five years, ten students
+    (('JJ', 'CC', 'JJ'), 'Adj+Conj+Adj'),  # 形容词+连词+形容词，如：simple and effective, short but clear, tired yet happy
+    (('VB', 'PRP', 'RB'), 'Verb+Pronoun+Adv'),  # 动词+代词+副词，如：tell me quickly, show them clearly, ask us politely
+    (('RB', 'RB', 'JJ'), 'Adv+Adv+Adj'), # 副词+副词+形容词，如：very extremely hot, quite surprisingly good, rather unexpectedly cold
+    (('DT', 'JJ', 'NN', 'VBZ'), 'Det+Adj+Noun+Verb'), # 限定词+形容词+名词+动词，如：the quick brown fox jumps, a beautiful red rose blooms
+    (('PRP', 'MD', 'VB', 'RB'), 'Pron+Modal+Verb+Adv'), # 代词+情态动词+动词+副词，如：I can easily do, you should carefully consider, we will quickly go
+    (('NN', 'VBZ', 'JJ'), 'Noun+Verb+Adj'),  # 名词+动词+形容词，如: time flies fast, sun sets red, water runs clear
+    (('IN', 'PRP$', 'NN'), 'Prep+Possessive+Noun')  # 介词+物主代词+名词，如：in my opinion, on his behalf, with her permission
+]
+
+
+class _PatternTrieNode:
+    __slots__ = ('exact', 'wildcards', 'outputs', 'transitions')
+
+    def __init__(self):
+        self.exact = {}         # 标签 -> 子节点
+        self.wildcards = []     # (标签前缀, 子节点)，前缀为空表示匹配任意标签
+        self.outputs = []       # 在此节点结束的模式描述
+        self.transitions = {}   # 标签 -> 可到达的子节点列表（首次遇到该标签时计算并缓存）
+
+    def next_nodes(self, tag):
+        nodes = self.transitions.get(tag)
+        if nodes is None:
+            nodes = [node for prefix, node in self.wildcards if tag.startswith(prefix)]
+            if tag in self.exact:
+                nodes.append(self.exact[tag])
+            self.transitions[tag] = nodes
+        return nodes
+
+
+class PosPatternMatcher:
+    """
+    将词性模式列表编译为一棵以标签为边的前缀树，在一次线性扫描中统计所有模式的全部匹配。
+
+    每读入一个词，只需推进当前仍处于活动状态的前缀树节点（不超过最长模式的长度个），
+    因此耗时与词数成正比，与模式数量基本无关。节点对每种标签的转移结果会被缓存，
+    通配符只在第一次遇到某个标签时参与判断。
+
+    Args:
+        patterns: [(标签序列, 描述), ...]，格式同 COLLOCATION_PATTERNS。
+                  标签以 '*' 结尾表示前缀通配（如 'NN*'），单独的 '*' 匹配任意标签。
+    """
+
+    def __init__(self, patterns=None):
+        self.patterns = list(COLLOCATION_PATTERNS if patterns is None else patterns)
+        self.descriptions = list(dict.fromkeys(desc for _, desc in self.patterns))
+        self._root = _PatternTrieNode()
+        for tags, description in self.patterns:
+            if not tags:
+                raise ValueError(f"模式 '{description}' 的标签序列不能为空")
+            node = self._root
+            for tag in tags:
+                node = self._add_child(node, tag)
+            node.outputs.append(description)
+
+    @staticmethod
+    def _add_child(node, tag):
+        if tag.endswith('*'):
+            prefix = tag[:-1]
+            for existing_prefix, child in node.wildcards:
+                if existing_prefix == prefix:
+                    return child
+            child = _PatternTrieNode()
+            node.wildcards.append((prefix, child))
+            return child
+        if tag not in node.exact:
+            node.exact[tag] = _PatternTrieNode()
+        return node.exact[tag]
+
+    def iter_matches(self, tagged_tokens):
+        """
+        逐个产出匹配结果
+
+        Args:
+            tagged_tokens: [(word, tag), ...]，可以是任意可迭代对象
+
+        Returns:
+            生成器，产出 (起始位置, 长度, 模式描述)
+        """
+        return self.iter_tag_matches(tag for _, tag in tagged_tokens)
+
+    def iter_tag_matches(self, tags):
+        """
+        同 iter_matches，但只需要标签序列，适用于单词和标签分开存储的情况
+        """
+        root = self._root
+        active = []     # [(起始位置, 节点), ...]
+        for index, tag in enumerate(tags):
+            active.append((index, root))
+            advanced = []
+            for start, node in active:
+                for child in node.next_nodes(tag):
+                    for description in child.outputs:
+                        yield start, index - start + 1, description
+                    if child.exact or child.wildcards:
+                        advanced.append((start, child))
+            active = advanced
+
+    def count_matches(self, tagged_tokens, capacity: Optional[int] = None):
+        """
+        统计每种模式匹配到的短语及次数
+
+        Args:
+            tagged_tokens: [(word, tag), ...]
+            capacity: 指定时每种模式最多只跟踪这么多个不同的短语（近似计数，见 HeavyHitters.SpaceSaving），
+                      内存与语料规模无关；默认精确统计全部短语。
+
+        Returns:
+            Dict[str, Counter]: 模式描述 -> {短语: 次数}；近似计数时值为 SpaceSaving。
+        """
+        if not isinstance(tagged_tokens, (list, tuple)):
+            tagged_tokens = list(tagged_tokens)
+        if capacity is None:
+            counts = {desc: Counter() for desc in self.descriptions}
+            for start, length, description in self.iter_matches(tagged_tokens):
+                counts[description][' '.join([word for word, _ in tagged_tokens[start:start + length]])] += 1
+        else:
+            counts = {desc: SpaceSaving(capacity) for desc in self.descriptions}
+            for start, length, description in self.iter_matches(tagged_tokens):
+                counts[description].add(' '.join([word for word, _ in tagged_tokens[start:start + length]]))
+        return counts
+
+
+@lru_cache(maxsize=1)
+def _default_pattern_matcher():
+    return PosPatternMatcher(COLLOCATION_PATTERNS)
+
+
+def analyze_collocations(text: Union[str, TaggedCorpus], top_n=20, patterns=None, capacity: Optional[int] = None,
+                         error_bounds: Optional[Dict[str, int]] = None):
+    """
+    分析常见的词性搭配模式，这有助于发现英语中的习惯用法
+    例如：动词+介词（VB+IN）、形容词+名词（JJ+NN）等。
+
+    Args:
+        text: 要分析的文本，或已标注的 TaggedCorpus（此时不再重复分词和词性标注）。
+        top_n (int): 每种模式返回的最常见搭配数量，默认为20。
+        patterns: 自定义词性模式（可选，默认为 COLLOCATION_PATTERNS），支持 'VB*' 形式的前缀通配。
+        capacity (int): 近似模式（可选）：每种模式最多只跟踪这么多个不同的短语，适用于超大语料。
+                        返回的次数可能偏大，但不超过该模式的误差上限；capacity 远大于 top_n 时结果通常与精确统计相同。
+        error_bounds (dict): 近似模式下，传入的字典中会写入每种模式的误差上限（模式描述 -> 次数），0 表示结果精确。
+    """
+
+    if isinstance(text, TaggedCorpus):
+        if not text.tagged:
+            raise ValueError("搭配分析需要经过词性标注的 TaggedCorpus")
+        tagged_tokens = list(text.iter_tagged_tokens())
+    else:
+        ensure_nlp_data('tokenizer', 'tagger')
+        tokens = word_tokenize(text)
+        tagged_tokens = pos_tag(tokens)
+
+    matcher = _default_pattern_matcher() if patterns is None else PosPatternMatcher(patterns)
+    collocation_counts = matcher.count_matches(tagged_tokens, capacity=capacity)
+
+    # 获取每种模式的前top_n个最常见搭配
+    top_collocations = {}
+    for desc, counter in collocation_counts.items():
+        top_collocations[desc] = counter.most_common(top_n)
+        if error_bounds is not None and capacity is not None:
+            error_bounds[desc] = counter.error_bound
+
+    return top_collocations
+
+
+def _count_tagged_sentences(sentences: List[str],
+                            tagged_sentences: List[List[Tuple[str, Optional[str]]]],
+                            remove_stopwords: bool,
+                            min_word_length: int,
+                            lemmatizer: Optional[CachedLemmatizer]) -> Counter:
+    """
+    count_word_frequency 的核心：对已分词（及标注）的句子过滤、词形还原并计数。
+    """
     # 初始化工具
+    if remove_stopwords:
+        ensure_nlp_data('stopwords')
     stop_words = set(stopwords.words('english')) if remove_stopwords else set()
-    lemmatizer = WordNetLemmatizer() if lemmatize else None
     # 创建去除标点的翻译表
     translator = str.maketrans('', '', string.punctuation)
 
-    all_words = []
+    word_freq = Counter()
 
-    for sentence in sentences:
+    for sentence, tagged_words in zip(sentences, tagged_sentences):
         try:
-            # 2. 分词
-            words = word_tokenize(sentence)
-
-            processed_words = []
-            for word in words:
+            final_words = []
+            for word, tag in tagged_words:
                 # 2.1 转换为小写
                 word_lower = word.lower()
                 # 2.2 去除标点符号（使用translate方法，比循环判断效率高）[10,11](@ref)
@@ -439,39 +1189,105 @@ def count_word_frequency(text: str,
                 if remove_stopwords and word_no_punct in stop_words:
                     continue
 
-                processed_words.append(word_no_punct)
-
-            # 如果当前句子经过过滤后没有词，则跳过后续处理
-            if not processed_words:
-                continue
-
-            # 3. 词性标注与词形还原 (如果需要)
-            if lemmatize and lemmatizer:
-                # 对处理后的单词进行词性标注（注意：这里标注的是原始clean word，但实际用的是转小写后的，略有误差但可接受）
-                pos_tags = pos_tag(processed_words) # 返回形式如 [('word', 'tag'), ...]
-                final_words = []
-                for word, tag in pos_tags:
-                    # 获取WordNet词性
-                    wn_tag = ptb_to_wn_tag(tag)
-                    if wn_tag:
-                        # 进行词形还原
-                        lemma = lemmatizer.lemmatize(word, pos=wn_tag)
-                        final_words.append(lemma)
-                    else:
-                        final_words.append(word)
-            else:
-                final_words = processed_words # 不进行词形还原
+                # 3. 词形还原 (如果需要)：词性来自整句标注，比只对过滤后的单词标注更准确
+                wn_tag = ptb_to_wn_tag(tag) if lemmatizer is not None else None
+                if wn_tag:
+                    final_words.append(lemmatizer.lemmatize(word_no_punct, pos=wn_tag))
+                else:
+                    final_words.append(word_no_punct)
 
-            all_words.extend(final_words)
+            # 4. 统计词频
+            word_freq.update(final_words)
 
         except Exception as e:
             print(f"处理句子时出错: '{sentence}'. 错误: {str(e)}")
             traceback.print_exc()
             continue
 
-    # 4. 统计词频
-    word_freq = Counter(all_words)
+    return word_freq
+
+
+class _LemmaUseRecorder:
+    # 工作进程中使用：词形还原经由进程内的缓存，并按最近使用的先后记下用到的条目，
+    # 主进程依次 update() 后缓存内容及其 LRU 顺序与串行处理相同
+    def __init__(self, lemmatizer: CachedLemmatizer):
+        self.lemmatizer = lemmatizer
+        self.used_entries = OrderedDict()
+
+    def lemmatize(self, word: str, pos: str = WN_NOUN) -> str:
+        lemma = self.lemmatizer.lemmatize(word, pos)
+        key = (word, pos)
+        self.used_entries[key] = lemma
+        self.used_entries.move_to_end(key)
+        return lemma
 
+
+def _count_words_in_sentences(sentences: List[str], remove_stopwords: bool, min_word_length: int,
+                              lemmatize: bool) -> Tuple[Counter, List[Tuple[Tuple[str, str], str]]]:
+    # 在工作进程中执行：分词、标注并统计一个分片的词频，只把部分计数结果及用到的词形还原缓存条目传回主进程
+    tagged_sentences = tokenize_and_tag_sentences(sentences, tag=lemmatize)
+    lemmatizer = _LemmaUseRecorder(get_default_lemmatizer()) if lemmatize else None
+    word_freq = _count_tagged_sentences(sentences, tagged_sentences, remove_stopwords, min_word_length, lemmatizer)
+    return word_freq, list(lemmatizer.used_entries.items()) if lemmatizer is not None else []
+
+
+def count_word_frequency(text: Union[str, TaggedCorpus],
+                         remove_stopwords: bool = True,
+                         min_word_length: int = 2,
+                         lemmatize: bool = True,
+                         lemmatizer: Optional[CachedLemmatizer] = None,
+                         workers: Optional[int] = 1) -> Tuple[List[str], Dict[str, int]]:
+    """
+    统计文本中单词的频率，并进行详细的预处理。
+
+    Args:
+        text: 要分析的文本，或 build_tagged_corpus 生成的 TaggedCorpus（此时直接复用其分词和词性标注结果）。
+        remove_stopwords (bool): 是否移除停用词，默认为 True。
+        min_word_length (int): 单词最小长度，短于此长度的单词将被过滤，默认为 2。
+        lemmatize (bool): 是否进行词形还原，默认为 True。
+        lemmatizer (CachedLemmatizer): 词形还原使用的缓存（可选，默认为进程内共享的缓存）。
+                       多进程处理时各进程的缓存以它的内容为初始内容，各分片用到的条目再按顺序加回其中，
+                       缓存内容及最近使用的顺序与串行处理相同（其 hits / misses 不包括工作进程中的查找）。
+        workers (int): text 为字符串时，分词、标注和计数使用的进程数。1 表示在当前进程中处理，
+                       None 或 0 表示使用全部CPU核心。各进程统计连续的句子分片，再按顺序合并计数，
+                       结果与串行处理完全相同。
+
+    Returns:
+        Tuple[List[str], Dict[str, int]]: 句子列表和单词频率字典。
+
+    Raises:
+        ValueError: 当输入文本为空或过短时。
+    """
+
+    if isinstance(text, TaggedCorpus):
+        if lemmatize and not text.tagged:
+            raise ValueError("词形还原需要经过词性标注的 TaggedCorpus")
+        sentences, tagged_sentences = text.sentences, text.tagged_sentences
+    elif workers != 1:
+        # 1. 分句；分词、标注和计数在工作进程中按分片进行（map），主进程合并部分计数（reduce）
+        sentences = split_sentences(text)
+        word_freq = Counter()
+        count_shard = partial(_count_words_in_sentences, remove_stopwords=remove_stopwords,
+                              min_word_length=min_word_length, lemmatize=lemmatize)
+        share_cache = lemmatize and lemmatizer is not None
+        lemma_entries = lemmatizer.entries() if share_cache else None
+        for shard_freq, used_entries in _map_sentence_shards(count_shard, sentences, workers,
+                                                             lemma_entries=lemma_entries):
+            word_freq.update(shard_freq)
+            if share_cache:
+                lemmatizer.update(used_entries)
+        return sentences, dict(word_freq)
+    else:
+        # 1. 分句、分词及词性标注（只有词形还原时才需要词性）
+        corpus = build_tagged_corpus(text, tag=lemmatize)
+        sentences, tagged_sentences = corpus.sentences, corpus.tagged_sentences
+
+    if lemmatize and lemmatizer is None:
+        lemmatizer = get_default_lemmatizer()
+    elif not lemmatize:
+        lemmatizer = None
+
+    word_freq = _count_tagged_sentences(sentences, tagged_sentences, remove_stopwords, min_word_length, lemmatizer)
     return sentences, dict(word_freq)
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -538,14 +1354,46 @@ def demo_replace_unwanted_symbols():
         print("-" * 40)
 
 
+def demo_text_normalizer():
+    test_cases = [
+        "Hello, 你好！ This is a test. 123 456 🎉",
+        'pi is approx 3.14. pre-defined value: 5 - 3 = 2.',
+        'bi-directional 3-2 Version.1.2.3 !@#$Hello%^&*',
+        '中文—破折号 a你-b 3你.4 ＡＢＣ１２３－ａ 省略号…结束',
+        '',
+    ]
+
+    print("开始测试 TextNormalizer（与逐步处理的结果对比）：")
+    print("=" * 60)
+
+    for i, test_text in enumerate(test_cases, 1):
+        for keep_number in (False, True):
+            # 逐步处理的参考结果
+            expected_output = replace_unwanted_symbols(
+                keep_only_ascii(full_width_to_ascii(normalize_punctuation_to_ascii(test_text))))
+            if not keep_number:
+                expected_output = remove_digits(expected_output)
+            result = TextNormalizer(keep_number=keep_number).normalize(test_text)
+            print(f"测试用例 {i} (keep_number={keep_number}):")
+            print(f"  输入文本: '{test_text}'")
+            print(f"  期望输出: '{expected_output}'")
+            print(f"  实际输出: '{result}'")
+            print(f"  是否通过: {result == expected_output}")
+            print("-" * 40)
+
+
 def main():
     demo_remove_non_english()
     demo_replace_unwanted_symbols()
+    demo_text_normalizer()
 
 
 if __name__ == '__main__':
     try:
-        main()
+        if '--download-nlp-data' in sys.argv[1:]:
+            check_download_nlp_data(force='--force' in sys.argv[1:])
+        else:
+            main()
     except Exception as e:
         print(str(e))
         traceback.print_exc()
@@ -0,0 +1,192 @@
+import os
+import csv
+import re
+from itertools import chain, islice
+from typing import Iterable, Sequence
+from openpyxl import Workbook
+
+
+# next() 的默认值，表示没有更多的行
+_END = object()
+
+
+class TableWriter:
+    """
+    结果导出的基类：以表为单位逐行写出，不需要先构建完整的 DataFrame。
+
+    用法：
+        with open_table_writer(directory, 'result.xlsx', 'csv') as writer:
+            writer.write_table('Word Frequency', ['Word', 'Frequency'], rows)
+
+    子类实现 write_table 和 close，需要可选依赖的子类另外实现 import_dependencies。
+    """
+
+    # 文件扩展名
+    EXTENSION = ''
+
+    def __init__(self, base_path: str):
+        # base_path 为不含扩展名的输出路径
+        self.base_path = base_path
+        self.paths = []
+
+    @staticmethod
+    def import_dependencies():
+        # 导入所需的可选依赖，缺少时抛出 ImportError（见 check_export_format）
+        return ()
+
+    def write_table(self, name: str, columns: Sequence[str], rows: Iterable[Sequence]):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+        return False
+
+    def _table_path(self, name: str) -> str:
+        # 每张表一个文件：<base>_<表名>.<扩展名>
+        slug = re.sub(r'[^0-9A-Za-z]+', '_', name).strip('_').lower()
+        return f'{self.base_path}_{slug}{self.EXTENSION}'
+
+
+class XlsxTableWriter(TableWriter):
+    """
+    使用 openpyxl 的 write-only 模式写出 .xlsx：每行写出后即被序列化，内存占用与行数无关。
+    所有表写入同一个工作簿，每张表一个工作表；超过 Excel 单表行数上限时续写到新的工作表。
+    """
+
+    EXTENSION = '.xlsx'
+    MAX_ROWS = 1048576
+
+    def __init__(self, base_path: str):
+        super().__init__(base_path)
+        self.workbook = None
+
+    def write_table(self, name: str, columns: Sequence[str], rows: Iterable[Sequence]):
+        if self.workbook is None:
+            self.workbook = Workbook(write_only=True)
+        rows = iter(rows)
+        part = 1
+        while True:
+            # 工作表名最长 31 个字符
+            title = name[:31] if part == 1 else f'{name[:26]} ({part})'
+            sheet = self.workbook.create_sheet(title)
+            sheet.append(list(columns))
+            for row in islice(rows, self.MAX_ROWS - 1):
+                sheet.append(list(row))
+            # 先取下一行：行数恰好填满工作表时不创建空的续写工作表
+            next_row = next(rows, _END)
+            if next_row is _END:
+                break
+            rows = chain([next_row], rows)
+            part += 1
+
+    def close(self):
+        if self.workbook is not None:
+            path = self.base_path + self.EXTENSION
+            self.workbook.save(path)
+            self.paths.append(path)
+            self.workbook = None
+
+
+class CsvTableWriter(TableWriter):
+    """
+    每张表写出为一个 UTF-8（带 BOM，便于 Excel 直接打开）的 CSV 文件
+    """
+
+    EXTENSION = '.csv'
+
+    def write_table(self, name: str, columns: Sequence[str], rows: Iterable[Sequence]):
+        path = self._table_path(name)
+        with open(path, 'wt', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(rows)
+        self.paths.append(path)
+
+
+class ParquetTableWriter(TableWriter):
+    """
+    每张表写出为一个 Parquet 文件，按批写入（需要安装 pyarrow）。列类型由第一批数据推断。
+    """
+
+    EXTENSION = '.parquet'
+    BATCH_SIZE = 65536
+
+    def __init__(self, base_path: str):
+        super().__init__(base_path)
+        self.pa, self.pq = self.import_dependencies()
+
+    @staticmethod
+    def import_dependencies():
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("导出 Parquet 需要安装 pyarrow: pip install pyarrow")
+        return pyarrow, pyarrow.parquet
+
+    def write_table(self, name: str, columns: Sequence[str], rows: Iterable[Sequence]):
+        path = self._table_path(name)
+        columns = list(columns)
+        rows = iter(rows)
+        writer = None
+        try:
+            while True:
+                batch = list(islice(rows, self.BATCH_SIZE))
+                data = {column: [row[index] for row in batch] for index, column in enumerate(columns)}
+                if writer is None:
+                    table = self.pa.Table.from_pydict(data)
+                    writer = self.pq.ParquetWriter(path, table.schema)
+                elif batch:
+                    table = self.pa.Table.from_pydict(data, schema=writer.schema)
+                else:
+                    break
+                writer.write_table(table)
+                if len(batch) < self.BATCH_SIZE:
+                    break
+        finally:
+            if writer is not None:
+                writer.close()
+        self.paths.append(path)
+
+
+EXPORT_FORMATS = {
+    'xlsx': XlsxTableWriter,
+    'csv': CsvTableWriter,
+    'parquet': ParquetTableWriter,
+}
+
+
+def check_export_format(export_format: str):
+    """
+    在开始处理前检查导出格式，避免分析完成后才在导出时失败。
+
+    Raises:
+        ValueError: 不支持的导出格式，或缺少该格式所需的可选依赖（parquet 需要 pyarrow）时。
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {export_format}，可选: {', '.join(EXPORT_FORMATS)}")
+    try:
+        EXPORT_FORMATS[export_format].import_dependencies()
+    except ImportError as e:
+        raise ValueError(str(e)) from e
+
+
+def open_table_writer(directory: str, file_name: str, export_format: str = 'xlsx') -> TableWriter:
+    """
+    创建结果导出器。
+
+    Args:
+        directory: 输出目录。
+        file_name: 输出文件名，扩展名会被替换为导出格式对应的扩展名。
+        export_format: 'xlsx'、'csv' 或 'parquet'（需要安装 pyarrow）。
+    """
+    check_export_format(export_format)
+    base_path = os.path.join(directory, os.path.splitext(file_name)[0])
+    return EXPORT_FORMATS[export_format](base_path)
+
@@ -0,0 +1,112 @@
+import heapq
+from operator import itemgetter
+from typing import Dict, Hashable, List, Optional, Tuple
+
+
+class SpaceSaving:
+    """
+    Space-Saving 近似计数（Metwally et al., 2005）：最多只跟踪 capacity 个不同的元素，内存与输入规模无关，
+    用于在超大语料中找出出现次数最多的元素（如每种搭配模式下最常见的短语）。
+
+    跟踪的元素已满时，新元素替换当前计数最小的元素，并继承其计数（记为该元素的误差上限）。因此：
+        - 每个元素的计数只会偏大，真实次数在 [count - error, count] 之间；
+        - 真实次数大于 error_bound（= 最小计数，不超过 total / capacity）的元素一定在跟踪之中。
+
+    用法同 Counter 的一个子集：
+        counter = SpaceSaving(10000)
+        for phrase in phrases:
+            counter.add(phrase)
+        counter.most_common(20)
+
+    Args:
+        capacity (int): 最多跟踪的元素个数。
+    """
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("capacity 必须为正整数")
+        self.capacity = capacity
+        self.total = 0
+        self._counts = {}       # 元素 -> 计数
+        self._errors = {}       # 元素 -> 被替换进来时继承的计数（误差上限）
+        # 最小堆：(计数, 序号, 元素)。计数只增不减，堆中的计数是下界，出堆时与当前计数核对（惰性更新）
+        self._heap = []
+        self._sequence = 0
+
+    def add(self, item: Hashable, count: int = 1):
+        self.total += count
+        if item in self._counts:
+            self._counts[item] += count
+            return
+        if len(self._counts) < self.capacity:
+            self._counts[item] = count
+            self._errors[item] = 0
+        else:
+            minimum = self._pop_minimum()
+            del self._counts[minimum[2]], self._errors[minimum[2]]
+            self._counts[item] = minimum[0] + count
+            self._errors[item] = minimum[0]
+        self._sequence += 1
+        heapq.heappush(self._heap, (self._counts[item], self._sequence, item))
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    def _pop_minimum(self) -> Tuple[int, int, Hashable]:
+        while True:
+            count, sequence, item = heapq.heappop(self._heap)
+            if self._counts[item] == count:
+                return count, sequence, item
+            heapq.heappush(self._heap, (self._counts[item], sequence, item))
+
+    def __len__(self):
+        return len(self._counts)
+
+    def __contains__(self, item):
+        return item in self._counts
+
+    def __getitem__(self, item) -> int:
+        return self._counts.get(item, 0)
+
+    def error(self, item) -> int:
+        """
+        元素计数的误差上限（计数最多比真实次数大这么多）
+        """
+        return self._errors.get(item, 0)
+
+    @property
+    def error_bound(self) -> int:
+        """
+        全局误差上限：未跟踪的元素的真实次数不超过此值，跟踪中的元素的计数偏大也不超过此值。
+        跟踪的元素未满时计数是精确的，为 0。
+        """
+        if len(self._counts) < self.capacity:
+            return 0
+        return min(self._counts.values())
+
+    def most_common(self, n: Optional[int] = None) -> List[Tuple[Hashable, int]]:
+        """
+        与 Counter.most_common 相同的格式，返回 [(元素, 计数), ...]，计数相同时按开始跟踪的先后排序
+        """
+        return top_n_items(self._counts, n)
+
+    def guaranteed(self, n: Optional[int] = None) -> List[Tuple[Hashable, int]]:
+        """
+        most_common 的结果中，计数扣除误差后仍不小于下一名计数的元素——它们一定属于真实的前 n 名
+        """
+        ranked = self.most_common(None if n is None else n + 1)
+        # 前 n 名之外的元素（包括未跟踪的元素）的真实次数都不超过 threshold
+        threshold = ranked[n][1] if n is not None and len(ranked) > n else self.error_bound
+        ranked = ranked[:n]
+        return [(item, count) for item, count in ranked if count - self._errors[item] >= threshold]
+
+
+def top_n_items(counts: Dict[Hashable, int], n: Optional[int] = None) -> List[Tuple[Hashable, int]]:
+    """
+    精确的前 n 项（计数从高到低，相同时保持字典中的先后顺序，与 Counter.most_common 一致）。
+    直接在字典的视图上用大小为 n 的堆选出结果，不复制整个字典。
+    """
+    if n is None:
+        return sorted(counts.items(), key=itemgetter(1), reverse=True)
+    return heapq.nlargest(n, counts.items(), key=itemgetter(1))
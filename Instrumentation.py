@@ -0,0 +1,313 @@
+import os
+import sys
+import json
+import time
+import heapq
+import cProfile
+import threading
+from typing import Callable, Iterable, Iterator, Optional
+
+
+def _windows_memory_counters():
+    # GetProcessMemoryInfo 的结果，失败时返回 None
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                    ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        return counters
+    return None
+
+
+def peak_rss_mb(children: bool = False) -> Optional[float]:
+    """
+    当前进程到目前为止的峰值常驻内存（MB），无法获取时返回 None。
+
+    children 为 True 时返回已结束（并被回收）的子进程中最大的峰值常驻内存，如临时进程池关闭后的工作进程，
+    仅支持有 resource 模块的平台。
+    """
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+        # Linux 以 KB 为单位，macOS 以字节为单位
+        return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+    if sys.platform == 'win32' and not children:
+        counters = _windows_memory_counters()
+        if counters is not None:
+            return counters.PeakWorkingSetSize / (1 << 20)
+    return None
+
+
+def _proc_rss_mb(pid) -> Optional[float]:
+    # Linux：/proc/<pid>/statm 的第二项为常驻内存页数
+    try:
+        with open(f'/proc/{pid}/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1 << 20)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def current_rss_mb() -> Optional[float]:
+    """
+    当前进程此刻的常驻内存（MB），支持 Linux 和 Windows，无法获取时返回 None
+    """
+    if sys.platform.startswith('linux'):
+        return _proc_rss_mb('self')
+    if sys.platform == 'win32':
+        counters = _windows_memory_counters()
+        if counters is not None:
+            return counters.WorkingSetSize / (1 << 20)
+    return None
+
+
+def workers_rss_mb() -> Optional[float]:
+    """
+    当前进程的所有子进程（如进程池的工作进程）此刻的常驻内存之和（MB），仅支持 Linux，其它平台返回 None
+    """
+    if not sys.platform.startswith('linux'):
+        return None
+    children = set()
+    try:
+        for task in os.listdir('/proc/self/task'):
+            with open(f'/proc/self/task/{task}/children', 'rt') as f:
+                children.update(f.read().split())
+    except OSError:
+        return None
+    return sum(filter(None, map(_proc_rss_mb, children)), 0.0)
+
+
+class MemorySampler:
+    """
+    在后台线程中定期采样当前进程及其子进程的常驻内存，记录采样期间的峰值。
+
+    Args:
+        interval: 采样间隔（秒）。间隔内短暂出现的峰值可能测不到。
+    """
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.peak_rss_mb = None
+        self.workers_peak_rss_mb = None
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='memory-sampler', daemon=True)
+
+    def sample(self):
+        rss, workers = current_rss_mb(), workers_rss_mb()
+        if rss is not None:
+            self.peak_rss_mb = max(self.peak_rss_mb or 0.0, rss)
+        if workers is not None:
+            self.workers_peak_rss_mb = max(self.workers_peak_rss_mb or 0.0, workers)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self.sample()
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        self.sample()
+
+
+class StageRecord:
+    """
+    一个阶段的测量结果：墙钟时间、CPU 时间（仅本进程，不含工作进程）、内存、
+    各种计数（文件、句子、词、匹配等）及最慢的若干个文档。
+
+    内存均为阶段内的测量值（MB，无法获取时为 None）：阶段开始及结束时本进程的常驻内存、
+    阶段内采样得到的本进程峰值，以及子进程（工作进程）常驻内存之和的峰值（见 MemorySampler）。
+    """
+
+    def __init__(self, name: str, slowest: int = 10):
+        self.name = name
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.rss_start_mb = None
+        self.rss_end_mb = None
+        self.peak_rss_mb = None
+        self.workers_peak_rss_mb = None
+        self.counts = {}
+        self._slowest = slowest
+        self._documents = []        # 最小堆：(耗时, 文档名)
+
+    def add(self, key: str, count: int = 1):
+        self.counts[key] = self.counts.get(key, 0) + count
+
+    def document(self, name: str, seconds: float):
+        """
+        记录单个文档的耗时，只保留最慢的若干个
+        """
+        if len(self._documents) < self._slowest:
+            heapq.heappush(self._documents, (seconds, name))
+        elif seconds > self._documents[0][0]:
+            heapq.heapreplace(self._documents, (seconds, name))
+
+    def timed(self, items: Iterable, name_of: Callable = lambda item: item[0]) -> Iterator:
+        """
+        逐项产出 items，并把从请求一项到该项被处理完（即请求下一项）的时间记为该项的耗时
+        """
+        start = time.perf_counter()
+        for item in items:
+            yield item
+            end = time.perf_counter()
+            self.document(str(name_of(item)), end - start)
+            start = end
+
+    def to_dict(self) -> dict:
+        return {
+            'stage': self.name,
+            'wall_seconds': self.wall_seconds,
+            'cpu_seconds': self.cpu_seconds,
+            'rss_start_mb': self.rss_start_mb,
+            'rss_end_mb': self.rss_end_mb,
+            'rss_delta_mb': (self.rss_end_mb - self.rss_start_mb
+                             if self.rss_start_mb is not None and self.rss_end_mb is not None else None),
+            'peak_rss_mb': self.peak_rss_mb,
+            'workers_peak_rss_mb': self.workers_peak_rss_mb,
+            'counts': self.counts,
+            'slowest_documents': [{'document': name, 'seconds': seconds}
+                                  for seconds, name in sorted(self._documents, reverse=True)],
+        }
+
+
+class _NullStage:
+    # 未启用测量时使用：所有记录操作都是空操作
+    def add(self, key: str, count: int = 1):
+        pass
+
+    def document(self, name: str, seconds: float):
+        pass
+
+    def timed(self, items: Iterable, name_of: Callable = None) -> Iterable:
+        return items
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return False
+
+
+NULL_STAGE = _NullStage()
+
+
+class _StageContext:
+    def __init__(self, report: 'RunReport', name: str):
+        self.report = report
+        self.record = StageRecord(name, report.slowest)
+        self.profiler = None
+        self.sampler = None
+
+    def __enter__(self) -> StageRecord:
+        self.record.rss_start_mb = current_rss_mb()
+        if self.report.sample_interval:
+            self.sampler = MemorySampler(self.report.sample_interval)
+            self.sampler.start()
+        if self.record.name == self.report.profile_stage:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self.record
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.record.wall_seconds = time.perf_counter() - self._wall
+        self.record.cpu_seconds = time.process_time() - self._cpu
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(self.report.profile_path)
+            print(f'Profile of stage {self.record.name} is saved to: {self.report.profile_path}')
+        self.record.rss_end_mb = current_rss_mb()
+        if self.sampler is not None:
+            self.sampler.stop()
+            self.record.peak_rss_mb = max(filter(None, (self.sampler.peak_rss_mb, self.record.rss_start_mb,
+                                                        self.record.rss_end_mb)), default=None)
+            self.record.workers_peak_rss_mb = self.sampler.workers_peak_rss_mb
+        if exc_type is not None:
+            self.record.counts['failed'] = 1
+        self.report.stages.append(self.record)
+        return False
+
+
+class RunReport:
+    """
+    一次运行的分阶段测量报告。
+
+    用法：
+        report = RunReport('Friends', profile_stage='tagging')
+        with report.stage('tagging') as stage:
+            for name, text in stage.timed(documents):
+                ...
+            stage.add('tokens', token_count)
+        report.save('run_report.json')
+
+    Args:
+        name: 报告名称（如语料目录）。
+        profile_stage: 需要用 cProfile 分析的阶段名（可选）。
+        profile_path: cProfile 结果保存路径，可用 python -m pstats 或 snakeviz 查看。
+        slowest: 每个阶段保留的最慢文档数。
+        sample_interval: 阶段内内存采样的间隔（秒），0 表示不采样（阶段的峰值内存为 None）。
+    """
+
+    def __init__(self, name: str = '', profile_stage: Optional[str] = None,
+                 profile_path: Optional[str] = None, slowest: int = 10, sample_interval: float = 0.1):
+        self.name = name
+        self.profile_stage = profile_stage
+        self.profile_path = profile_path or f'profile_{profile_stage}.prof'
+        self.slowest = slowest
+        self.sample_interval = sample_interval
+        self.stages = []
+        self.created = time.strftime('%Y-%m-%d %H:%M:%S')
+
+    def stage(self, name: str) -> _StageContext:
+        return _StageContext(self, name)
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'created': self.created,
+            'total_wall_seconds': sum(record.wall_seconds for record in self.stages),
+            # 进程启动以来的峰值（不限于本次运行），以及已结束的子进程中最大的峰值
+            'peak_rss_mb': peak_rss_mb(),
+            'children_peak_rss_mb': peak_rss_mb(children=True),
+            'stages': [record.to_dict() for record in self.stages],
+        }
+
+    def save(self, file_path: str):
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(file_path, 'wt', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=1)
+        print(f'Run report is saved to: {file_path}')
+
+
+class _NullReport:
+    # 未启用测量时使用：stage() 返回同一个空操作对象，开销可忽略
+    stages = ()
+
+    def stage(self, name: str) -> _NullStage:
+        return NULL_STAGE
+
+    def save(self, file_path: str):
+        pass
+
+
+NULL_REPORT = _NullReport()
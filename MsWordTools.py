@@ -1,8 +1,12 @@
 import os
-import pythoncom
-import win32com.client
+import time
+import zipfile
 from pathlib import Path
+from lxml import etree
 from docx import Document
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from WordDocReader import read_doc_main_text, split_doc_text
 
 
 def remove_toc(doc):
@@ -68,34 +72,275 @@ def process_docx_file(file_path):
     return full_text
 
 
-def process_all_docx_files(directory_path):
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+W_BODY = W_NS + 'body'
+W_P = W_NS + 'p'
+W_R = W_NS + 'r'
+W_HYPERLINK = W_NS + 'hyperlink'
+W_TBL = W_NS + 'tbl'
+W_TR = W_NS + 'tr'
+W_TC = W_NS + 'tc'
+
+# 与 python-docx 的 Run.text 一致：run 内这些子元素对应的文本
+RUN_TEXT_ELEMENTS = {
+    W_NS + 't': None,  # None 表示取元素自身的文本
+    W_NS + 'tab': '\t',
+    W_NS + 'ptab': '\t',
+    W_NS + 'cr': '\n',
+    W_NS + 'noBreakHyphen': '-',
+}
+W_BR = W_NS + 'br'
+
+
+def _xml_run_text(run):
+    texts = []
+    for child in run:
+        if child.tag in RUN_TEXT_ELEMENTS:
+            text = RUN_TEXT_ELEMENTS[child.tag]
+            texts.append(child.text or '' if text is None else text)
+        elif child.tag == W_BR:
+            # 只有换行符（默认类型）对应 '\n'，分页符、分栏符为空
+            texts.append('\n' if child.get(W_NS + 'type', 'textWrapping') == 'textWrapping' else '')
+    return ''.join(texts)
+
+
+def _xml_paragraph_text(paragraph):
+    texts = []
+    for child in paragraph:
+        if child.tag == W_R:
+            texts.append(_xml_run_text(child))
+        elif child.tag == W_HYPERLINK:
+            texts.extend(_xml_run_text(run) for run in child.iterfind(W_R))
+    return ''.join(texts)
+
+
+def _xml_int_property(element, path, default):
+    prop = element.find(path)
+    return default if prop is None else int(prop.get(W_NS + 'val'))
+
+
+def _xml_table_rows_text(table):
+    """
+    按 python-docx 中 row.cells 的语义展开表格的每一行：
+    横向合并的单元格按跨越的列数重复，纵向合并的后续单元格取上方起始单元格的内容。
+    """
+    rows_text = []
+    cells_above = {}
+    for row in table.iterfind(W_TR):
+        grid_offset = _xml_int_property(row, f'{W_NS}trPr/{W_NS}gridBefore', 0)
+        row_cells = []
+        cells_current = {}
+        for tc in row.iterfind(W_TC):
+            grid_span = _xml_int_property(tc, f'{W_NS}tcPr/{W_NS}gridSpan', 1)
+            v_merge = tc.find(f'{W_NS}tcPr/{W_NS}vMerge')
+            if v_merge is not None and v_merge.get(W_NS + 'val', 'continue') == 'continue':
+                if grid_offset not in cells_above:
+                    raise ValueError('no tc at the same grid offset in the row above')
+                cells = cells_above[grid_offset]
+            else:
+                cell_text = '\n'.join(_xml_paragraph_text(p) for p in tc.iterfind(W_P))
+                cells = [cell_text] * grid_span
+            cells_current[grid_offset] = cells
+            row_cells.extend(cells)
+            grid_offset += grid_span
+        cells_above = cells_current
+
+        row_text = [cell_text.strip() for cell_text in row_cells if cell_text.strip()]
+        if row_text:
+            rows_text.append(' | '.join(row_text))
+    return rows_text
+
+
+def process_docx_file_xml(file_path):
+    """
+    process_docx_file 的轻量实现：不构建 python-docx 的文档对象模型，
+    直接从 zip 包中流式解析 word/document.xml（lxml iterparse），输出与 process_docx_file 相同的文本。
+    正文段落在解析后立即提取文本并释放，表格在整表解析完成时按行提取文本。
+    """
+    paragraphs_text = []
+    tables_text = []
+
+    with zipfile.ZipFile(file_path) as archive, archive.open('word/document.xml') as xml_file:
+        # lxml（python-docx 的依赖）在C层按标签过滤事件，只有段落和表格结束时才回到Python
+        for _, element in etree.iterparse(xml_file, events=('end',), tag=(W_P, W_TBL)):
+            parent = element.getparent()
+            # 只处理 w:body 的直接子元素，与 doc.paragraphs / doc.tables 一致；表格内的段落留给表格处理
+            if parent is None or parent.tag != W_BODY:
+                continue
+            if element.tag == W_P:
+                para_text = _xml_paragraph_text(element).strip()
+                if para_text:
+                    paragraphs_text.append(para_text)
+                # 释放已处理段落的内容。表格不在解析过程中释放：lxml 在 iterparse 过程中
+                # 删除大的子树需要逐节点整理命名空间，代价远高于保留到解析结束
+                element.clear()
+            else:
+                tables_text.extend(_xml_table_rows_text(element))
+
+    return '\n'.join(paragraphs_text) + '\n' + '\n'.join(tables_text)
+
+
+DOCX_EXTRACTORS = {
+    'python-docx': process_docx_file,
+    'xml': process_docx_file_xml,
+}
+
+# 纯文本文档（如 KidsLesson 中的教案）直接读取，与docx文档一样参与清洗和分析
+TEXT_EXTENSIONS = ('.txt', '.md')
+# Word 97-2003 二进制文档，用 WordDocReader 直接提取文本，不需要转换为docx
+DOC_EXTENSIONS = ('.doc',)
+
+
+def process_doc_file(file_path):
+    """
+    处理单个 .doc 文件（Word 97-2003），输出格式与 process_docx_file 相同：非空的正文段落，
+    之后是表格的每一行（单元格以 ' | ' 分隔）。纯Python实现，不依赖Word，可在任意平台上并行处理。
+    """
+    row_ends = []
+    text = read_doc_main_text(file_path, row_ends)
+    paragraphs, rows = split_doc_text(text, row_ends)
+    paragraphs_text = '\n'.join([para.strip() for para in paragraphs if para.strip()])
+    tables_text = []
+    for row in rows:
+        row_text = [cell.strip() for cell in row if cell.strip()]
+        if row_text:
+            tables_text.append(' | '.join(row_text))
+    return paragraphs_text + '\n' + '\n'.join(tables_text)
+
+
+def process_text_file(file_path):
+    """
+    读取纯文本文档（UTF-8，可带BOM），无法解码的字节以替换字符代替
+    """
+    with open(file_path, 'rt', encoding='utf-8-sig', errors='replace') as f:
+        return f.read()
+
+
+def _process_docx_file_safe(file_path, extractor='python-docx'):
+    """
+    进程池中执行的包装函数：异常不跨进程抛出，而是以 (content, error) 的形式返回
+    """
+    try:
+        if file_path.lower().endswith(TEXT_EXTENSIONS):
+            return process_text_file(file_path), None
+        if file_path.lower().endswith(DOC_EXTENSIONS):
+            return process_doc_file(file_path), None
+        return DOCX_EXTRACTORS[extractor](file_path), None
+    except Exception as e:
+        return None, str(e)
+
+
+def iter_docx_files(directory_path, workers=1, ordered=False, filenames=None, extractor='python-docx',
+                    executor=None, max_pending=None):
     """
-    批量处理指定目录下的所有docx文件
+    逐个产出指定目录下docx文件的处理结果，下游无需等待全部文件解析完成即可开始处理
+
+    :param directory_path: docx文件所在目录
+    :param workers: 并行解析的进程数。1 表示在当前进程中串行处理，None 或 0 表示使用全部CPU核心
+    :param ordered: 为 True 时按目录列举顺序（或 filenames 的顺序）产出结果，否则按解析完成的先后顺序产出
+    :param filenames: 只处理目录下的这些文件（可选，默认为目录下全部docx及doc文件）
+    :param extractor: 文本提取实现，'python-docx'（默认）或 'xml'（流式解析，速度更快）；
+                      .doc 文件用 process_doc_file 提取，filenames 中的 .txt/.md 文件按纯文本读取
+    :param executor: 共用的进程池（可选）。提供时忽略 workers，结束时不关闭该进程池
+    :param max_pending: 同时提交的文件数上限（可选，默认一次全部提交）。下游消费较慢时，
+                        已解析但尚未产出的结果不超过此数量，共用的进程池中其它任务也不会被全部排在后面
+    :return: 生成器，产出 (filename, text)
     """
-    processed_contents = {}
-    for filename in os.listdir(directory_path):
-        if filename.endswith('.docx'):
-            file_path = os.path.join(directory_path, filename)
-            try:
-                content = process_docx_file(file_path)
-                processed_contents[filename] = content
+    if filenames is None:
+        filenames = [filename for filename in os.listdir(directory_path)
+                     if filename.endswith(('.docx',) + DOC_EXTENSIONS)]
+
+    if workers == 1 and executor is None:
+        for filename in filenames:
+            content, error = _process_docx_file_safe(os.path.join(directory_path, filename), extractor)
+            if error is None:
                 print(f"成功处理: {filename}")
-            except Exception as e:
-                print(f"处理文件 {filename} 时出错: {str(e)}")
-    return processed_contents
+                yield filename, content
+            else:
+                print(f"处理文件 {filename} 时出错: {error}")
+        return
+
+    shared = executor is not None
+    if not shared:
+        executor = ProcessPoolExecutor(max_workers=workers or None)
+    # 已提交、尚未产出的任务 -> 文件名，按提交顺序排列
+    futures = {}
+    # 已完成、尚未产出的任务（ordered 为 False 时使用）
+    ready = set()
+    remaining = iter(filenames)
+
+    def submit_next():
+        filename = next(remaining, None)
+        if filename is not None:
+            futures[executor.submit(_process_docx_file_safe, os.path.join(directory_path, filename),
+                                    extractor)] = filename
+
+    try:
+        for _ in range(len(filenames) if max_pending is None else max(max_pending, 1)):
+            submit_next()
+        while futures:
+            if ordered:
+                future = next(iter(futures))
+            else:
+                if not ready:
+                    ready = wait(futures, return_when=FIRST_COMPLETED).done
+                future = ready.pop()
+            filename = futures.pop(future)
+            content, error = future.result()
+            submit_next()
+            if error is None:
+                print(f"成功处理: {filename}")
+                yield filename, content
+            else:
+                print(f"处理文件 {filename} 时出错: {error}")
+    finally:
+        # 下游提前停止迭代时，取消尚未开始的任务
+        if shared:
+            for future in futures:
+                future.cancel()
+        else:
+            executor.shutdown(wait=True, cancel_futures=True)
 
 
-def convert_doc_to_docx(input_path, output_path=None):
+def process_all_docx_files(directory_path, workers=1, extractor='python-docx'):
+    """
+    批量处理指定目录下的所有docx及doc文件
+
+    :param directory_path: docx文件所在目录
+    :param workers: 并行解析的进程数，含义同 iter_docx_files
+    :param extractor: 文本提取实现，含义同 iter_docx_files
+    :return: {filename: text}，顺序与目录列举顺序一致
+    """
+    return dict(iter_docx_files(directory_path, workers=workers, ordered=True, extractor=extractor))
+
+
+def _open_word_application():
+    """
+    启动一个后台运行的 Word 应用程序。win32com 只在需要时导入，其它功能不依赖 Windows 和 pywin32
+    """
+    try:
+        import pythoncom
+        import win32com.client
+    except ImportError as e:
+        raise ImportError("将 .doc 转换为 .docx 需要 Windows、Microsoft Word 及 pywin32；"
+                          "只需要提取文本时可以直接使用 process_doc_file") from e
+    # 初始化 COM 环境（单线程）
+    pythoncom.CoInitialize()
+    word = win32com.client.Dispatch("Word.Application")
+    word.Visible = False  # 后台运行，不显示界面
+    word.DisplayAlerts = False  # 关闭警告提示
+    return word
+
+
+def convert_doc_to_docx(input_path, output_path=None, word=None):
     """
     使用 Word COM 接口将单个 .doc 文件转换为 .docx 文件
 
     :param input_path: 输入的 .doc 文件路径
     :param output_path: 输出的 .docx 文件路径（可选，默认为同一目录）
+    :param word: 已启动的 Word 应用程序（可选）。未提供时为本次转换启动一个，转换结束后退出
     :return: 成功返回 True，失败返回 False
     """
-    # 初始化 COM 环境（单线程）
-    pythoncom.CoInitialize()
-
     # 确保输入文件存在
     if not os.path.isfile(input_path):
         print(f"错误：文件不存在 - {input_path}")
@@ -111,15 +356,13 @@ def convert_doc_to_docx(input_path, output_path=None):
     output_path_abs = os.path.abspath(output_path)
 
     # 确保输出目录存在
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    os.makedirs(os.path.dirname(output_path_abs), exist_ok=True)
 
-    word = None
+    own_word = word is None
     doc = None
     try:
-        # 启动 Word 应用程序
-        word = win32com.client.Dispatch("Word.Application")
-        word.Visible = False  # 后台运行，不显示界面
-        word.DisplayAlerts = False  # 关闭警告提示
+        if own_word:
+            word = _open_word_application()
 
         # 打开 .doc 文档
         doc = word.Documents.Open(input_path_abs)
@@ -137,20 +380,21 @@ def convert_doc_to_docx(input_path, output_path=None):
     finally:
         # 确保无论如何都尝试释放资源
         try:
-            if 'doc' in locals():
+            if doc is not None:
                 doc.Close(SaveChanges=False)
-        except:
+        except Exception:
             pass
         try:
-            if 'word' in locals():
+            if own_word and word is not None:
                 word.Quit()
-        except:
+        except Exception:
             pass
 
 
 def batch_convert_doc_to_docx(input_dir, output_dir=None, recursive=True):
     """
-    批量转换目录中的所有 .doc 文件
+    批量转换目录中的所有 .doc 文件，所有文件共用一个 Word 应用程序。
+    只需要分析文本时不必转换：iter_docx_files / process_all_docx_files 可以直接处理 .doc 文件。
 
     :param input_dir: 包含 .doc 文件的输入目录
     :param output_dir: 输出目录（可选，默认为输入目录）
@@ -172,12 +416,24 @@ def batch_convert_doc_to_docx(input_dir, output_dir=None, recursive=True):
 
     print(f"找到 {total_files} 个 .doc 文件，开始转换...")
 
+    try:
+        word = _open_word_application()
+    except Exception as e:
+        print(f"无法启动 Word: {str(e)}")
+        return
+
     success_count = 0
-    # 遍历并转换每个文件
-    for i, doc_path in enumerate(doc_files, 1):
-        print(f"正在处理 ({i}/{total_files}): {doc_path.name}")
-        if convert_doc_to_docx(str(doc_path), output_dir):
-            success_count += 1
+    try:
+        # 遍历并转换每个文件
+        for i, doc_path in enumerate(doc_files, 1):
+            print(f"正在处理 ({i}/{total_files}): {doc_path.name}")
+            if convert_doc_to_docx(str(doc_path), output_dir, word=word):
+                success_count += 1
+    finally:
+        try:
+            word.Quit()
+        except Exception:
+            pass
 
     # 输出转换报告
     print("\n" + "=" * 50)
@@ -185,3 +441,31 @@ def batch_convert_doc_to_docx(input_dir, output_dir=None, recursive=True):
     print(f"成功: {success_count} 个")
     print(f"失败: {total_files - success_count} 个")
     print("=" * 50)
+
+
+def compare_docx_extractors(directories=('PeppaPig', 'HoC', 'Friends')):
+    """
+    在指定目录的docx文件上校验 'xml' 提取结果与 python-docx 完全一致，并比较两者耗时
+    """
+    for directory in directories:
+        filenames = [filename for filename in os.listdir(directory) if filename.endswith('.docx')]
+        elapsed = {name: 0.0 for name in DOCX_EXTRACTORS}
+        mismatches = []
+        for filename in filenames:
+            file_path = os.path.join(directory, filename)
+            results = {}
+            for name, extractor in DOCX_EXTRACTORS.items():
+                start = time.perf_counter()
+                results[name] = extractor(file_path)
+                elapsed[name] += time.perf_counter() - start
+            if results['xml'] != results['python-docx']:
+                mismatches.append(filename)
+
+        print(f"{directory}: {len(filenames)} 个文件, 不一致: {len(mismatches)} {mismatches if mismatches else ''}")
+        for name, seconds in elapsed.items():
+            print(f"  {name:<12} {seconds:8.2f}s")
+        print(f"  加速比: {elapsed['python-docx'] / max(elapsed['xml'], 1e-9):.1f}x")
+
+
+if __name__ == '__main__':
+    compare_docx_extractors()
@@ -0,0 +1,112 @@
+import numpy as np
+from typing import List, Tuple
+
+from CorpusStore import TaggedCorpusStore, join_tokens
+
+
+# 导出及 mine_phrases 结果的列
+PHRASE_COLUMNS = ['Phrase', 'Length', 'Frequency', 'PMI', 'Log-Likelihood']
+
+
+def _log_likelihood(count: np.ndarray, count_a: np.ndarray, count_b: np.ndarray, total: int) -> np.ndarray:
+    """
+    Dunning 对数似然比 G²：把短语看作 (a, b) 两部分，按 2×2 列联表计算两部分共现的显著程度
+    """
+    count, count_a, count_b = (np.asarray(value, dtype=np.float64) for value in (count, count_a, count_b))
+    observed = np.stack([count, count_a - count, count_b - count, total - count_a - count_b + count])
+    expected = np.stack([count_a * count_b, count_a * (total - count_b),
+                         (total - count_a) * count_b, (total - count_a) * (total - count_b)]) / total
+    with np.errstate(divide='ignore', invalid='ignore'):
+        terms = np.where(observed > 0, observed * np.log(observed / expected), 0)
+    return 2 * terms.sum(axis=0)
+
+
+def _pmi(count: np.ndarray, count_a: np.ndarray, count_b: np.ndarray, total: int) -> np.ndarray:
+    return np.log2(count * float(total) / (count_a.astype(np.float64) * count_b))
+
+
+def mine_phrases(store: TaggedCorpusStore, min_length: int = 2, max_length: int = 6,
+                 min_count: int = 5) -> List[Tuple[str, int, int, float, float]]:
+    """
+    在整个语料的词序列上挖掘高频的固定表达（n 元组），如 "I don't know"、"what are you doing"，
+    不局限于 COLLOCATION_PATTERNS 中的词性模式。
+
+    词按 count_word_frequency 的方式归一化（小写、去除标点）后比较；n 元组不跨越句子边界，也不包含标点。
+    计数逐级进行：每个 n 元组的编号由其前 n-1 个词组成的 (n-1) 元组编号与最后一个词的编号组合而成，
+    在整数数组上排序去重得到次数。低于 min_count 的 (n-1) 元组不再参与扩展：一个 n 元组的前后两个
+    (n-1) 元组都必须是高频的，它才可能是高频的，因此随着 n 增大需要统计的位置迅速减少。
+
+    关联度把短语在第一个词之后或最后一个词之前切分为两部分，分别计算后取较小（较弱）的一个：
+        PMI: log2(P(短语) / (P(前半部分) P(后半部分)))，越大说明各部分越倾向于一起出现；
+        Log-Likelihood: Dunning 对数似然比 G²，兼顾频率，低频短语不会因偶然共现而得到过高的分数。
+
+    Args:
+        store: 语料存储。
+        min_length, max_length: 短语的最小、最大词数。
+        min_count: 最小出现次数。
+
+    Returns:
+        List[Tuple[str, int, int, float, float]]: (短语, 词数, 次数, PMI, 对数似然比)，按次数从高到低排序，
+        次数相同时短的在前、先出现的在前。短语取其第一次出现时的原文。
+    """
+    if min_length < 2 or max_length < min_length:
+        raise ValueError("短语长度范围无效，要求 2 <= min_length <= max_length")
+
+    token_ids = np.asarray(store.token_ids)
+    token_count = len(token_ids)
+    vocabulary_size = len(store.vocabulary)
+    if token_count < min_length:
+        return []
+    # 一元组的编号即归一化形式在词表中的编号；归一化后为空的（标点）不参与
+    norm_ids = np.asarray(store.vocab_norm_ids)[token_ids].astype(np.int64)
+    is_word = np.fromiter((bool(word) for word in store.vocabulary), dtype=bool, count=vocabulary_size)
+    word_mask = is_word[norm_ids]
+    word_counts = np.bincount(norm_ids[word_mask], minlength=vocabulary_size)
+    total = int(word_counts.sum())
+
+    level_ids = np.where(word_mask & (word_counts[norm_ids] >= min_count), norm_ids, -1)
+    level_counts = word_counts
+    # same_sentence[i]：第 i 个词与第 i+1 个词属于同一句子（文档的边界也是句子的边界）
+    same_sentence = np.ones(token_count - 1, dtype=bool)
+    sentence_starts = np.asarray(store.sentence_offsets)[1:-1]
+    same_sentence[sentence_starts[(sentence_starts > 0) & (sentence_starts < token_count)] - 1] = False
+
+    phrases = []
+    for length in range(2, max_length + 1):
+        previous_ids = level_ids
+        # 前后两个 (n-1) 元组都是高频的位置才可能是高频的 n 元组；二元组还需要两个词在同一句子中
+        candidates = (previous_ids[:-1] >= 0) & (previous_ids[1:] >= 0)
+        if length == 2:
+            candidates &= same_sentence
+        positions = np.flatnonzero(candidates)
+        if not len(positions):
+            break
+        keys = previous_ids[positions] * vocabulary_size + norm_ids[positions + length - 1]
+        _, first_index, inverse, counts = np.unique(keys, return_index=True, return_inverse=True,
+                                                    return_counts=True)
+        frequent = counts >= min_count
+        new_ids = np.full(len(counts), -1, dtype=np.int64)
+        new_ids[frequent] = np.arange(np.count_nonzero(frequent))
+        level_ids = np.full(token_count - length + 1, -1, dtype=np.int64)
+        level_ids[positions] = new_ids[inverse.ravel()]
+
+        if length >= min_length and frequent.any():
+            first_positions = positions[first_index[frequent]]
+            frequent_counts = counts[frequent]
+            # 两种切分：第一个词 + 其余部分，前 n-1 个词 + 最后一个词
+            first_word = word_counts[norm_ids[first_positions]]
+            rest = level_counts[previous_ids[first_positions + 1]]
+            head = level_counts[previous_ids[first_positions]]
+            last_word = word_counts[norm_ids[first_positions + length - 1]]
+            pmi = np.minimum(_pmi(frequent_counts, first_word, rest, total),
+                             _pmi(frequent_counts, head, last_word, total))
+            log_likelihood = np.minimum(_log_likelihood(frequent_counts, first_word, rest, total),
+                                        _log_likelihood(frequent_counts, head, last_word, total))
+            for start, count, pmi_score, ll_score in zip(first_positions.tolist(), frequent_counts.tolist(),
+                                                         pmi.tolist(), log_likelihood.tolist()):
+                words = [store.vocabulary[i] for i in token_ids[start:start + length].tolist()]
+                phrases.append((start, join_tokens(words), length, count, pmi_score, ll_score))
+        level_counts = counts[frequent]
+
+    phrases.sort(key=lambda item: (-item[3], item[2], item[0]))
+    return [phrase[1:] for phrase in phrases]
@@ -0,0 +1,72 @@
+import queue
+import threading
+from typing import Iterable, Iterator, Optional
+
+
+# 队列中表示生产者已结束
+_END = object()
+
+
+class _Failure:
+    # 生产者线程中的异常，经队列交给调用者重新抛出
+    def __init__(self, exception: BaseException):
+        self.exception = exception
+
+
+def iter_prefetched(iterable: Iterable, maxsize: int = 8, name: Optional[str] = None) -> Iterator:
+    """
+    在后台线程中迭代 iterable，结果经容量为 maxsize 的队列按原顺序交给调用者，
+    使上游（如文档读取和清洗）与下游（如写入、提交标注任务）同时进行。
+
+    - 背压：队列满时后台线程等待，领先调用者的结果不超过 maxsize 个，内存占用有界；
+    - 异常：后台线程中的异常在调用者取到该位置时重新抛出；
+    - 关闭：调用者提前停止迭代（break、异常或关闭生成器）时，后台线程在处理完当前结果后停止，
+      并关闭 iterable（生成器的 finally 得以执行，如取消尚未开始的进程池任务），调用者等待其退出后才返回。
+
+    Args:
+        iterable: 任意可迭代对象，在后台线程中迭代。
+        maxsize: 队列容量。
+        name: 后台线程名（可选）。
+    """
+    items = queue.Queue(maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        # 定时检查调用者是否已停止，避免在满队列上永久等待
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not put(item):
+                    break
+            else:
+                put(_END)
+        except BaseException as e:
+            put(_Failure(e))
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=produce, name=name or 'prefetch', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.exception
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
@@ -0,0 +1,226 @@
+import re
+import numpy as np
+from collections import Counter
+from itertools import islice
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from CorpusStore import TaggedCorpusStore
+from EnglishAnalysisTools import PosPatternMatcher, COLLOCATION_PATTERNS
+
+
+# 除换行符外与 str.isspace（即正则的 \s）一致的空白字符，逐行处理时 \s 只能匹配到这些字符
+_INLINE_SPACE = ''.join(re.escape(chr(code)) for code in range(0x3001) if chr(code).isspace() and chr(code) != '\n')
+# 行首的角色名（字母及空白，不跨行）后跟冒号和可选空白，例如 "Peppa: "、"Daddy Pig: "。
+# 在整个文本上按多行模式匹配，与逐行执行 re.sub(r'^[A-Za-z\s]+:\s*', '', line) 的结果相同
+ROLE_PATTERN = re.compile(rf'^[A-Za-z{_INLINE_SPACE}]+:[{_INLINE_SPACE}]*', re.MULTILINE)
+# 逐行解析：可选的角色名，及其后的台词（即去除角色信息后的整行）。每一行恰好产生一个匹配
+SCRIPT_LINE_PATTERN = re.compile(rf'^(?:([A-Za-z{_INLINE_SPACE}]+):[{_INLINE_SPACE}]*)?([^\n]*)', re.MULTILINE)
+# 与 str.isspace 一致的空白字符
+_WHITESPACE_CODES = np.array([code for code in range(0x3001) if chr(code).isspace()], dtype=np.uint32)
+
+# 导出的表格及其列
+SPEAKER_COLUMNS = ['Speaker', 'Lines', 'Sentences', 'Counted Words', 'Vocabulary']
+SPEAKER_WORD_COLUMNS = ['Speaker', 'Word', 'Frequency']
+SPEAKER_COLLOCATION_COLUMNS = ['Speaker', 'Pattern', 'Phrase', 'Frequency']
+
+
+class ScriptLine(NamedTuple):
+    """
+    剧本中的一行。没有角色名的行（旁白、场景说明、字幕）speaker 为空字符串。
+    """
+    document: str
+    line_number: int
+    speaker: str
+    utterance: str
+
+
+def parse_script(text: str, document: str = '') -> List[ScriptLine]:
+    """
+    一次正则扫描把文本解析为逐行的记录，每一行（按 '\\n' 分隔）对应一条记录，行号从 1 开始。
+
+    角色名的识别规则与 remove_role_info 相同，因此 '\\n'.join(line.utterance for line in lines)
+    即为去除角色信息后的文本。角色名中的连续空白合并为一个空格。
+    """
+    return [ScriptLine(document, line_number, ' '.join(speaker.split()) if speaker else '', utterance)
+            for line_number, (speaker, utterance) in enumerate(SCRIPT_LINE_PATTERN.findall(text), 1)]
+
+
+def sentence_speakers(text: str, line_speakers: Sequence[int], sentences: Sequence[str],
+                      line_starts: Optional[Sequence[int]] = None) -> np.ndarray:
+    """
+    确定 split_sentences(text) 得到的每个句子的说话人：句子第一个字符所在行的说话人。
+
+    split_sentences 先去除首尾空白并把连续空白合并为一个空格再分句，句子是合并后文本的子串。
+    这里用 NumPy 计算原文每个字符在合并后文本中的位置，把每行第一个非空白字符换算过去，
+    再依次查找各句子在合并后文本中的起始位置，二分查找其所在的行。
+
+    Args:
+        text: 分句的原文。
+        line_speakers: 每行的说话人编号，-1 表示没有说话人。
+        sentences: 对 text 分句的结果，按先后顺序。
+        line_starts: 每行在 text 中的起始位置，默认按 '\\n' 划分。
+
+    Returns:
+        np.ndarray: 每个句子的说话人编号，-1 表示没有说话人。
+    """
+    result = np.full(len(sentences), -1, dtype=np.int64)
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    whitespace = np.isin(codes, _WHITESPACE_CODES)
+    non_whitespace = np.flatnonzero(~whitespace)
+    if not len(non_whitespace) or not len(sentences):
+        return result
+    # 合并后保留的字符：非空白字符，及每段空白的第一个字符（去除首尾空白）
+    keep = ~whitespace
+    keep[1:] |= whitespace[1:] & ~whitespace[:-1]
+    keep[:non_whitespace[0]] = False
+    keep[non_whitespace[-1] + 1:] = False
+    collapsed_index = np.cumsum(keep) - 1
+
+    if line_starts is None:
+        line_starts = np.concatenate([[0], np.flatnonzero(codes == ord('\n')) + 1])
+    line_starts = np.asarray(line_starts, dtype=np.int64)
+    line_speakers = np.asarray(line_speakers, dtype=np.int64)
+    if len(line_starts) != len(line_speakers):
+        raise ValueError('行数与说话人数不一致')
+    # 每行第一个非空白字符；空行不参与
+    line_ends = np.append(line_starts[1:], len(codes))
+    first = np.searchsorted(non_whitespace, line_starts)
+    has_text = first < len(non_whitespace)
+    has_text[has_text] = non_whitespace[first[has_text]] < line_ends[has_text]
+    line_positions = collapsed_index[non_whitespace[first[has_text]]]
+    line_speakers = line_speakers[has_text]
+
+    collapsed = re.sub(r'\s+', ' ', text.strip())
+    sentence_starts = []
+    position = 0
+    for sentence in sentences:
+        start = collapsed.find(sentence, position)
+        if start < 0:
+            # 找不到时（不应发生）归入上一句的位置
+            sentence_starts.append(position)
+            continue
+        sentence_starts.append(start)
+        position = start + len(sentence)
+    line_ids = np.searchsorted(line_positions, sentence_starts, side='right') - 1
+    found = line_ids >= 0
+    result[found] = line_speakers[line_ids[found]]
+    return result
+
+
+def store_sentence_speakers(store: TaggedCorpusStore, documents: Iterable[Tuple[str, str]],
+                            document_speakers: Dict[str, List[int]], per_document: bool = True) -> np.ndarray:
+    """
+    语料存储中每个句子的说话人编号。
+
+    Args:
+        store: 语料存储。
+        documents: (文件名, 文本) 的可迭代对象，即按顺序写入 pure_text.txt 的各文档（换行符未经转换），
+                   可以是生成器，如 iter_pure_text_documents(directory, newline='')。
+        document_speakers: 文件名 -> 该文档每行的说话人编号。
+        per_document: 存储是否按文档分句（streaming），句子不跨越文档边界。此时 documents 应与存储中的文档一一对应。
+
+    按文档分句时逐个文档读取文本及其句子，内存中只保留当前文档；整个 pure_text.txt 一起分句时，
+    句子可能跨越文档边界，在拼接后的文本上按各文档的行对应。
+
+    Raises:
+        ValueError: per_document 为 True 而 documents 与存储中的文档不一致。
+    """
+    if per_document:
+        result = np.full(store.sentence_count(), -1, dtype=np.int64)
+        sentence_offsets = np.asarray(store.document_offsets).tolist()
+        sentences = store.iter_sentences()
+        document_count = 0
+        for (name, text), expected_name, start, end in zip(documents, store.document_names,
+                                                           sentence_offsets[:-1], sentence_offsets[1:]):
+            if name != expected_name:
+                raise ValueError(f'文档与语料存储不一致: {name} != {expected_name}')
+            result[start:end] = sentence_speakers(text, document_speakers[name], list(islice(sentences, end - start)))
+            document_count += 1
+        if document_count != len(store.document_names):
+            raise ValueError('文档数与语料存储不一致')
+        return result
+
+    documents = list(documents)
+    line_starts, line_speakers = [], []
+    position = 0
+    for name, text in documents:
+        line_starts.append(position)
+        line_starts.extend(position + match.end() for match in re.finditer('\n', text))
+        line_speakers.extend(document_speakers[name])
+        position += len(text)
+    return sentence_speakers(''.join([text for _, text in documents]), line_speakers, store.sentences, line_starts)
+
+
+def speaker_statistics(store: TaggedCorpusStore, sentence_speaker: np.ndarray, speakers: List[str],
+                       line_counts: Optional[Dict[int, int]] = None, remove_stopwords: bool = True,
+                       min_word_length: int = 2, lemmatize: bool = True, top_n: int = 20,
+                       patterns=None) -> dict:
+    """
+    按说话人统计：台词行数、句子数、计入统计的词数（规则同 count_word_frequency）、词汇量，
+    以及每人最常说的 top_n 个词和 top_n 个搭配（各种词性模式合并排序，搭配不跨越文档边界）。
+
+    Args:
+        store: 语料存储。
+        sentence_speaker: 每个句子（store.sentences）的说话人编号，-1 表示没有说话人，见 sentence_speakers。
+        speakers: 说话人名称，下标即编号。
+        line_counts: 说话人编号 -> 台词行数（可选）。
+
+    Returns:
+        dict: {'speakers': [[说话人, 行数, 句子数, 词数, 词汇量], ...]（按词数从高到低）,
+               'words': [[说话人, 词, 次数], ...], 'collocations': [[说话人, 模式, 短语, 次数], ...]}
+    """
+    line_counts = line_counts or {}
+    sentence_speaker = np.asarray(sentence_speaker, dtype=np.int64)
+    # 每个词的说话人
+    sentence_lengths = np.diff(np.asarray(store.sentence_offsets))
+    token_speaker = np.repeat(sentence_speaker, sentence_lengths)
+
+    positions, keys = store.counted_tokens(remove_stopwords, min_word_length, lemmatize)
+    keys = keys.astype(np.int64)
+    word_speaker = token_speaker[positions]
+    spoken = word_speaker >= 0
+    # (说话人, 词) 组合为一个整数后计数
+    pair_keys, pair_counts = np.unique(word_speaker[spoken] * len(store.vocabulary) + keys[spoken],
+                                       return_counts=True)
+    pair_speakers, pair_words = np.divmod(pair_keys, len(store.vocabulary))
+    word_totals = np.bincount(pair_speakers, weights=pair_counts, minlength=len(speakers)).astype(np.int64)
+    vocabulary_sizes = np.bincount(pair_speakers, minlength=len(speakers))
+    sentence_counts = np.bincount(sentence_speaker[sentence_speaker >= 0], minlength=len(speakers))
+
+    # 说话人按词数从高到低排列，词数相同时按台词行数
+    ranking = sorted(range(len(speakers)), key=lambda speaker_id: (-int(word_totals[speaker_id]),
+                                                                   -line_counts.get(speaker_id, 0)))
+    word_rows = []
+    speaker_bounds = np.searchsorted(pair_speakers, np.arange(len(speakers) + 1)).tolist()
+    for speaker_id in ranking:
+        start, end = speaker_bounds[speaker_id], speaker_bounds[speaker_id + 1]
+        # 次数相同时按词表中的先后排序
+        order = np.argsort(-pair_counts[start:end], kind='stable')[:top_n] + start
+        word_rows.extend([speakers[speaker_id], store.vocabulary[word_id], count]
+                         for word_id, count in zip(pair_words[order].tolist(), pair_counts[order].tolist()))
+
+    # 搭配：逐个文档在标签序列上匹配，按起始词的说话人计数
+    matcher = PosPatternMatcher(COLLOCATION_PATTERNS if patterns is None else patterns)
+    collocation_counts = [Counter() for _ in speakers]
+    token_ids = np.asarray(store.token_ids)
+    document_token_offsets = store.document_token_offsets().tolist()
+    for doc_start, doc_end in zip(document_token_offsets[:-1], document_token_offsets[1:]):
+        speaker_ids = token_speaker[doc_start:doc_end].tolist()
+        if max(speaker_ids, default=-1) < 0:
+            continue
+        ids = token_ids[doc_start:doc_end].tolist()
+        tags = map(store.tag_names.__getitem__, store.tag_ids[doc_start:doc_end].tolist())
+        for start, length, description in matcher.iter_tag_matches(tags):
+            speaker_id = speaker_ids[start]
+            if speaker_id >= 0:
+                collocation_counts[speaker_id][(description, tuple(ids[start:start + length]))] += 1
+    collocation_rows = []
+    for speaker_id in ranking:
+        collocation_rows.extend([speakers[speaker_id], description, ' '.join([store.vocabulary[i] for i in ids]),
+                                 count]
+                                for (description, ids), count in collocation_counts[speaker_id].most_common(top_n))
+
+    speaker_rows = [[speakers[speaker_id], line_counts.get(speaker_id, 0), int(sentence_counts[speaker_id]),
+                     int(word_totals[speaker_id]), int(vocabulary_sizes[speaker_id])]
+                    for speaker_id in ranking]
+    return {'speakers': speaker_rows, 'words': word_rows, 'collocations': collocation_rows}
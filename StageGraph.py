@@ -0,0 +1,137 @@
+import os
+import json
+from typing import Callable, Dict, Optional, Sequence
+
+from CacheTools import params_hash
+from Instrumentation import NULL_REPORT
+
+
+def save_json_artifact(value, base_path: str):
+    with open(base_path + '.json', 'wt', encoding='utf-8') as f:
+        json.dump(value, f, ensure_ascii=False)
+
+
+def load_json_artifact(base_path: str):
+    with open(base_path + '.json', 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class Stage:
+    """
+    处理流程中的一个阶段。
+
+    Args:
+        name: 阶段名。
+        func: 计算函数，以各上游阶段的结果为位置参数、以 params 为关键字参数调用。
+        inputs: 上游阶段名。
+        params: 影响结果的参数（必须可被 json 序列化），参与缓存键的计算。
+        fingerprint: 返回外部输入摘要的函数（可选），如源文件的内容哈希，参与缓存键的计算。
+        save / load: 结果的保存与读取，参数为不含扩展名的缓存路径；默认保存为 JSON。
+                     load 在缓存不可用时应抛出 OSError、ValueError 或 KeyError。
+        version: 阶段实现的版本号，实现改变时递增以使旧缓存失效。
+        with_record: 为 True 时以关键字参数 stage 传入本阶段的 StageRecord（见 Instrumentation），用于记录计数。
+    """
+
+    def __init__(self, name: str, func: Callable, inputs: Sequence[str] = (), params: Optional[dict] = None,
+                 fingerprint: Optional[Callable[[], str]] = None,
+                 save: Callable = save_json_artifact, load: Callable = load_json_artifact, version: int = 1,
+                 with_record: bool = False):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.params = params or {}
+        self.fingerprint = fingerprint
+        self.save = save
+        self.load = load
+        self.version = version
+        self.with_record = with_record
+
+
+class StageGraph:
+    """
+    由命名阶段组成的有向无环图，每个阶段的结果按缓存键保存在 cache_dir 下。
+
+    缓存键由阶段名、版本、参数、外部输入摘要及全部上游阶段的缓存键计算得出，
+    因此只修改下游阶段的参数（如搭配分析的 top_n）时，上游阶段的结果直接从磁盘复用；
+    某个阶段的输入或参数改变时，它及其全部下游阶段重新计算。
+    请求的阶段已有缓存时，不需要计算或加载其上游阶段。
+    """
+
+    def __init__(self, cache_dir: str, report=NULL_REPORT):
+        self.cache_dir = cache_dir
+        self.report = report
+        self.stages = {}
+        self._keys = {}
+        self._values = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def add(self, stage: Stage) -> Stage:
+        for input_name in stage.inputs:
+            if input_name not in self.stages:
+                raise ValueError(f"阶段 {stage.name} 的上游阶段 {input_name} 不存在")
+        self.stages[stage.name] = stage
+        return stage
+
+    def key(self, name: str) -> str:
+        """
+        阶段的缓存键（不需要运行任何阶段即可得到）
+        """
+        if name not in self._keys:
+            stage = self.stages[name]
+            self._keys[name] = params_hash({
+                'stage': name,
+                'version': stage.version,
+                'params': stage.params,
+                'fingerprint': stage.fingerprint() if stage.fingerprint else '',
+                'inputs': [self.key(input_name) for input_name in stage.inputs],
+            })
+        return self._keys[name]
+
+    def _base_path(self, name: str) -> str:
+        return os.path.join(self.cache_dir, f'{name}-{self.key(name)}')
+
+    def _load_cached(self, name: str):
+        # 标记文件在保存完成后才写入，不存在时说明没有（完整的）缓存
+        base_path = self._base_path(name)
+        if not os.path.exists(base_path + '.done'):
+            return False, None
+        try:
+            return True, self.stages[name].load(base_path)
+        except (OSError, ValueError, KeyError):
+            return False, None
+
+    def _save(self, name: str, value):
+        base_path = self._base_path(name)
+        self.stages[name].save(value, base_path)
+        with open(base_path + '.done', 'wt') as f:
+            f.write(self.key(name))
+        # 同一阶段只保留最新的结果
+        current = os.path.basename(base_path)
+        for entry_name in os.listdir(self.cache_dir):
+            if entry_name.startswith(f'{name}-') and entry_name.split('.', 1)[0] != current:
+                os.remove(os.path.join(self.cache_dir, entry_name))
+
+    def run(self, name: str):
+        """
+        获取阶段的结果：有缓存时直接读取，否则先获取上游阶段的结果再计算并保存
+        """
+        if name in self._values:
+            return self._values[name]
+
+        cached, value = self._load_cached(name)
+        if cached:
+            print(f'Stage {name} is up to date, reusing cached result')
+            with self.report.stage(name) as record:
+                record.add('cached')
+        else:
+            stage = self.stages[name]
+            input_values = [self.run(input_name) for input_name in stage.inputs]
+            with self.report.stage(name) as record:
+                extra = {'stage': record} if stage.with_record else {}
+                value = stage.func(*input_values, **stage.params, **extra)
+            self._save(name, value)
+        self._values[name] = value
+        return value
+
+    def run_all(self) -> Dict[str, object]:
+        return {name: self.run(name) for name in self.stages}
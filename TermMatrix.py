@@ -0,0 +1,199 @@
+import re
+import json
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from CorpusStore import TaggedCorpusStore
+
+
+# 文件名中的季号：House.of.Cards.S01E01_eng.docx、PeppaPig_S1.docx
+SEASON_PATTERN = re.compile(r'(?<![A-Za-z])S(\d{1,2})(?=E\d|[^0-9A-Za-z]|$)', re.IGNORECASE)
+# 以集号开头的文件名：403 The One With ...、1001 The One After ...（集号的百位及以上为季号）
+EPISODE_NUMBER_PATTERN = re.compile(r'^(\d{3,4})(?!\d)')
+
+
+def season_of(document_name: str) -> str:
+    """
+    从文档名中识别季号，例如 'S01'。无法识别时返回空字符串。
+    """
+    match = SEASON_PATTERN.search(document_name)
+    if match:
+        return f'S{int(match.group(1)):02d}'
+    match = EPISODE_NUMBER_PATTERN.match(document_name)
+    if match:
+        return f'S{int(match.group(1)) // 100:02d}'
+    return ''
+
+
+class TermMatrix:
+    """
+    文档 × 词元 的稀疏计数矩阵（CSR），以及基于它的向量化语料统计。
+
+    Attributes:
+        counts (sparse.csr_matrix): counts[i, j] 为词元 terms[j] 在文档 document_names[i] 中出现的次数。
+        document_names (List[str]): 文档名（docx文件名），与矩阵的行一一对应。
+        terms (List[str]): 词元，与矩阵的列一一对应。
+    """
+
+    def __init__(self, counts: sparse.csr_matrix, document_names: List[str], terms: List[str]):
+        self.counts = sparse.csr_matrix(counts, dtype=np.int64)
+        self.document_names = list(document_names)
+        self.terms = list(terms)
+
+    @classmethod
+    def from_store(cls, store: TaggedCorpusStore, remove_stopwords: bool = True, min_word_length: int = 2,
+                   lemmatize: bool = True) -> 'TermMatrix':
+        """
+        从语料存储构建，过滤及词形还原规则与 count_word_frequency 相同，每行之和即为该文档的词频合计。
+        """
+        positions, keys = store.counted_tokens(remove_stopwords, min_word_length, lemmatize)
+        # 每个保留的词所属的文档
+        rows = np.searchsorted(store.document_token_offsets()[1:], positions, side='right')
+        term_ids, columns = np.unique(keys, return_inverse=True)
+        counts = sparse.coo_matrix((np.ones(len(keys), dtype=np.int64), (rows, columns)),
+                                   shape=(len(store.document_names), len(term_ids)))
+        # 转换为 CSR 时重复的 (行, 列) 自动累加
+        return cls(counts.tocsr(), store.document_names, [store.vocabulary[i] for i in term_ids.tolist()])
+
+    @classmethod
+    def from_document_counts(cls, document_names: List[str],
+                             document_counts: Iterable[Dict[str, int]]) -> 'TermMatrix':
+        """
+        从每个文档的 {词: 次数} 构建，例如 CorpusManifest 中各文档的部分结果。
+        """
+        term_index = {}
+        rows, columns, data = [], [], []
+        for row, word_counts in enumerate(document_counts):
+            for term, count in word_counts.items():
+                rows.append(row)
+                columns.append(term_index.setdefault(term, len(term_index)))
+                data.append(count)
+        counts = sparse.coo_matrix((np.array(data, dtype=np.int64), (rows, columns)),
+                                   shape=(len(document_names), len(term_index)))
+        return cls(counts.tocsr(), document_names, list(term_index))
+
+    def save(self, base_path: str):
+        """
+        保存为 <base_path>.npz（稀疏矩阵）及 <base_path>.json（文档名、词元）
+        """
+        sparse.save_npz(base_path + '.npz', self.counts)
+        with open(base_path + '.json', 'wt', encoding='utf-8') as f:
+            json.dump({'document_names': self.document_names, 'terms': self.terms}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, base_path: str) -> 'TermMatrix':
+        with open(base_path + '.json', 'rt', encoding='utf-8') as f:
+            labels = json.load(f)
+        return cls(sparse.load_npz(base_path + '.npz'), labels['document_names'], labels['terms'])
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.counts.shape
+
+    def document_lengths(self) -> np.ndarray:
+        """
+        每个文档中计入统计的词数
+        """
+        return np.asarray(self.counts.sum(axis=1)).ravel()
+
+    def term_totals(self) -> np.ndarray:
+        """
+        每个词元在全部文档中出现的总次数
+        """
+        return np.asarray(self.counts.sum(axis=0)).ravel()
+
+    def word_frequency(self) -> Dict[str, int]:
+        return dict(zip(self.terms, self.term_totals().tolist()))
+
+    def document_frequency(self) -> np.ndarray:
+        """
+        每个词元出现在多少个文档中
+        """
+        return np.diff(self.counts.tocsc().indptr)
+
+    def dispersion(self) -> np.ndarray:
+        """
+        每个词元在各文档间分布的均匀程度（Juilland's D）：1 表示在各文档中的相对频率完全相同，
+        越接近 0 表示越集中于少数文档。文档数少于 2 时为 NaN。
+
+        D = 1 - V / sqrt(n - 1)，其中 V 为该词元在各文档中相对频率的变异系数，n 为文档数。
+        """
+        document_count = self.counts.shape[0]
+        if document_count < 2:
+            return np.full(self.counts.shape[1], np.nan)
+        lengths = self.document_lengths().astype(np.float64)
+        lengths[lengths == 0] = 1
+        # 相对频率矩阵仍为稀疏矩阵，均值和方差只用到非零项
+        relative = sparse.diags(1.0 / lengths) @ self.counts
+        mean = np.asarray(relative.sum(axis=0)).ravel() / document_count
+        mean_square = np.asarray(relative.multiply(relative).sum(axis=0)).ravel() / document_count
+        std = np.sqrt(np.maximum(mean_square - mean * mean, 0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variation = np.where(mean > 0, std / mean, 0)
+        return 1 - variation / np.sqrt(document_count - 1)
+
+    def tf_idf(self) -> sparse.csr_matrix:
+        """
+        TF-IDF 矩阵：TF 为词元在文档中的相对频率，IDF 为平滑的 log((1 + N) / (1 + df)) + 1。
+        """
+        lengths = self.document_lengths().astype(np.float64)
+        lengths[lengths == 0] = 1
+        idf = np.log((1 + self.counts.shape[0]) / (1 + self.document_frequency())) + 1
+        return (sparse.diags(1.0 / lengths) @ self.counts @ sparse.diags(idf)).tocsr()
+
+    def top_tf_idf(self, top_n: int = 20) -> Dict[str, List[Tuple[str, float]]]:
+        """
+        每个文档 TF-IDF 最高的 top_n 个词元，可看作该文档区别于其它文档的特征词。
+        """
+        tf_idf = self.tf_idf()
+        top_terms = {}
+        for row, name in enumerate(self.document_names):
+            start, end = tf_idf.indptr[row], tf_idf.indptr[row + 1]
+            scores, columns = tf_idf.data[start:end], tf_idf.indices[start:end]
+            order = np.argsort(-scores, kind='stable')[:top_n]
+            top_terms[name] = [(self.terms[columns[i]], float(scores[i])) for i in order]
+        return top_terms
+
+    def group_totals(self, group_of: Callable[[str], str] = season_of) -> Tuple[List[str], sparse.csr_matrix]:
+        """
+        按文档分组（默认按季）合计词频。
+
+        Args:
+            group_of: 文档名 -> 组名。
+
+        Returns:
+            Tuple[List[str], sparse.csr_matrix]: 排序后的组名，及 组 × 词元 的计数矩阵。
+        """
+        groups = [group_of(name) for name in self.document_names]
+        group_names = sorted(set(groups))
+        group_index = {group: index for index, group in enumerate(group_names)}
+        # 组 × 文档 的指示矩阵与计数矩阵相乘即为各组合计
+        indicator = sparse.csr_matrix((np.ones(len(groups), dtype=np.int64),
+                                       ([group_index[group] for group in groups], np.arange(len(groups)))),
+                                      shape=(len(group_names), len(groups)))
+        return group_names, (indicator @ self.counts).tocsr()
+
+    def statistics_frame(self, group_of: Optional[Callable[[str], str]] = season_of) -> pd.DataFrame:
+        """
+        每个词元的统计表：总频率、出现的文档数、分布均匀度，以及每组（默认每季）的频率；按总频率从高到低排序。
+        """
+        frame = pd.DataFrame({
+            'Word': self.terms,
+            'Frequency': self.term_totals(),
+            'Document Frequency': self.document_frequency(),
+            'Dispersion': self.dispersion(),
+        })
+        if group_of is not None:
+            group_names, totals = self.group_totals(group_of)
+            if len(group_names) > 1:
+                dense_totals = totals.T.toarray()
+                for index, group in enumerate(group_names):
+                    frame[group or 'Unknown'] = dense_totals[:, index]
+        return frame.sort_values(by='Frequency', ascending=False, kind='stable')
+
+    def tf_idf_frame(self, top_n: int = 20) -> pd.DataFrame:
+        data = [{'Document': name, 'Word': term, 'TF-IDF': score}
+                for name, terms in self.top_tf_idf(top_n).items() for term, score in terms]
+        return pd.DataFrame(data, columns=['Document', 'Word', 'TF-IDF'])
@@ -0,0 +1,391 @@
+import re
+import struct
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# OLE 复合文档（Compound File Binary）格式，见 [MS-CFB]
+OLE_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+FREE_SECTOR = 0xFFFFFFFF
+END_OF_CHAIN = 0xFFFFFFFE
+NO_STREAM = 0xFFFFFFFF
+STREAM_OBJECT = 2
+ROOT_OBJECT = 5
+
+# Word 97-2003 二进制文档格式，见 [MS-DOC]
+WORD_IDENT = 0xA5EC
+WORD97_MIN_NFIB = 0x00C1
+FIB_FLAG_ENCRYPTED = 0x0100
+FIB_FLAG_TABLE_STREAM = 0x0200      # fWhichTblStm：为 1 时表格流为 1Table，否则为 0Table
+FIB_CCP_TEXT_OFFSET = 0x004C        # FibRgLw97.ccpText：正文的字符数
+FIB_RG_FC_LCB_OFFSET = 0x009A       # FibRgFcLcb97 的起始位置
+FIB_CLX_INDEX = 33                  # FibRgFcLcb97 中 (fcClx, lcbClx) 的序号
+FIB_BTE_CHPX_INDEX = 12             # (fcPlcfBteChpx, lcbPlcfBteChpx)：字符属性所在的 FKP 页
+FIB_BTE_PAPX_INDEX = 13             # (fcPlcfBtePapx, lcbPlcfBtePapx)：段落属性所在的 FKP 页
+PIECE_COMPRESSED = 0x40000000       # FcCompressed.fCompressed：该片段为单字节（cp1252）编码
+FKP_PAGE_SIZE = 512
+SPRM_P_F_TTP = 0x2417               # sprmPFTtp：该段落是表格行结束标记
+SPRM_C_SYMBOL = 0x6A09              # sprmCSymbol：插入的符号（字体 + 字形），python-docx 不输出 w:sym
+# Sprm.spra -> 操作数字节数，6 为变长（第一个字节为长度）
+SPRM_OPERAND_SIZES = {0: 1, 1: 1, 2: 2, 3: 4, 4: 2, 5: 2, 7: 3}
+SPRM_T_DEF_TABLE = 0xD608           # 变长，长度为两个字节
+
+# 正文中的特殊字符
+PARAGRAPH_END = '\r'
+CELL_END = '\x07'
+FIELD_BEGIN, FIELD_SEPARATOR, FIELD_END = '\x13', '\x14', '\x15'
+# 与 python-docx 的段落文本一致：手动换行为 '\n'，不间断连字符为 '-'；
+# 可选连字符及其它控制字符（图片、批注等的占位符）去除，段落、单元格结束符及分页符留待 split_doc_text 处理
+SPECIAL_CHAR_TABLE = {0x0B: '\n', 0x1E: '-'}
+SPECIAL_CHAR_TABLE.update({code: None for code in range(0x20) if code not in (0x07, 0x09, 0x0B, 0x0C, 0x0D, 0x1E)})
+# split_doc_text 内部用来替换行结束标记的字符（Unicode 非字符，不会出现在文档中）
+ROW_END = '\uffff'
+# 分节符与分页符（0x0C）按段落结束处理
+BOUNDARY_PATTERN = re.compile('([\r\x0c\x07\uffff])')
+
+
+class OleCompoundFile:
+    """
+    只读的 OLE 复合文档解析，足以读取 .doc 文件根存储下的各个流。
+
+    整个文件读入内存后按 FAT 扇区链拼接流的内容；小于 mini_stream_cutoff 的流保存在迷你流中，按迷你 FAT 拼接。
+
+    Args:
+        data (bytes): 文件的全部内容。
+
+    Raises:
+        ValueError: 不是 OLE 复合文档，或文件结构损坏。
+    """
+
+    def __init__(self, data: bytes):
+        if len(data) < 512 or data[:8] != OLE_SIGNATURE:
+            raise ValueError('不是 OLE 复合文档（Word 97-2003 .doc）')
+        self.data = data
+        sector_shift, mini_sector_shift = struct.unpack_from('<HH', data, 30)
+        self.sector_size = 1 << sector_shift
+        self.mini_sector_size = 1 << mini_sector_shift
+        (fat_sector_count, first_directory_sector, _, self.mini_stream_cutoff, first_mini_fat_sector,
+         _, first_difat_sector, difat_sector_count) = struct.unpack_from('<8I', data, 44)
+
+        # FAT 所在的扇区：文件头中的前 109 个，其余在 DIFAT 扇区链中（每个扇区的最后一项指向下一个 DIFAT 扇区）
+        fat_sectors = list(struct.unpack_from('<109I', data, 76))
+        sector = first_difat_sector
+        entries_per_sector = self.sector_size // 4
+        for _ in range(difat_sector_count):
+            if sector in (END_OF_CHAIN, FREE_SECTOR):
+                break
+            entries = struct.unpack_from(f'<{entries_per_sector}I', self._sector(sector))
+            fat_sectors.extend(entries[:-1])
+            sector = entries[-1]
+        fat_sectors = [sector for sector in fat_sectors[:fat_sector_count] if sector != FREE_SECTOR]
+        fat_data = b''.join(self._sector(sector) for sector in fat_sectors)
+        self.fat = struct.unpack(f'<{len(fat_data) // 4}I', fat_data)
+
+        directory = self._read_chain(first_directory_sector)
+        self.entries = [struct.unpack_from('<64sHBBIII16sIQQIQ', directory, offset)
+                        for offset in range(0, len(directory) - 127, 128)]
+        if not self.entries or self.entries[0][2] != ROOT_OBJECT:
+            raise ValueError('OLE 复合文档缺少根存储')
+        root = self.entries[0]
+        self.mini_stream = self._read_chain(root[11])[:root[12]]
+        mini_fat_data = self._read_chain(first_mini_fat_sector) if first_mini_fat_sector != END_OF_CHAIN else b''
+        self.mini_fat = struct.unpack(f'<{len(mini_fat_data) // 4}I', mini_fat_data)
+        self.streams = self._root_streams()
+
+    def _sector(self, sector: int) -> bytes:
+        offset = (sector + 1) * self.sector_size
+        if offset >= len(self.data):
+            raise ValueError(f'扇区 {sector} 超出文件范围')
+        return self.data[offset:offset + self.sector_size]
+
+    @staticmethod
+    def _chain(fat, start: int) -> List[int]:
+        # 扇区链不会长于 FAT 的项数，超过时说明链中有环
+        chain = []
+        sector = start
+        while sector != END_OF_CHAIN:
+            if sector >= len(fat) or len(chain) > len(fat):
+                raise ValueError('OLE 复合文档的扇区链损坏')
+            chain.append(sector)
+            sector = fat[sector]
+        return chain
+
+    def _read_chain(self, start: int) -> bytes:
+        return b''.join(self._sector(sector) for sector in self._chain(self.fat, start))
+
+    def _root_streams(self) -> Dict[str, Tuple[int, int]]:
+        # 根存储的子项组织为一棵以 left/right 相连的树，从根存储的 child 开始遍历
+        streams = {}
+        pending = [self.entries[0][6]]
+        visited = set()
+        while pending:
+            entry_id = pending.pop()
+            if entry_id == NO_STREAM or entry_id in visited or entry_id >= len(self.entries):
+                continue
+            visited.add(entry_id)
+            name, name_length, entry_type, _, left, right = self.entries[entry_id][:6]
+            if entry_type == STREAM_OBJECT:
+                entry = self.entries[entry_id]
+                streams[name[:max(name_length - 2, 0)].decode('utf-16-le')] = (entry[11], entry[12])
+            pending.extend((left, right))
+        return streams
+
+    def open_stream(self, name: str) -> bytes:
+        """
+        读取根存储下指定名称的流
+
+        Raises:
+            KeyError: 流不存在。
+        """
+        start, size = self.streams[name]
+        if size < self.mini_stream_cutoff:
+            chain = self._chain(self.mini_fat, start) if size else []
+            data = b''.join(self.mini_stream[sector * self.mini_sector_size:(sector + 1) * self.mini_sector_size]
+                            for sector in chain)
+        else:
+            data = self._read_chain(start)
+        if len(data) < size:
+            raise ValueError(f'流 {name} 不完整')
+        return data[:size]
+
+
+def _iter_sprms(grpprl: bytes) -> Iterator[Tuple[int, bytes]]:
+    # Prl 序列：2 字节的 sprm 及其操作数，操作数的长度由 sprm 的 spra 位决定
+    position = 0
+    while position + 2 <= len(grpprl):
+        sprm, = struct.unpack_from('<H', grpprl, position)
+        position += 2
+        size = SPRM_OPERAND_SIZES.get(sprm >> 13)
+        if size is None:
+            if sprm == SPRM_T_DEF_TABLE:
+                size = struct.unpack_from('<H', grpprl, position)[0] + 1
+            else:
+                size = grpprl[position] + 1 if position < len(grpprl) else 0
+        yield sprm, grpprl[position:position + size]
+        position += size
+
+
+def _iter_fkp_runs(word_document: bytes, table: bytes, fc_lcb_index: int,
+                   paragraphs: bool) -> Iterator[Tuple[int, int, bytes]]:
+    """
+    按 PlcfBtePapx / PlcfBteChpx 读取段落或字符属性的 FKP 页，产出 (起始 fc, 结束 fc, grpprl)，
+    fc 为 WordDocument 流中的字节位置。没有属性修改的段落或字符不产出。
+    """
+    fc, lcb = struct.unpack_from('<II', word_document, FIB_RG_FC_LCB_OFFSET + fc_lcb_index * 8)
+    plc = table[fc:fc + lcb]
+    # PlcBte：n + 1 个 fc 及 n 个 PnFkp（低 22 位为页号）
+    count = (len(plc) - 4) // 8
+    for pn, in struct.iter_unpack('<I', plc[(count + 1) * 4:(count + 1) * 4 + count * 4]):
+        offset = (pn & 0x3FFFFF) * FKP_PAGE_SIZE
+        page = word_document[offset:offset + FKP_PAGE_SIZE]
+        if len(page) < FKP_PAGE_SIZE:
+            raise ValueError('.doc 文档的属性页超出 WordDocument 流')
+        run_count = page[-1]
+        fcs = struct.unpack_from(f'<{run_count + 1}I', page)
+        # 段落：每项为 13 字节的 BxPap（第一个字节为偏移）；字符：每项为 1 字节的偏移。偏移以 2 字节为单位
+        entry_size = 13 if paragraphs else 1
+        for index in range(run_count):
+            property_offset = page[(run_count + 1) * 4 + index * entry_size] * 2
+            if not property_offset:
+                continue
+            size = page[property_offset]
+            if paragraphs:
+                # PapxInFkp：cb 不为 0 时内容为 2 * cb - 1 字节，否则下一个字节为 cb'，内容为 2 * cb' 字节；
+                # 内容的前 2 个字节为样式编号 istd
+                if size:
+                    grpprl = page[property_offset + 3:property_offset + 2 * size]
+                else:
+                    size = page[property_offset + 1]
+                    grpprl = page[property_offset + 4:property_offset + 2 + 2 * size]
+            else:
+                grpprl = page[property_offset + 1:property_offset + 1 + size]
+            yield fcs[index], fcs[index + 1], grpprl
+
+
+def _fc_runs_to_cps(runs: List[Tuple[int, int]], pieces: List[Tuple[int, int, int, int]]) -> List[Tuple[int, int]]:
+    # 把 WordDocument 流中的字节区间换算为字符位置区间。pieces：(起始字符位置, 结束字符位置, 起始 fc, 每字符字节数)
+    runs = sorted(runs)
+    run_starts = [start for start, _ in runs]
+    cp_runs = []
+    for cp_start, cp_end, fc, width in pieces:
+        fc_end = fc + (cp_end - cp_start) * width
+        # 与片段相交的区间：起始位置小于片段结束位置，且结束位置大于片段起始位置
+        for start, end in runs[max(bisect_left(run_starts, fc) - 1, 0):bisect_left(run_starts, fc_end)]:
+            if end <= fc:
+                continue
+            cp_runs.append((cp_start + (max(start, fc) - fc) // width,
+                            cp_start + (min(end, fc_end) - fc + width - 1) // width))
+    return sorted(cp_runs)
+
+
+def read_doc_main_text(file_path: str, row_ends: Optional[List[int]] = None) -> str:
+    """
+    读取 Word 97-2003 二进制文档（.doc）正文部分的原始文本（不含页眉页脚、脚注、批注等）。
+
+    文本按 WordDocument 流中的 FIB 找到表格流中的片段表（CLX/PlcPcd），按字符位置顺序拼接各片段：
+    压缩的片段为 cp1252 单字节编码，其余为 UTF-16LE。返回的文本保留 Word 的特殊字符
+    （段落结束 '\\r'、单元格结束 '\\x07'、域代码 '\\x13'...'\\x14'...'\\x15' 等），见 split_doc_text；
+    插入的符号（字符属性 sprmCSymbol）与 python-docx 一致地去除。
+
+    Args:
+        row_ends: 传入列表时，追加表格行结束标记（段落属性 sprmPFTtp 为 1 的段落的 '\\x07'）在返回文本中的位置，
+                  供 split_doc_text 区分行结束标记与空单元格。
+
+    Raises:
+        ValueError: 文件不是 Word 97 及之后版本的 .doc 文档，已加密，或结构损坏。
+    """
+    with open(file_path, 'rb') as f:
+        ole = OleCompoundFile(f.read())
+    try:
+        word_document = ole.open_stream('WordDocument')
+    except KeyError:
+        raise ValueError('OLE 复合文档中没有 WordDocument 流，不是 Word 文档') from None
+    if len(word_document) < FIB_RG_FC_LCB_OFFSET:
+        raise ValueError('WordDocument 流不完整')
+    ident, n_fib = struct.unpack_from('<HH', word_document, 0)
+    flags, = struct.unpack_from('<H', word_document, 0x0A)
+    if ident != WORD_IDENT:
+        raise ValueError('WordDocument 流的 FIB 无效')
+    if n_fib < WORD97_MIN_NFIB:
+        raise ValueError('不支持 Word 97 之前版本的 .doc 文档')
+    if flags & FIB_FLAG_ENCRYPTED:
+        raise ValueError('不支持加密的 .doc 文档')
+
+    text_length, = struct.unpack_from('<i', word_document, FIB_CCP_TEXT_OFFSET)
+    fc_clx, lcb_clx = struct.unpack_from('<II', word_document, FIB_RG_FC_LCB_OFFSET + FIB_CLX_INDEX * 8)
+    table = ole.open_stream('1Table' if flags & FIB_FLAG_TABLE_STREAM else '0Table')
+    clx = table[fc_clx:fc_clx + lcb_clx]
+
+    # CLX：若干个 Prc（0x01 开头，属性修改，跳过）之后是 Pcdt（0x02 开头，片段表）
+    position = 0
+    while position < len(clx) and clx[position] == 0x01:
+        position += 3 + struct.unpack_from('<H', clx, position + 1)[0]
+    if position + 5 > len(clx) or clx[position] != 0x02:
+        raise ValueError('.doc 文档的片段表无效')
+    piece_table_size, = struct.unpack_from('<I', clx, position + 1)
+    piece_table = clx[position + 5:position + 5 + piece_table_size]
+    # PlcPcd：n + 1 个字符位置（4字节）及 n 个片段描述（8字节，其中第 2~5 字节为文本位置）
+    piece_count = (len(piece_table) - 4) // 12
+    positions = struct.unpack_from(f'<{piece_count + 1}I', piece_table)
+    texts = []
+    pieces = []     # (在拼接后文本中的起始位置, 结束位置, 起始 fc, 每字符字节数)
+    offset = 0
+    for index in range(piece_count):
+        start, end = positions[index], min(positions[index + 1], text_length)
+        if start >= end:
+            continue
+        fc, = struct.unpack_from('<I', piece_table, (piece_count + 1) * 4 + index * 8 + 2)
+        if fc & PIECE_COMPRESSED:
+            fc = (fc & ~PIECE_COMPRESSED) // 2
+            piece_text = word_document[fc:fc + end - start].decode('cp1252', errors='replace')
+            pieces.append((offset, offset + len(piece_text), fc, 1))
+        else:
+            piece_text = word_document[fc:fc + 2 * (end - start)].decode('utf-16-le', errors='replace')
+            pieces.append((offset, offset + len(piece_text), fc, 2))
+        texts.append(piece_text)
+        offset += len(piece_text)
+    text = ''.join(texts)
+
+    # 段落及字符属性按 WordDocument 流中的字节位置记录，换算为文本中的位置
+    try:
+        symbols = _fc_runs_to_cps(
+            [(start, end) for start, end, grpprl in _iter_fkp_runs(word_document, table, FIB_BTE_CHPX_INDEX, False)
+             if any(sprm == SPRM_C_SYMBOL for sprm, _ in _iter_sprms(grpprl))], pieces)
+        row_end_runs = _fc_runs_to_cps(
+            [(start, end) for start, end, grpprl in _iter_fkp_runs(word_document, table, FIB_BTE_PAPX_INDEX, True)
+             if any(sprm == SPRM_P_F_TTP and operand[:1] == b'\x01' for sprm, operand in _iter_sprms(grpprl))],
+            pieces)
+    except (struct.error, IndexError):
+        raise ValueError('.doc 文档的属性页无效') from None
+
+    # 行结束标记是 TTP 段落的最后一个字符（段落结束符 '\\x07'）
+    row_end_positions = [end - 1 for _, end in row_end_runs if 0 < end <= len(text) and text[end - 1] == CELL_END]
+    if symbols:
+        text, row_end_positions = _remove_ranges(text, symbols, row_end_positions)
+    if row_ends is not None:
+        row_ends.extend(row_end_positions)
+    return text
+
+
+def _remove_ranges(text: str, ranges: List[Tuple[int, int]], positions: List[int]) -> Tuple[str, List[int]]:
+    # 去除 text 中的若干区间（按起始位置排序，可以重叠），并把不在这些区间内的 positions 换算为去除后的位置
+    merged = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    starts = [start for start, _ in merged]
+    removed_before = [0]
+    for start, end in merged:
+        removed_before.append(removed_before[-1] + end - start)
+    kept = [text[previous_end:start] for previous_end, (start, _) in zip([0] + [end for _, end in merged], merged)]
+    kept.append(text[merged[-1][1]:])
+    return ''.join(kept), [position - removed_before[bisect_right(starts, position)] for position in positions]
+
+
+def _remove_field_codes(text: str) -> str:
+    # 域：'\x13' 域代码 ['\x14' 域结果] '\x15'，可以嵌套。只保留域结果
+    if FIELD_BEGIN not in text:
+        return text
+    parts = []
+    stack = []     # 每层域当前是否处于域结果部分
+    for part in re.split('([\x13\x14\x15])', text):
+        if part == FIELD_BEGIN:
+            stack.append(False)
+        elif part == FIELD_SEPARATOR:
+            if stack:
+                stack[-1] = True
+        elif part == FIELD_END:
+            if stack:
+                stack.pop()
+        elif all(stack):
+            parts.append(part)
+    return ''.join(parts)
+
+
+def split_doc_text(text: str, row_ends: Optional[List[int]] = None) -> Tuple[List[str], List[List[str]]]:
+    """
+    把 read_doc_main_text 得到的原始文本拆分为正文段落和表格行。
+
+    段落以 '\\r'（分节符、分页符 '\\x0c' 同样视为段落结束）或 '\\x07' 结束：以 '\\x07' 结束的是单元格的最后一个段落，
+    每行末尾还有一个只含 '\\x07' 的行结束标记。行结束标记由 row_ends（read_doc_main_text 按段落属性得到的位置）确定；
+    row_ends 为空时（文档没有表格，或没有段落属性）把紧跟在单元格之后的空段落当作行结束标记，空单元格会被误认为行结束。
+    单元格中的多个段落之间以 '\\n' 连接，与 python-docx 的 cell.text 一致；但一行第一个单元格中
+    最后一个段落之前的段落无法与表格之前的正文区分，按正文处理。
+
+    Returns:
+        Tuple[List[str], List[List[str]]]: 正文段落（未去除首尾空白），及表格的每一行（各单元格的文本）。
+    """
+    if row_ends:
+        characters = list(text)
+        for position in row_ends:
+            characters[position] = ROW_END
+        text = ''.join(characters)
+    parts = BOUNDARY_PATTERN.split(_remove_field_codes(text).translate(SPECIAL_CHAR_TABLE))
+    paragraphs = []
+    rows = []
+    row = []
+    pending = []        # 以 '\\r' 结束、尚未确定属于正文还是单元格的段落
+    after_cell = False  # 上一个段落是否以 '\\x07' 结束（只在 row_ends 为空时使用）
+    for paragraph, terminator in zip(parts[0::2], parts[1::2] + [PARAGRAPH_END]):
+        if terminator == ROW_END or (not row_ends and terminator == CELL_END and after_cell
+                                     and not pending and not paragraph):
+            rows.append(row)
+            row = []
+            after_cell = False
+        elif terminator != CELL_END:
+            pending.append(paragraph)
+            after_cell = False
+        else:
+            if row:
+                row.append('\n'.join(pending + [paragraph]))
+            else:
+                paragraphs.extend(pending)
+                row.append(paragraph)
+            pending = []
+            after_cell = True
+    if row:
+        rows.append(row)
+    paragraphs.extend(pending)
+    return paragraphs, rows
@@ -0,0 +1,12 @@
+import pytest
+
+from EnglishAnalysisTools import ensure_nlp_data, NlpDataMissingError, NLTK_RESOURCES
+
+
+@pytest.fixture
+def nlp_data():
+    # 需要 NLTK 数据的测试在本地缺少数据时跳过（本程序不会自动下载，见 check_download_nlp_data）
+    try:
+        ensure_nlp_data(*NLTK_RESOURCES)
+    except NlpDataMissingError as e:
+        pytest.skip(str(e))
@@ -0,0 +1,48 @@
+import pytest
+
+from CommonProcess import common_flow
+from EnglishAnalysisTools import CachedLemmatizer
+
+
+# 每个文档都以完整的句子结束，默认模式（整个文本一起分句）与按文档分句的各模式结果相同
+DOCUMENTS = {
+    'S01E01.txt': 'Peppa: I love jumping in muddy puddles.\n'
+                  'George: Dinosaur! Grrr!\n'
+                  'Daddy Pig: Look at the big muddy puddle. Peppa is jumping in it.\n'
+                  'Mummy Pig: Peppa, you have to wear your boots.\n',
+    'S01E02.txt': 'Peppa: Can we go to the playground, Mummy?\n'
+                  'Mummy Pig: Yes, we can go to the playground after lunch.\n'
+                  'George: Dinosaur!\n'
+                  'Daddy Pig: I think it is going to rain. Look at the dark clouds.\n',
+    'S02E01.txt': 'Peppa: George is playing with his new dinosaur.\n'
+                  'Daddy Pig: Take the chance and make a decision.\n'
+                  'Mummy Pig: Have a look at the beautiful rainbow.\n'
+                  'Peppa: I love muddy puddles and I love rainbows.\n',
+}
+
+MODES = {
+    'default': {},
+    'streaming': {'streaming': True},
+    'pipelined': {'pipelined': True, 'workers': 2},
+    'incremental': {'incremental': True},
+}
+
+
+def _run_flow(directory, **kwargs):
+    directory.mkdir()
+    for name, text in DOCUMENTS.items():
+        (directory / name).write_text(text, encoding='utf-8')
+    # 不使用也不写入程序目录下共用的词形还原缓存文件
+    result = common_flow(str(directory), export_format='csv', top_n=5, lemmatizer=CachedLemmatizer(), **kwargs)
+    collocations = (directory / 'collocations_collocations.csv').read_text(encoding='utf-8-sig')
+    return result['frequency'], collocations
+
+
+@pytest.mark.parametrize('mode', [mode for mode in MODES if mode != 'default'])
+def test_modes_match_default(nlp_data, tmp_path, mode):
+    frequency, collocations = _run_flow(tmp_path / 'default', **MODES['default'])
+    mode_frequency, mode_collocations = _run_flow(tmp_path / mode, **MODES[mode])
+
+    assert mode_frequency == frequency
+    assert list(mode_frequency) == list(frequency)
+    assert mode_collocations == collocations
@@ -0,0 +1,125 @@
+import os
+import struct
+
+from docx import Document
+
+from MsWordTools import process_doc_file, process_docx_file
+from WordDocReader import read_doc_main_text, split_doc_text
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+SECTOR_SIZE = 512
+END_OF_CHAIN, FREE_SECTOR, FAT_SECTOR, NO_STREAM = 0xFFFFFFFE, 0xFFFFFFFF, 0xFFFFFFFD, 0xFFFFFFFF
+TEXT_OFFSET = 0x800         # WordDocument 流中正文的位置
+FKP_PAGE = 8                # 段落属性 FKP 所在的页（WordDocument 流中的第 8 个 512 字节页）
+STREAM_SIZE = 4608          # 不小于迷你流的上限（4096），流保存在普通扇区中
+
+
+def _ole_file(streams: dict) -> bytes:
+    # 最简单的 OLE 复合文档：根存储下的若干个流，一个 FAT 扇区，没有迷你流
+    sectors, fat, entries = [], [], []
+    for name, data in streams.items():
+        start = len(sectors)
+        count = len(data) // SECTOR_SIZE
+        sectors.extend(data[i * SECTOR_SIZE:(i + 1) * SECTOR_SIZE] for i in range(count))
+        fat.extend(list(range(start + 1, start + count)) + [END_OF_CHAIN])
+        entries.append((name, start, len(data)))
+
+    def directory_entry(name, entry_type, child, right, start, size):
+        encoded = (name + '\0').encode('utf-16-le')
+        return struct.pack('<64sHBBIII16sIQQIQ', encoded, len(encoded), entry_type, 1, NO_STREAM, right, child,
+                           b'', 0, 0, 0, start, size)
+
+    directory = directory_entry('Root Entry', 5, 1, NO_STREAM, END_OF_CHAIN, 0)
+    for index, (name, start, size) in enumerate(entries):
+        right = index + 2 if index + 1 < len(entries) else NO_STREAM
+        directory += directory_entry(name, 2, NO_STREAM, right, start, size)
+    directory_sector = len(sectors)
+    sectors.append(directory.ljust(SECTOR_SIZE, b'\0'))
+    fat.append(END_OF_CHAIN)
+    fat_sector = len(sectors)
+    fat.append(FAT_SECTOR)
+    fat += [FREE_SECTOR] * (SECTOR_SIZE // 4 - len(fat))
+    sectors.append(struct.pack(f'<{len(fat)}I', *fat))
+
+    header = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1' + b'\0' * 16 + struct.pack('<HHHHH', 0x3E, 3, 0xFFFE, 9, 6)
+    header += b'\0' * 6 + struct.pack('<9I', 0, 1, directory_sector, 0, 4096, END_OF_CHAIN, 0, END_OF_CHAIN, 0)
+    header += struct.pack('<109I', fat_sector, *[FREE_SECTOR] * 108)
+    return header.ljust(SECTOR_SIZE, b'\0') + b''.join(sectors)
+
+
+def _word_document(paragraphs) -> bytes:
+    """
+    生成 .doc：正文为一个 cp1252 片段，每个段落在段落属性 FKP 中占一项。
+
+    Args:
+        paragraphs: [(包括结束符的段落文本, 是否为表格行结束标记), ...]
+    """
+    text = ''.join(paragraph for paragraph, _ in paragraphs).encode('cp1252')
+    word_document = bytearray(STREAM_SIZE)
+    struct.pack_into('<HH', word_document, 0, 0xA5EC, 0x00C1)
+    struct.pack_into('<H', word_document, 0x0A, 0x0200)
+    struct.pack_into('<i', word_document, 0x4C, len(text))
+    word_document[TEXT_OFFSET:TEXT_OFFSET + len(text)] = text
+
+    # PapxInFkp（cb 为 0 的形式）：istd 0、sprmPFInTable 1、sprmPFTtp 1
+    page = bytearray(512)
+    papx_offset = 480
+    page[papx_offset:papx_offset + 10] = b'\x00\x04' + struct.pack('<HHBHB', 0, 0x2416, 1, 0x2417, 1)
+    fcs = [TEXT_OFFSET]
+    for paragraph, _ in paragraphs:
+        fcs.append(fcs[-1] + len(paragraph))
+    struct.pack_into(f'<{len(fcs)}I', page, 0, *fcs)
+    for index, (_, row_end) in enumerate(paragraphs):
+        page[len(fcs) * 4 + index * 13] = papx_offset // 2 if row_end else 0
+    page[511] = len(paragraphs)
+    word_document[FKP_PAGE * 512:(FKP_PAGE + 1) * 512] = page
+
+    piece_table = struct.pack('<2I', 0, len(text)) + struct.pack('<HIH', 0, 0x40000000 | TEXT_OFFSET * 2, 0)
+    clx = b'\x02' + struct.pack('<I', len(piece_table)) + piece_table
+    plcf_bte_papx = struct.pack('<3I', fcs[0], fcs[-1], FKP_PAGE)
+    table = clx + plcf_bte_papx
+    struct.pack_into('<II', word_document, 0x9A + 33 * 8, 0, len(clx))
+    struct.pack_into('<II', word_document, 0x9A + 13 * 8, len(clx), len(plcf_bte_papx))
+    return _ole_file({'WordDocument': bytes(word_document), '1Table': table.ljust(STREAM_SIZE, b'\0')})
+
+
+def test_split_doc_text_empty_cell_is_not_a_row_end():
+    text = 'A\x07\x07C\x07\x07D\x07E\x07F\x07\x07'
+    assert split_doc_text(text, [5, 12]) == ([''], [['A', '', 'C'], ['D', 'E', 'F']])
+
+
+def test_table_rows_match_python_docx(tmp_path):
+    # 同一个文档分别生成 .doc（行结束标记记录在段落属性中）和 .docx，表格的行与单元格应与 python-docx 一致
+    cells = [['Name', '', 'Line'], ['', 'Peppa', ''], ['George', 'Dinosaur', '!']]
+    paragraphs = [('Peppa Pig\r', False), ('Episode One\r', False)]
+    for row in cells:
+        paragraphs.extend((cell + '\x07', False) for cell in row)
+        paragraphs.append(('\x07', True))
+    paragraphs.append(('The End\r', False))
+    doc_path = tmp_path / 'table.doc'
+    doc_path.write_bytes(_word_document(paragraphs))
+
+    document = Document()
+    document.add_paragraph('Peppa Pig')
+    document.add_paragraph('Episode One')
+    table = document.add_table(rows=len(cells), cols=len(cells[0]))
+    for row, row_cells in zip(table.rows, cells):
+        for cell, cell_text in zip(row.cells, row_cells):
+            cell.text = cell_text
+    document.add_paragraph('The End')
+    docx_path = tmp_path / 'table.docx'
+    document.save(str(docx_path))
+
+    row_ends = []
+    text = read_doc_main_text(str(doc_path), row_ends)
+    assert split_doc_text(text, row_ends)[1] == [[cell.text for cell in row.cells]
+                                                 for row in Document(str(docx_path)).tables[0].rows]
+    assert process_doc_file(str(doc_path)) == process_docx_file(str(docx_path))
+
+
+def test_word_saved_doc_matches_python_docx():
+    # Word 保存的同一个文档的 .doc 与 .docx（来自 oletools 的测试数据），含域代码、嵌入对象及插入的符号
+    assert (process_doc_file(os.path.join(DATA_DIR, 'embedded-simple-2007.doc'))
+            == process_docx_file(os.path.join(DATA_DIR, 'embedded-simple-2007.docx')))
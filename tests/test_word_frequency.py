@@ -0,0 +1,21 @@
+from EnglishAnalysisTools import CachedLemmatizer, count_word_frequency
+
+
+TEXT = ('Peppa and George are jumping in muddy puddles. Daddy Pig is reading the newspapers. '
+        'George likes dinosaurs and he is playing with his dinosaur. Mummy Pig is working on the computer. '
+        'The children were playing in the garden all morning. Peppa loves jumping, George loves dinosaurs. '
+        'Grandpa Pig was growing tomatoes and Granny Pig was feeding the chickens. '
+        'They are going to the beach tomorrow. The boats were sailing and the children were swimming. '
+        'Daddy Pig reads the newspaper every morning while Mummy Pig works. Everyone is laughing! ')
+
+
+def test_parallel_matches_serial(nlp_data):
+    # 多进程按分片统计后合并，词频（包括顺序）及词形还原缓存（包括最近使用的顺序）都应与串行处理相同
+    serial, parallel = CachedLemmatizer(), CachedLemmatizer()
+    serial_sentences, serial_freq = count_word_frequency(TEXT, lemmatizer=serial, workers=1)
+    parallel_sentences, parallel_freq = count_word_frequency(TEXT, lemmatizer=parallel, workers=2)
+
+    assert parallel_sentences == serial_sentences
+    assert parallel_freq == serial_freq
+    assert list(parallel_freq) == list(serial_freq)
+    assert parallel.entries() == serial.entries()